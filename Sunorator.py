@@ -2,8 +2,9 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
 import json
-import random
+import queue
 from data_preparation import prepare_data
+from song_corpus import SongCorpus
 from constants import *
 import threading
 from datasets import load_dataset
@@ -17,10 +18,22 @@ class SongGeneratorApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Song KI Steuerzentrale")
+
+        # Datenvorbereitung läuft in einem eigenen Thread und meldet sich nur über die Queue
+        self.prep_events = queue.Queue()
+        self.prep_thread = None
+        self.prep_cancel = threading.Event()
+        # Zufälliger Song für die Key-Auswahl; das erste Öffnen des Korpus kann songs/ übernehmen und dauern
+        self.sample_thread = None
+
         self.create_widgets()
-        self.load_random_json_file()  # Lädt eine zufällige JSON-Datei beim Start
+        self.load_random_json_file()  # Lädt im Hintergrund einen zufälligen Song beim Start
         training_manager = TrainingManager(log_training_message=None, root=self)
 
+        # Ereignisse der Datenvorbereitung in festen Abständen gesammelt anwenden
+        self.after(UI_REFRESH_MS, self.poll_preparation_events)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
     def create_widgets(self):
         # Tabbed Notebook für die drei Bereiche
         notebook = ttk.Notebook(self)
@@ -42,22 +55,26 @@ class SongGeneratorApp(tk.Tk):
 
     # Datenvorbereitungs-Tab
     def create_preparation_tab(self, parent):
-        # Rahmen für die drei Buttons nebeneinander
+        # Rahmen für die vier Buttons nebeneinander
         button_frame = tk.Frame(parent)
         button_frame.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
-        button_frame.columnconfigure(0, weight=1)  # Erste Spalte (33%)
-        button_frame.columnconfigure(1, weight=1)  # Zweite Spalte (33%)
-        button_frame.columnconfigure(2, weight=1)  # Dritte Spalte (33%)
+        button_frame.columnconfigure(0, weight=1)  # Erste Spalte (25%)
+        button_frame.columnconfigure(1, weight=1)  # Zweite Spalte (25%)
+        button_frame.columnconfigure(2, weight=1)  # Dritte Spalte (25%)
+        button_frame.columnconfigure(3, weight=1)  # Vierte Spalte (25%)
 
-        # Buttons: Zufällige Datei, Manuelle Datei und Daten vorbereiten
+        # Buttons: Zufällige Datei, Manuelle Datei, Daten vorbereiten und Abbrechen
         reload_random_button = ttk.Button(button_frame, text="Zufällige Datei neu laden", command=self.load_random_json_file)
         reload_random_button.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
 
         manual_select_button = ttk.Button(button_frame, text="Manuelle Datei auswählen", command=self.select_manual_json_file)
         manual_select_button.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
-        start_button = ttk.Button(button_frame, text="Daten vorbereiten", command=self.start_data_preparation)
-        start_button.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+        self.prep_start_button = ttk.Button(button_frame, text="Daten vorbereiten", command=self.start_data_preparation)
+        self.prep_start_button.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+
+        self.prep_cancel_button = ttk.Button(button_frame, text="Abbrechen", command=self.cancel_data_preparation, state="disabled")
+        self.prep_cancel_button.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
 
         # JSON Key Felder für Trainingsdaten
         self.json_keys_frame = tk.Frame(parent)
@@ -428,8 +445,16 @@ class SongGeneratorApp(tk.Tk):
             self.language_key.config(state='normal')
 
     def start_data_preparation(self):
-        # Hole den Song-Ordner aus der constants.py
-        song_folder = SONGS_DIR
+        # Nur ein Lauf gleichzeitig: beide würden dieselben Trainingsdaten und denselben Index schreiben
+        if self.prep_thread and self.prep_thread.is_alive():
+            self.log(self.prep_log_text, "Die Datenvorbereitung läuft bereits.")
+            return
+        if self.sample_thread and self.sample_thread.is_alive():
+            self.log(self.prep_log_text, "Der Song-Korpus wird noch geöffnet, bitte kurz warten.")
+            return
+
+        # Hole den Song-Korpus aus der constants.py
+        corpus_dir = CORPUS_DIR
         title_key = self.title_key.get()
         lyrics_key = self.lyrics_key.get()
         styles_key = self.styles_key.get()
@@ -437,56 +462,140 @@ class SongGeneratorApp(tk.Tk):
         language_key = self.language_key.get() if not self.detect_language_var.get() else None
         detect_language = bool(self.detect_language_var.get())
 
-        # Callback für den Fortschritt
-        def update_progress(processed, total, skipped_existing, skipped_lyrics):
-            # Fortschritt für die gesamten Songs
-            self.progress_bar['value'] = int((processed / total) * 100)
-            self.progress_label.config(text=f"Neue Songs {processed} von {total}")
+        if not (title_key and lyrics_key and styles_key and metatags_key and (language_key or detect_language)):
+            self.log(self.prep_log_text, "Fehler: Bitte alle Felder ausfüllen.")
+            return
 
-            # Fortschritt der übersprungenen Songs (bereits vorhanden)
-            self.skipped_existing_bar['value'] = int((skipped_existing / total) * 100)
-            self.skipped_existing_label.config(text=f"bereits vorhanden: {skipped_existing}")
+        self.prep_cancel.clear()
+        self.prep_start_button.config(state="disabled")
+        self.prep_cancel_button.config(state="normal")
+        # Die Tk-Variablen werden hier gelesen, der Thread bekommt nur fertige Werte
+        self.prep_thread = threading.Thread(
+            target=self.run_data_preparation,
+            args=(corpus_dir, title_key, lyrics_key, styles_key, metatags_key, language_key, detect_language),
+            daemon=True
+        )
+        self.prep_thread.start()
 
-            # Fortschritt der übersprungenen Songs (keine Lyrics)
-            self.skipped_lyrics_bar['value'] = int((skipped_lyrics / total) * 100)
-            self.skipped_lyrics_label.config(text=f"keine Lyrics oder Metatags: {skipped_lyrics}")
+    def run_data_preparation(self, *args):
+        """Läuft im Hintergrund-Thread und berührt keine Widgets, alles geht über prep_events."""
+        def report_progress(processed, total, skipped_existing, skipped_lyrics):
+            self.prep_events.put(("progress", (processed, total, skipped_existing, skipped_lyrics)))
 
-            self.update_idletasks()
+        # Wrapper für die Log-Nachrichten der Datenvorbereitung
+        def log_preparation_message(message):
+            self.prep_events.put(("log", message))
 
-        if title_key and lyrics_key and styles_key and metatags_key and (language_key or detect_language):
+        try:
+            processed, total = prepare_data(*args, report_progress, log_preparation_message, should_stop=self.prep_cancel.is_set)
+            if self.prep_cancel.is_set():
+                return  # Den Abbruch meldet prepare_data selbst
+            if total > 0:
+                log_preparation_message(f"Verarbeitung abgeschlossen. {processed} von {total} Songs bearbeitet.")
+            else:
+                log_preparation_message("Keine Songs zum Bearbeiten gefunden.")
+        except Exception as e:
+            log_preparation_message(f"Fehler bei der Datenvorbereitung: {e}")
+        finally:
+            self.prep_events.put(("finished", None))
+
+    def cancel_data_preparation(self):
+        if self.prep_thread and self.prep_thread.is_alive():
+            self.prep_cancel.set()
+            self.prep_cancel_button.config(state="disabled")
+            self.log(self.prep_log_text, "Abbruch angefordert, der aktuelle Block wird noch fertig bearbeitet...")
+
+    def poll_preparation_events(self):
+        """Wendet alle aufgelaufenen Ereignisse der Datenvorbereitung gebündelt an (höchstens alle UI_REFRESH_MS)."""
+        messages = []
+        progress = None
+        finished = False
+        sample = None
+        while True:
             try:
-                # Wrapper für die Log-Nachrichten der Datenvorbereitung
-                def log_preparation_message(message):
-                    self.log(self.prep_log_text, message)
-
-                processed, total = prepare_data(
-                    song_folder, title_key, lyrics_key, styles_key, metatags_key, language_key, detect_language, update_progress, log_preparation_message
-                )
-                if total > 0:
-                    log_preparation_message(f"Verarbeitung abgeschlossen. {processed} von {total} Songs bearbeitet.")
-                else:
-                    log_preparation_message("Keine Songs zum Bearbeiten gefunden.")
-            except Exception as e:
-                log_preparation_message(f"Fehler bei der Datenvorbereitung: {e}")
-        else:
-            self.log(self.prep_log_text, "Fehler: Bitte alle Felder ausfüllen.")
+                kind, data = self.prep_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                messages.append(data)
+            elif kind == "progress":
+                progress = data  # Nur der letzte Stand zählt
+            elif kind == "finished":
+                finished = True
+            elif kind == "sample":
+                sample = data
+
+        if messages:
+            # Bei sehr vielen Zeilen nur die letzten anzeigen, damit ein Frame nicht beliebig teuer wird
+            if len(messages) > UI_MAX_LOG_LINES_PER_FRAME:
+                skipped = len(messages) - UI_MAX_LOG_LINES_PER_FRAME
+                messages = [f"... {skipped} Meldungen ausgelassen ..."] + messages[-UI_MAX_LOG_LINES_PER_FRAME:]
+            self.log(self.prep_log_text, "\n".join(messages))
+        if sample:
+            self.apply_random_song(*sample)
+        if progress:
+            self.update_preparation_progress(*progress)
+        if finished:
+            self.prep_start_button.config(state="normal")
+            self.prep_cancel_button.config(state="disabled")
+
+        self.after(UI_REFRESH_MS, self.poll_preparation_events)
+
+    def update_preparation_progress(self, processed, total, skipped_existing, skipped_lyrics):
+        if total == 0:
+            return
+        # Fortschritt für die gesamten Songs
+        self.progress_bar['value'] = int((processed / total) * 100)
+        self.progress_label.config(text=f"Neue Songs {processed} von {total}")
+
+        # Fortschritt der übersprungenen Songs (bereits vorhanden)
+        self.skipped_existing_bar['value'] = int((skipped_existing / total) * 100)
+        self.skipped_existing_label.config(text=f"bereits vorhanden: {skipped_existing}")
+
+        # Fortschritt der übersprungenen Songs (keine Lyrics)
+        self.skipped_lyrics_bar['value'] = int((skipped_lyrics / total) * 100)
+        self.skipped_lyrics_label.config(text=f"keine Lyrics oder Metatags: {skipped_lyrics}")
+
+    def on_close(self):
+        # Eine laufende Datenvorbereitung erst sauber beenden lassen, damit Index und Trainingsdaten zusammenpassen
+        if self.prep_thread and self.prep_thread.is_alive():
+            self.prep_cancel.set()
+            self.after(UI_REFRESH_MS, self.on_close)
+            return
+        # Eine laufende Übernahme von songs/ ebenfalls abschließen lassen
+        if self.sample_thread and self.sample_thread.is_alive():
+            self.after(UI_REFRESH_MS, self.on_close)
+            return
+        self.destroy()
+
     # Daten aus einer zufälligen JSON-Datei laden und die Keys anzeigen
     def load_random_json_file(self):
-        self.log(self.prep_log_text, f"Lade Songs aus dem Verzeichnis: {SONGS_DIR}")
-        folder = SONGS_DIR  # Verwende den Ordner aus constants.py
-        if os.path.isdir(folder):
-            json_files = [f for f in os.listdir(folder) if f.endswith('.json')]
-            if json_files:
-                random_file = random.choice(json_files)
-                file_path = os.path.join(folder, random_file)
-                self.log(self.prep_log_text, f"Zufällige Datei geladen: {random_file}")
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    self.update_key_selection(data)
-            else:
-                self.log(self.prep_log_text, "Keine JSON-Dateien im Ordner gefunden.")
+        if self.sample_thread and self.sample_thread.is_alive():
+            return
+        self.log(self.prep_log_text, f"Lade Songs aus dem Korpus: {CORPUS_DIR}")
+        self.sample_thread = threading.Thread(target=self.run_random_song_loader, daemon=True)
+        self.sample_thread.start()
+
+    def run_random_song_loader(self):
+        """Läuft im Hintergrund-Thread, der Song geht als Ereignis "sample" über prep_events an die Oberfläche."""
+        try:
+            corpus = SongCorpus(CORPUS_DIR)  # Übernimmt beim ersten Öffnen einen bestehenden songs-Ordner
+            try:
+                song = corpus.random_song()
+            finally:
+                corpus.close()
+        except Exception as e:
+            self.prep_events.put(("log", f"Fehler beim Öffnen des Korpus: {e}"))
+            return
+        self.prep_events.put(("sample", (song,)))
+
+    def apply_random_song(self, song):
+        if song:
+            _, file_name, data = song
+            self.log(self.prep_log_text, f"Zufälliger Song geladen: {file_name}")
+            self.update_key_selection(data)
         else:
-            self.log(self.prep_log_text, f"Ordner {folder} nicht gefunden.")
+            self.log(self.prep_log_text, "Keine Songs im Korpus gefunden.")
 
     def select_manual_json_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("JSON-Dateien", "*.json"), ("Alle Dateien", "*.*")])
@@ -1,52 +1,11 @@
 import os
-import time
-import threading
-from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+import queue
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-from threading import Lock
+from scraper_engine import ScraperEngine, load_playlist_sources
 from utils import *
 from constants import *
 
-# Song-Daten abrufen
-def fetch_song_data(driver, song_url):
-    """Ruft die Song-Daten von der Songseite ab."""
-    driver.get(song_url)
-    time.sleep(5)
-
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-    # Suche nach dem Container-div basierend auf der class
-    song_container = soup.find('div', class_='bg-vinylBlack-darker w-full h-full flex flex-col sm:flex-col md:flex-col lg:flex-row xl:flex-row lg:mt-8 xl:mt-8 lg:ml-32 xl:ml-32 overflow-y-scroll items-center sm:items-center md:items-center lg:items-start xl:items-start')
-
-    if not song_container:
-        return {}
-
-    # Suche nach dem Titel im input-Feld
-    title_input = song_container.find('input')
-    title = title_input['value'] if title_input else None
-
-    # Suche nach Genres
-    genres = [a.get_text(strip=True).replace(",", "").replace(" ", "") for a in song_container.find_all('a', href=lambda href: href and '/style/' in href)]
-    genres = genres or ["Keine Genres gefunden"]
-
-    # Suche nach Songtext
-    lyrics_textarea = song_container.find('textarea')
-    lyrics = lyrics_textarea.get_text(strip=True) if lyrics_textarea else "Keine Lyrics gefunden"
-
-    return {
-        "song_url": song_url,
-        "title": title,
-        "styles": genres,
-        "lyrics": lyrics
-    }
-
 # Hauptklasse für die GUI-Anwendung
 class SunoScraperApp(tk.Tk):
     def __init__(self):
@@ -55,10 +14,8 @@ class SunoScraperApp(tk.Tk):
         self.geometry("800x600")
 
         # Initialisiere Variablen
-        self.playlists = {}
-        self.scraped_playlists = {}
-        self.driver = None
-        self.is_scraping = False
+        self.scraper = None
+        self.events = queue.Queue()  # Ereignisse der Scraper-Engine
 
         # Variablen für aktuelle und letzte Songinfos
         self.last_song_info = {}
@@ -70,13 +27,19 @@ class SunoScraperApp(tk.Tk):
         # Erstelle Widgets
         self.create_widgets()
 
+        # Ereignisse der Engine in festen Abständen gesammelt anwenden
+        self.after(UI_REFRESH_MS, self.poll_events)
+
     def create_widgets(self):
         # Rahmen für die Buttons oben
         button_frame = tk.Frame(self)
         button_frame.grid(row=0, column=0, sticky="ew")
         button_frame.columnconfigure(0, weight=1) #URL Scraping Button
         button_frame.columnconfigure(1, weight=1) #Songdata Scraping Button
-        button_frame.columnconfigure(2, weight=1) #Beenden Button
+        button_frame.columnconfigure(2, weight=1) #Pipeline Button
+        button_frame.columnconfigure(3, weight=1) #Pause Button
+        button_frame.columnconfigure(4, weight=1) #Worker-Anzahl
+        button_frame.columnconfigure(5, weight=1) #Beenden Button
 
         # Buttons für Aktionen
         ##Scrape URLs Button
@@ -87,9 +50,30 @@ class SunoScraperApp(tk.Tk):
         scrape_songs_button = ttk.Button(button_frame, text="Songs Scrapen", command=self.start_scrape_songs)
         scrape_songs_button.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
 
+        ##Playlists und Songs gleichzeitig scrapen
+        scrape_all_button = ttk.Button(button_frame, text="Alles Scrapen", command=self.start_scrape_all)
+        scrape_all_button.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+
+        ##Pause-Button
+        self.pause_button = ttk.Button(button_frame, text="Pause", command=self.toggle_pause)
+        self.pause_button.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+
+        ##Anzahl paralleler Webdriver
+        worker_frame = tk.Frame(button_frame)
+        worker_frame.grid(row=0, column=4, padx=5, pady=5, sticky="ew")
+        tk.Label(worker_frame, text="Webdriver:").pack(side=tk.LEFT)
+        self.worker_count_var = tk.IntVar(value=DEFAULT_SCRAPER_WORKERS)
+        ttk.Spinbox(worker_frame, from_=1, to=32, width=5, textvariable=self.worker_count_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.http_fetch_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(worker_frame, text="HTTP zuerst", variable=self.http_fetch_var).pack(side=tk.LEFT, padx=5)
+        self.block_resources_var = tk.BooleanVar(value=DEFAULT_BLOCK_RESOURCES)
+        ttk.Checkbutton(worker_frame, text="Nur Text laden", variable=self.block_resources_var).pack(side=tk.LEFT, padx=5)
+        self.archive_html_var = tk.BooleanVar(value=DEFAULT_ARCHIVE_HTML)
+        ttk.Checkbutton(worker_frame, text="HTML archivieren", variable=self.archive_html_var).pack(side=tk.LEFT, padx=5)
+
         ##Beenden-Button
         quit_button = ttk.Button(button_frame, text="Beenden", command=self.quit_app)
-        quit_button.grid(row=0, column=2, padx=5, pady=5, sticky="ew")
+        quit_button.grid(row=0, column=5, padx=5, pady=5, sticky="ew")
         
         # Hauptframe für die zwei Spalten und Fortschrittsbalken
         main_frame = tk.Frame(self)
@@ -176,12 +160,11 @@ class SunoScraperApp(tk.Tk):
         main_frame.rowconfigure(3, weight=1)  # Ausgabe-Textfeld expandiert
 
     def quit_app(self):
-        # Beende Scraping-Prozesse, falls sie laufen
-        if self.is_scraping:
-            self.is_scraping = False  # Setzt den Scraping-Status auf False, um die Schleifen zu beenden
-        # Falls der Webdriver läuft, schließe ihn
-        if self.driver:
-            self.driver.quit()  # Beende den Webdriver
+        # Beende Scraping-Prozesse, falls sie laufen, und schließe die warm gehaltenen Browser.
+        # close() wartet auf den Scraper-Thread, damit Korpus, JSON-Export und Frontier noch sauber
+        # geschlossen werden (der Thread ist ein Daemon und würde sonst mit dem Interpreter abbrechen)
+        if self.scraper:
+            self.scraper.close()
 
         # Schließe die Anwendung
         self.destroy()  # Schließt das Hauptfenster und beendet die App
@@ -189,7 +172,52 @@ class SunoScraperApp(tk.Tk):
     def log(self, message):
         self.output_text.insert(tk.END, message + "\n")
         self.output_text.see(tk.END)
-        self.update()  # Hier wird die GUI sofort aktualisiert
+
+    def poll_events(self):
+        """Liest alle aufgelaufenen Ereignisse der Engine und wendet sie gebündelt an."""
+        messages = []
+        progress = {}
+        last_song = None
+        finished = False
+        while True:
+            try:
+                kind, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                messages.append(data["message"])
+            elif kind == "progress":
+                progress[data["name"]] = data  # Nur der letzte Stand zählt
+            elif kind == "song":
+                last_song = data
+            elif kind == "finished":
+                finished = True
+
+        if messages:
+            # Bei sehr vielen Zeilen nur die letzten anzeigen, damit ein Frame nicht beliebig teuer wird
+            if len(messages) > UI_MAX_LOG_LINES_PER_FRAME:
+                skipped = len(messages) - UI_MAX_LOG_LINES_PER_FRAME
+                messages = [f"... {skipped} Meldungen ausgelassen ..."] + messages[-UI_MAX_LOG_LINES_PER_FRAME:]
+            self.log("\n".join(messages))
+        for name, data in progress.items():
+            self.update_progress(name, data["value"], data["maximum"])
+        if last_song:
+            self.last_song_info = last_song
+            self.update_last_song_info()
+        if finished:
+            self.pause_button.config(text="Pause")
+
+        self.after(UI_REFRESH_MS, self.poll_events)
+
+    def update_progress(self, name, value, maximum):
+        bar, label, text = {
+            "overall": (self.overall_progress, self.overall_label, "Gesamtfortschritt"),
+            "playlist": (self.playlist_progress, self.playlist_label, "Playlists"),
+            "song": (self.song_progress, self.song_label, "Songs in Playlist"),
+        }[name]
+        bar['maximum'] = max(maximum, 1)
+        bar['value'] = value
+        label.config(text=f"{text}: {value}/{maximum}")
 
     def update_last_song_info(self):
         # Song- und Playlist-URL-Labels aktualisieren
@@ -201,225 +229,56 @@ class SunoScraperApp(tk.Tk):
         self.styles_label.config(text=f"Styles: {', '.join(self.last_song_info.get('styles', []))}")
         
         # JSON-Statuslabels aktualisieren
-        updated_files = self.last_song_info.get('updated_files', [])
+        updated_files = [os.path.basename(path) for path in self.last_song_info.get('updated_files', [])]
         self.meta_status_label.config(bg="green" if 'all_meta_tags.json' in updated_files else "red")
         self.styles_status_label.config(bg="green" if 'all_styles.json' in updated_files else "red")
         self.meta_mapping_status_label.config(bg="green" if 'song_meta_mapping.json' in updated_files else "red")
         self.styles_mapping_status_label.config(bg="green" if 'song_styles_mapping.json' in updated_files else "red")
 
-        self.update()  # Sofortige GUI-Aktualisierung
+    def toggle_pause(self):
+        if not self.scraper or not self.scraper.is_running():
+            return
+        if self.scraper.paused:
+            self.scraper.resume()
+            self.pause_button.config(text="Pause")
+            self.log("Scraping wird fortgesetzt.")
+        else:
+            self.scraper.pause()
+            self.pause_button.config(text="Fortsetzen")
+            self.log("Scraping pausiert.")
+
+    def start_scraper(self, phase):
+        # Eine Engine für alle Läufe, damit die Browser zwischen den Phasen nicht neu starten
+        if self.scraper is None:
+            self.scraper = ScraperEngine(events=self.events)
+        self.scraper.configure(
+            worker_count=self.worker_count_var.get(),
+            http_first=self.http_fetch_var.get(),
+            block_resources=self.block_resources_var.get(),
+            archive_html=self.archive_html_var.get()
+        )
+        self.scraper.start(phase)
 
     def start_scrape_playlists(self):
-        if not self.is_scraping:
-            threading.Thread(target=self.scrape_playlists_thread).start()
+        if not self.scraper or not self.scraper.is_running():
+            self.start_scraper("playlists")
         else:
             messagebox.showinfo("Info", "Ein Scraping-Prozess läuft bereits.")
 
-    def scrape_playlists_thread(self):
-        self.is_scraping = True
-        self.log("Starte das Scrapen der Playlists...")
-
-        self.init_driver()
-        try:
-            self.playlists = self.scrape_playlists()
-            save_json(self.playlists, SCRAPED_PLAYLISTS_FILE)
-            self.log("Playlists wurden erfolgreich gescrapt und gespeichert.")
-            
-            # Fortschrittsbalken für Playlists aktualisieren
-            self.playlist_progress['value'] += 1
-            self.playlist_label.config(text=f"Playlists: {self.playlist_progress['value']}/{self.playlist_progress['maximum']}")
-            
-        finally:
-            self.driver.quit()
-            self.driver = None
-            self.is_scraping = False
-
     def start_scrape_songs(self):
-        if not self.is_scraping:
-            self.scraped_playlists = load_json(SCRAPED_PLAYLISTS_FILE)
-            if self.scraped_playlists:
-                threading.Thread(target=self.scrape_songs_thread).start()
+        if not self.scraper or not self.scraper.is_running():
+            if load_playlist_sources():
+                self.start_scraper("songs")
             else:
                 messagebox.showwarning("Warnung", "Keine Playlists gefunden. Bitte führen Sie zuerst 'URLs Scrapen' aus.")
         else:
             messagebox.showinfo("Info", "Ein Scraping-Prozess läuft bereits.")
 
-    def scrape_songs_thread(self):
-        self.is_scraping = True
-        self.log("Starte das Scrapen der Songs...")
-
-        self.init_driver()
-        try:
-            self.scrape_songs_from_url_list(self.scraped_playlists)
-        
-            # Fortschrittsbalken für Songs und Gesamtfortschritt aktualisieren
-            self.song_progress['value'] += 1
-            self.song_label.config(text=f"Songs in Playlist: {self.song_progress['value']}/{self.song_progress['maximum']}")
-
-            self.overall_progress['value'] += 1
-            self.overall_label.config(text=f"Gesamtfortschritt: {self.overall_progress['value']}/{self.overall_progress['maximum']}")
-            
-            self.log("Songs wurden erfolgreich gescrapt und gespeichert.")
-        finally:
-            self.driver.quit()
-            self.driver = None
-            self.is_scraping = False
-
-    def init_driver(self):
-        self.log("Initialisiere Webdriver...")
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.log("Webdriver initialisiert.")
-
-    # Playlists scrapen und Song-Links sammeln
-    def scrape_playlists(self):
-        playlists = load_json(SCRAPED_PLAYLISTS_FILE)  # Vorhandene Daten laden
-        total_songs = 0
-        self.log("Öffne die Webseite suno.com...")
-        self.driver.get("https://suno.com")
-        time.sleep(5)  # Warte, bis die Seite geladen ist
-
-        self.log("Suche nach Playlist-Links auf der Startseite...")
-        playlist_links = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/playlist/')]")
-        
-        playlist_urls = list(set([link.get_attribute("href") for link in playlist_links]))  # Duplikate entfernen
-        self.log(f"Gefundene Playlist-Links: {len(playlist_urls)}")
-
-        self.playlist_progress['maximum'] = len(playlist_urls)
-        self.playlist_progress['value'] = 0
-
-        for playlist_url in playlist_urls:
-            self.driver.get(playlist_url)
-            time.sleep(5)  # Warte, bis die Playlist-Seite geladen ist
-
-            song_links = self.driver.find_elements(By.XPATH, "//a[contains(@href, '/song/')]")
-            song_urls = list(set([link.get_attribute("href") for link in song_links]))  # Duplikate entfernen
-
-            total_songs += len(song_urls)
-            playlists[playlist_url] = {"song_urls": song_urls}
-
-            # Fortschrittsbalken aktualisieren
-            self.playlist_progress['value'] += 1
-            self.playlist_label.config(text=f"Playlists: {self.playlist_progress['value']}/{len(playlist_urls)}")
-            self.log(f"Playlist gescrapt: {playlist_url} mit {len(song_urls)} Songs.")
-            self.update()  # Sofortige GUI-Aktualisierung
-
-        self.log(f"Scraping abgeschlossen: {len(playlists)} Playlists und {total_songs} Songs wurden gefunden.")
-        self.playlist_progress['value'] = 0
-        return playlists
-
-    # Songinformationen scrapen und speichern
-    def scrape_songs_from_url_list(self, url_list):
-        all_styles = load_json(STYLES_FILE) or []
-        song_styles_mapping = load_json(SONG_STYLES_MAPPING_FILE) or {}
-        all_meta_tags = load_json(META_TAGS_FILE) or []
-        song_meta_mapping = load_json(SONG_META_MAPPING_FILE) or {}
-
-        total_playlists = len(url_list)
-        total_songs = sum(len(playlist_data['song_urls']) for playlist_data in url_list.values())
-
-        # Bereits verarbeitete Song-IDs abrufen
-        processed_song_ids = get_processed_song_ids()
-
-        self.overall_progress['maximum'] = total_songs
-        self.overall_progress['value'] = 0
-
-        self.playlist_progress['maximum'] = total_playlists
-        self.playlist_progress['value'] = 0
-
-        for playlist_url, playlist_data in url_list.items():
-            songs_in_playlist = playlist_data['song_urls']
-
-            self.playlist_progress['value'] += 1
-            self.playlist_label.config(text=f"Playlists: {self.playlist_progress['value']}/{total_playlists}")
-
-            self.song_progress['maximum'] = len(songs_in_playlist)
-            self.song_progress['value'] = 0
-
-            for song_url in songs_in_playlist:
-                song_id = extract_song_id_from_url(song_url)
-
-                # Prüfen, ob der Song bereits bearbeitet wurde
-                if song_id in processed_song_ids:
-                    self.log(f"Song bereits bearbeitet, überspringe: {song_url}")
-                    self.song_progress['value'] += 1
-                    self.overall_progress['value'] += 1
-                    self.update()  # Sofortige GUI-Aktualisierung
-                    continue
-
-                self.log(f"Scrape Song: {song_url}")
-                try:
-                    song_data = fetch_song_data(self.driver, song_url)
-                    song_title = song_data["title"] or f"Unbekannter_Titel_{int(time.time())}"
-                    song_id = extract_song_id_from_url(song_url)
-
-                    # Liste der aktualisierten Dateien initialisieren
-                    updated_files = []
-
-                    # Bereinigen und Speichern der Song-Daten
-                    song_file_name = clean_filename(f"{song_title}_{song_id}") + ".json"
-                    song_file_path = os.path.join(SONGS_DIR, song_file_name)
-                    save_json(song_data, song_file_path)
-                    updated_files.append(song_file_path)
-
-                    # Aktualisiere die Liste der verarbeiteten Song-IDs
-                    processed_song_ids.add(song_id)
-
-                    # Aktualisiere Styles
-                    new_styles = [style for style in song_data['styles'] if style not in all_styles]
-                    if new_styles:
-                        all_styles.extend(new_styles)
-                        save_json(all_styles, STYLES_FILE)
-                        updated_files.append(STYLES_FILE)
-
-                    # Song-Styles-Mapping speichern mit song_url als Schlüssel
-                    song_styles_mapping[song_url] = song_data['styles']
-                    save_json(song_styles_mapping, SONG_STYLES_MAPPING_FILE)
-                    updated_files.append(SONG_STYLES_MAPPING_FILE)
-
-                    # Meta-Tags extrahieren
-                    meta_tags = extract_meta_tags(song_data['lyrics'])
-                    new_meta_tags = [tag for tag in meta_tags if tag not in all_meta_tags]
-                    if new_meta_tags:
-                        all_meta_tags.extend(new_meta_tags)
-                        save_json(all_meta_tags, META_TAGS_FILE)
-                        updated_files.append(META_TAGS_FILE)
-
-                    # Song-Meta-Mapping speichern mit song_url als Schlüssel
-                    song_meta_mapping[song_url] = meta_tags
-                    save_json(song_meta_mapping, SONG_META_MAPPING_FILE)
-                    updated_files.append(SONG_META_MAPPING_FILE)
-
-                    # Aktualisiere last_song_info
-                    self.last_song_info = {
-                        "song_url": song_url,
-                        "playlist_url": playlist_url,  # Hier die Playlist-URL speichern
-                        "title": song_title,
-                        "styles": song_data['styles'],
-                        "updated_files": updated_files
-                    }
-                    self.update_last_song_info()
-
-                    self.log(f"Song gespeichert: {song_title}")
-                except Exception as e:
-                    self.log(f"Fehler beim Abrufen der Song-Daten von {song_url}: {e}")
-                finally:
-                    # Fortschrittsbalken aktualisieren
-                    self.song_progress['value'] += 1
-                    self.song_label.config(text=f"Songs in Playlist: {self.song_progress['value']}/{self.song_progress['maximum']}")
-                    self.overall_progress['value'] += 1
-                    self.overall_label.config(text=f"Gesamtfortschritt: {self.overall_progress['value']}/{self.overall_progress['maximum']}")
-                    self.update()  # Sofortige GUI-Aktualisierung
-
-            # Reset des Song-Fortschrittsbalkens nach jeder Playlist
-            self.song_progress['value'] = 0
-
-        # Abschließende Updates
-        self.overall_progress['value'] = 0
-        self.playlist_progress['value'] = 0
-        self.song_progress['value'] = 0
+    def start_scrape_all(self):
+        if not self.scraper or not self.scraper.is_running():
+            self.start_scraper("all")
+        else:
+            messagebox.showinfo("Info", "Ein Scraping-Prozess läuft bereits.")
 
 # Hauptprogramm
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+from constants import *
+
+class LengthBucketSampler(Sampler):
+    """Batches aus Songs ähnlicher Länge, für den DataLoader als `batch_sampler`.
+
+    Pro Epoche werden die Songs gemischt und in Gruppen von `pool_batches` Batches aufgeteilt;
+    innerhalb einer Gruppe wird nach Länge sortiert und in Batches geschnitten. Die Reihenfolge
+    der Batches wird danach noch einmal gemischt, damit lange und kurze Batches sich abwechseln.
+    Songs ohne Tokens werden ausgelassen.
+    """
+
+    def __init__(self, lengths, batch_size, pool_batches=BUCKET_POOL_BATCHES, seed=None):
+        self.lengths = np.asarray(lengths)
+        self.indices = np.flatnonzero(self.lengths > 0)
+        self.batch_size = batch_size
+        self.pool_size = batch_size * max(1, pool_batches)
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return (len(self.indices) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        indices = self.rng.permutation(self.indices)
+        batches = []
+        for start in range(0, len(indices), self.pool_size):
+            pool = indices[start:start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind='stable')]
+            batches.extend(pool[offset:offset + self.batch_size] for offset in range(0, len(pool), self.batch_size))
+        for batch in self.rng.permutation(len(batches)):
+            yield batches[batch].tolist()
+
+class PaddingCollator:
+    """Füllt einen Batch nur bis zum längsten Song darin auf.
+
+    Aufgefüllte Stellen bekommen attention_mask 0 und in `labels` den Wert -100, damit sie nicht in
+    den Loss eingehen.
+    """
+
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, samples):
+        length = max(len(sample['input_ids']) for sample in samples)
+        input_ids = torch.full((len(samples), length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(samples), length), dtype=torch.long)
+        for row, sample in enumerate(samples):
+            ids = sample['input_ids']
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'labels': input_ids.masked_fill(attention_mask == 0, -100)
+        }
@@ -0,0 +1,111 @@
+"""Benchmark: Trainingsdurchsatz in Tokens/s, Auffüllen auf max_length gegen Längen-Buckets mit dynamischem Auffüllen.
+
+Gezählt werden nur echte Tokens (attention_mask 1), aufgefüllte Stellen sind reine Mehrarbeit.
+Nutzt die echten Trainingsdaten über den Token-Cache.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.batching_benchmark                      # gpt2, Standardwerte aus constants.py
+    python -m benchmarks.batching_benchmark --steps 50 --batch-size 8 --max-length 256
+"""
+import sys
+import time
+import argparse
+import torch
+from torch.utils.data import DataLoader
+from transformers import GPT2LMHeadModel, GPT2Tokenizer
+from batching import LengthBucketSampler, PaddingCollator
+from near_duplicates import load_dropped_duplicates
+from token_cache import load_token_cache
+from training import LyricsDataset
+from constants import *
+
+# Bisheriges Verhalten: jeder Song auf max_length aufgefüllt, Labels gleich input_ids (Auffüllung zählt im Loss mit)
+class FixedPaddingCollator:
+    def __init__(self, pad_token_id, max_length):
+        self.pad_token_id = pad_token_id
+        self.max_length = max_length
+
+    def __call__(self, samples):
+        input_ids = torch.full((len(samples), self.max_length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(samples), self.max_length), dtype=torch.long)
+        for row, sample in enumerate(samples):
+            ids = sample['input_ids']
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return {'input_ids': input_ids, 'attention_mask': attention_mask, 'labels': input_ids}
+
+def padding_share(batches, lengths, max_length=None):
+    """Anteil aufgefüllter Stellen über eine ganze Epoche."""
+    real = padded = 0
+    for batch in batches:
+        real += int(lengths[batch].sum())
+        padded += len(batch) * (max_length or int(lengths[batch].max()))
+    return 1 - real / padded
+
+def measure(model, loader, steps, device):
+    """Tokens/s über `steps` Trainingsschritte (nach zwei Schritten zum Aufwärmen)."""
+    optimizer = torch.optim.AdamW(model.parameters(), lr=DEFAULT_LEARNING_RATE)
+    model.train()
+    batches = iter(loader)
+    tokens = 0
+    started = None
+    for step in range(steps + 2):
+        try:
+            batch = next(batches)
+        except StopIteration:
+            batches = iter(loader)
+            batch = next(batches)
+        if step == 2:
+            if device.type == 'cuda':
+                torch.cuda.synchronize()
+            started = time.perf_counter()
+        batch = {key: value.to(device) for key, value in batch.items()}
+        loss = model(**batch).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+        if step >= 2:
+            tokens += int(batch['attention_mask'].sum())
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+    return tokens / (time.perf_counter() - started)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Name oder Pfad des Modells")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument("--steps", type=int, default=30, help="Gemessene Trainingsschritte pro Variante")
+    args = parser.parse_args(argv)
+
+    tokenizer = GPT2Tokenizer.from_pretrained(args.model)
+    tokenizer.pad_token = tokenizer.eos_token
+    cache = load_token_cache(tokenizer, args.max_length, exclude=load_dropped_duplicates())
+    lengths = cache.lengths()
+    if not lengths.any():
+        print("Keine Trainingsdaten gefunden.")
+        return 1
+    print(f"{len(cache)} Songs, im Mittel {lengths.mean():.1f} Tokens (max_length {args.max_length}), Batchgröße {args.batch_size}")
+
+    sampler = LengthBucketSampler(lengths, args.batch_size, seed=0)
+    fixed = [list(range(start, min(start + args.batch_size, len(cache)))) for start in range(0, len(cache), args.batch_size)]
+    print(f"Aufgefüllte Stellen pro Epoche: vorher {padding_share(fixed, lengths, args.max_length):.1%}, "
+          f"nachher {padding_share(sampler, lengths):.1%}")
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = GPT2LMHeadModel.from_pretrained(args.model).to(device)
+    dataset = LyricsDataset(cache)
+    variants = [
+        ("vorher (max_length)", DataLoader(dataset, batch_size=args.batch_size, shuffle=True,
+                                           collate_fn=FixedPaddingCollator(tokenizer.pad_token_id, args.max_length))),
+        ("nachher (Buckets)", DataLoader(dataset, batch_sampler=sampler, collate_fn=PaddingCollator(tokenizer.pad_token_id))),
+    ]
+    baseline = None
+    for label, loader in variants:
+        throughput = measure(model, loader, args.steps, device)
+        baseline = baseline or throughput
+        print(f"{label:<22} {throughput:10.1f} Tokens/s  ({throughput / baseline:.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Micro-Benchmark: Durchsatz der Textbereinigung in MB/s, bisherige Funktion gegen text_normalizer.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.normalize_benchmark                 # künstlicher Lyrics-Korpus
+    python -m benchmarks.normalize_benchmark --songs 5000 --repeat 5
+"""
+import sys
+import time
+import random
+import argparse
+import regex
+from text_normalizer import TextNormalizer, default_normalizer, keep_markers, collapse_whitespace, collapse_blank_lines, allowed_characters
+
+# Bisherige Funktion aus utils.py: das Muster wird bei jedem Aufruf neu aufgebaut
+def legacy_remove_non_text_characters(text):
+    pattern = regex.compile(r'[^\p{L}\p{N}\s\.,\'#,\.\-_:;!"§$%&/()=?{[\]}\´`+*~#\'|<>]', regex.UNICODE)
+    return pattern.sub('', text)
+
+def legacy_normalize(text):
+    return legacy_remove_non_text_characters(text).strip()
+
+# Künstliche Songtexte mit Marken; etwa jeder dritte enthält Umlaute, Emojis und unerwünschte Sonderzeichen
+def synthetic_lyrics(index):
+    rng = random.Random(index)
+    words = ["love", "night", "heart", "fire", "dream", "light", "rain", "road", "baby", "tonight", "yeah", "don't"]
+    if index % 3 == 0:
+        words += ["Herz", "Straße", "corazón", "étoile", "ночь", "光", "🔥", "♥", "‘cause", "«yeah»"]
+    sections = []
+    for section in ("[Verse 1]", "[Chorus]", "(Verse 2)", "[Bridge]", "[Chorus]", "[Outro]"):
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(5, 9))) + rng.choice(["", ",", "!", " \t ", "...", "@"]) for _ in range(4)]
+        sections.append(section + "\n" + "\n".join(lines))
+    return "\n\n".join(sections) + "\n\n\n"
+
+def measure(normalize, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            normalize(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, default=2000, help="Anzahl künstlicher Songtexte")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen (es zählt die schnellste)")
+    args = parser.parse_args(argv)
+
+    texts = [synthetic_lyrics(index) for index in range(args.songs)]
+    megabytes = sum(len(text.encode('utf-8')) for text in texts) / 1e6
+
+    # Die Standardkette muss exakt dasselbe liefern wie die bisherige Funktion
+    mismatches = sum(legacy_normalize(text) != default_normalizer.normalize(text) for text in texts)
+    print(f"{len(texts)} Songtexte, {megabytes:.1f} MB, abweichende Ergebnisse: {mismatches}")
+
+    full_chain = TextNormalizer([keep_markers(), collapse_whitespace(), collapse_blank_lines(), allowed_characters()])
+    variants = [
+        ("vorher (regex pro Aufruf)", legacy_normalize),
+        ("nachher (Standardkette)", default_normalizer.normalize),
+        ("nachher (volle Kette)", full_chain.normalize),
+    ]
+    baseline = None
+    for label, normalize in variants:
+        seconds = measure(normalize, texts, args.repeat)
+        baseline = baseline or seconds
+        print(f"{label:<28} {megabytes / seconds:8.1f} MB/s  ({baseline / seconds:.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Micro-Benchmark: Parse-Zeit pro Songseite, bisherige Methode gegen song_parser.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.parse_benchmark fixtures/pages  # gespeicherte Songseiten (*.html)
+    python -m benchmarks.parse_benchmark --synthetic 200  # ohne Korpus, mit künstlichen Seiten
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+from bs4 import BeautifulSoup
+from song_parser import parse_song_html, HTML_PARSER
+
+LEGACY_CONTAINER_CLASS = 'bg-vinylBlack-darker w-full h-full flex flex-col sm:flex-col md:flex-col lg:flex-row xl:flex-row lg:mt-8 xl:mt-8 lg:ml-32 xl:ml-32 overflow-y-scroll items-center sm:items-center md:items-center lg:items-start xl:items-start'
+
+# Bisherige Extraktion aus fetch_song_data: kompletter Baum, Suche über den vollen Klassen-String
+def legacy_parse(html, song_url):
+    soup = BeautifulSoup(html, 'html.parser')
+    song_container = soup.find('div', class_=LEGACY_CONTAINER_CLASS)
+    if not song_container:
+        return {}
+    title_input = song_container.find('input')
+    title = title_input['value'] if title_input else None
+    genres = [a.get_text(strip=True).replace(",", "").replace(" ", "") for a in song_container.find_all('a', href=lambda href: href and '/style/' in href)]
+    lyrics_textarea = song_container.find('textarea')
+    lyrics = lyrics_textarea.get_text(strip=True) if lyrics_textarea else "Keine Lyrics gefunden"
+    return {"song_url": song_url, "title": title, "styles": genres or ["Keine Genres gefunden"], "lyrics": lyrics}
+
+# Künstliche Seite mit viel Ballast (Navigation, Skripte, Styles) um den eigentlichen Song-Container.
+# Kopfzeile und Seitenleiste enthalten eigene Eingabefelder und /style/-Links, die nicht zum Song gehören.
+def synthetic_page(index):
+    rng = random.Random(index)
+    words = ["love", "night", "fire", "heart", "dream", "light", "rain", "road"]
+    lyrics = "\n".join(
+        f"[{section}]\n" + "\n".join(" ".join(rng.choice(words) for _ in range(8)) for _ in range(4))
+        for section in ("Verse", "Chorus", "Verse", "Bridge", "Chorus")
+    )
+    noise = "".join(
+        f'<div class="flex items-center p-{i % 8}"><span class="text-sm">{rng.choice(words)}</span>'
+        f'<a href="/playlist/{i}">Playlist {i}</a><img src="/img/{i}.png"></div>'
+        for i in range(400)
+    )
+    scripts = "".join(f"<script>self.__next_f.push([1,\"{'x' * 2000}\"])</script>" for _ in range(20))
+    return (
+        f"<html><head><style>{'.c{color:red}' * 500}</style></head><body>"
+        f'<nav><input type="search" value=""><input type="email" value="user@example.com"><a href="/style/featured">Featured</a></nav>'
+        f'<aside><a href="/style/hyperpop">hyperpop</a><a href="/style/drill">drill</a><textarea></textarea></aside>{noise}'
+        f'<div class="{LEGACY_CONTAINER_CLASS}">'
+        f'<input value="Song {index}"><a href="/style/pop">pop, </a><a href="/style/dark rock">dark rock</a>'
+        f"<textarea>{lyrics}</textarea></div>{noise}{scripts}</body></html>"
+    )
+
+# Erwartungen je Seite (Dateiname ohne Endung), falls der Ordner eine expected.json enthält:
+# {"<name>": {"path": "markup" | "next_data" | "flight" | "browser", "song": {Titel, Styles, Lyrics}}}
+def load_expected(directory):
+    path = os.path.join(directory, 'expected.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def load_pages(directory):
+    pages = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
+                pages.append((filename, file.read()))
+    return pages
+
+def measure(parse, pages, repeat):
+    times = []
+    for name, html in pages:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            parse(html, name)
+            best = min(best, time.perf_counter() - started)
+        times.append(best)
+    return times
+
+def report(label, times):
+    print(f"{label:<28} mean={statistics.mean(times) * 1000:8.2f} ms  median={statistics.median(times) * 1000:8.2f} ms  "
+          f"max={max(times) * 1000:8.2f} ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Ordner mit gespeicherten Songseiten (*.html)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Anzahl künstlicher Seiten, falls kein Korpus vorhanden ist")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen pro Seite (es zählt die schnellste)")
+    args = parser.parse_args(argv)
+
+    expected = {}
+    if args.directory:
+        pages = load_pages(args.directory)
+        expected = load_expected(args.directory)
+    else:
+        pages = [(f"synthetic_{i}", synthetic_page(i)) for i in range(args.synthetic or 100)]
+    if not pages:
+        print("Keine Seiten gefunden.")
+        return 1
+
+    # Beide Varianten müssen auf dem Korpus dieselben Felder liefern
+    mismatches = 0
+    for name, html in pages:
+        legacy, current = legacy_parse(html, name), parse_song_html(html, name)
+        if legacy and (legacy["title"], legacy["lyrics"], legacy["styles"]) != (current.get("title"), current.get("lyrics"), current.get("styles")):
+            mismatches += 1
+        # Erwartete Felder gibt es für Seiten, deren Daten im gerenderten Markup stehen
+        page = expected.get(os.path.splitext(name)[0], {})
+        fields = page.get("song") if page.get("path") == "markup" else None
+        if fields is not None and {key: current.get(key) for key in fields} != fields:
+            print(f"{name}: erwartet {fields}, gelesen {current}")
+            mismatches += 1
+
+    print(f"{len(pages)} Seiten, Parser-Backend: {HTML_PARSER}, abweichende Ergebnisse: {mismatches}")
+    legacy_times = measure(legacy_parse, pages, args.repeat)
+    current_times = measure(parse_song_html, pages, args.repeat)
+    report("vorher (html.parser, voll)", legacy_times)
+    report("nachher (song_parser)", current_times)
+    print(f"Beschleunigung: {statistics.mean(legacy_times) / statistics.mean(current_times):.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
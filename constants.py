@@ -20,8 +20,51 @@ EXPECTED_KEYS = {
 }
 
 ####Training####
-#trainingdata
-TRAININGDATA_FILE = 'trainingdata.json'
+#trainingdata (JSON Lines, ein Song pro Zeile)
+TRAININGDATA_FILE = 'trainingdata.jsonl'
+# Bisheriges Format als ein JSON-Array, wird beim ersten Start übernommen und kann exportiert werden
+TRAININGDATA_LEGACY_FILE = 'trainingdata.json'
+# Fingerprint je Song (Inhalt + Einstellungen) für die inkrementelle Datenvorbereitung
+TRAININGDATA_INDEX_FILE = 'trainingdata_index.db'
+# Trainingsdaten werden gepuffert und alle n Einträge auf die Platte geschrieben
+PREPARE_SAVE_INTERVAL = 500
+# Prozesse für die Datenvorbereitung (None = alle CPU-Kerne, 1 = ohne Prozesspool)
+DEFAULT_PREPARE_WORKERS = None
+# Songs pro Block, der an einen Prozess geht
+PREPARE_CHUNK_SIZE = 256
+# Cache der Spracherkennung (Hash der Lyrics -> Sprache)
+LANGUAGE_CACHE_FILE = 'language_cache.db'
+# Erkannt wird nur eine Stichprobe dieser Länge, mit festem Seed (reproduzierbar)
+LANGUAGE_SAMPLE_CHARS = 600
+LANGUAGE_DETECT_SEED = 0
+# Durchläufe pro Erkennung (langdetect nimmt sonst 7, bei Songtexten ändert das am Ergebnis praktisch nichts)
+LANGUAGE_DETECT_TRIALS = 3
+# Fast gleiche Lyrics (Remixe, erneute Uploads) vor dem Training auslassen: ab dieser geschätzten
+# Jaccard-Ähnlichkeit der Wort-n-Gramme gilt ein Song als Duplikat (None = keine Prüfung)
+DEDUP_THRESHOLD = 0.8
+DEDUP_SHINGLE_SIZE = 3
+DEDUP_NUM_PERM = 128
+DEDUP_SEED = 1
+# Bericht der verworfenen Cluster, das Training lässt die Songs darin aus
+DUPLICATES_REPORT_FILE = 'duplicates.json'
+# Vorab tokenisierte Trainingsdaten (Token-IDs als Memory-Map), ein Unterordner je Tokenizer, max_length und Datenstand
+TOKEN_CACHE_DIR = 'token_cache'
+# Songs pro Aufruf des Tokenizers beim Aufbau des Caches
+TOKEN_CACHE_BATCH_SIZE = 1000
+# Batches nach Länge bündeln: jeweils so viele Batches zufälliger Songs werden nach Länge sortiert
+# und neu aufgeteilt, damit Songs ähnlicher Länge zusammen kommen (1 = nicht sortieren)
+BUCKET_POOL_BATCHES = 50
+# Textbereinigung der Trainingsdaten: erlaubte Zeichen (Inhalt einer regex-Zeichenklasse)
+NORMALIZER_ALLOWED_CHARACTERS = r'\p{L}\p{N}\s\.,\'#,\.\-_:;!"§$%&/()=?{[\]}\´`+*~#\'|<>'
+# Regelkette: eigene Ersetzungen [(Muster, Ersatz), ...], Abschnittsmarken wie [Chorus] schützen,
+# Leerraum zusammenfassen, danach alle Zeichen außerhalb der erlaubten Klasse entfernen
+NORMALIZER_CONFIG = {
+    "replacements": [],
+    "keep_markers": False,
+    "collapse_whitespace": False,
+    "allowed_characters": NORMALIZER_ALLOWED_CHARACTERS,
+    "strip": True
+}
 
 # Standardwerte für das Training
 DEFAULT_MODEL_NAME = "gpt2"
@@ -36,3 +79,60 @@ DEFAULT_LOGGING_STEPS = 100
 DEFAULT_SAVE_STEPS = 500
 DEFAULT_EVAL_STEPS = 500
 
+
+####Scraper####
+# Anzahl paralleler Headless-Chrome-Instanzen beim Song-Scraping
+DEFAULT_SCRAPER_WORKERS = 4
+# Maximale Wartezeit (Sekunden), bis eine Seite ihre Inhalte gerendert hat
+PAGE_LOAD_TIMEOUT = 15
+# Startseite, auf der die Playlist-Suche beginnt (z.B. für den lokalen Testserver überschreibbar)
+START_PAGE_URL = "https://suno.com"
+# CSS-Selektoren, auf die nach dem Laden einer Seite gewartet wird
+SONG_CONTAINER_SELECTOR = "textarea, a[href*='/style/']"
+PLAYLIST_LINK_SELECTOR = "a[href*='/playlist/']"
+SONG_LINK_SELECTOR = "a[href*='/song/']"
+# Zeiten pro Seitenaufruf (JSON Lines)
+PAGE_TIMINGS_FILE = f"{SONG_META_DIR}/page_timings.jsonl"
+# User-Agent für den direkten HTTP-Abruf ohne Browser
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+# Drosselung pro Host (Anfragen pro Sekunde und erlaubte Spitzen) für die Crawl-Engine
+DEFAULT_RATE_PER_HOST = 2.0
+DEFAULT_RATE_BURST = 4
+# Größe der Warteschlange zwischen URL-Quelle und Abruf-Workern (Gegendruck)
+DEFAULT_CRAWL_QUEUE_SIZE = 64
+# SQLite-Datei mit den Style-/Meta-Zuordnungen (JSON-Export beim Schließen oder mit python meta_store.py --export)
+META_STORE_FILE = f"{SONG_META_DIR}/meta_store.db"
+# Häufigkeiten der Styles und Meta-Tags (Eintrag -> Anzahl Songs)
+STYLE_COUNTS_FILE = f"{SONG_META_DIR}/style_counts.json"
+META_TAG_COUNTS_FILE = f"{SONG_META_DIR}/meta_tag_counts.json"
+# Persistenter Crawl-Frontier mit Wiederholungen (Versuche, Backoff in Sekunden)
+FRONTIER_FILE = f"{SONG_META_DIR}/frontier.db"
+FRONTIER_MAX_ATTEMPTS = 5
+FRONTIER_RETRY_BASE = 30
+FRONTIER_RETRY_MAX = 3600
+# Abgeholte URLs gehören dem Prozess, der sie abgeholt hat, solange er seinen Lease (Sekunden) erneuert;
+# erst danach (z.B. nach einem Absturz) gibt ein anderer Prozess sie wieder frei
+FRONTIER_LEASE_SECONDS = 120
+# Aktualisierungsintervall der Oberflächen (ms) und maximale Log-Zeilen pro Aktualisierung
+UI_REFRESH_MS = 100
+UI_MAX_LOG_LINES_PER_FRAME = 200
+# Zwischengespeicherter Pfad zum Chromedriver und dessen Gültigkeit in Sekunden (danach erneut auflösen)
+DRIVER_CACHE_FILE = f"{SONG_META_DIR}/chromedriver_path.json"
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 3600
+# Ressourcen, die im sparsamen Chrome-Profil nicht geladen werden (nur Text wird gelesen)
+DEFAULT_BLOCK_RESOURCES = True
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+    "*.mp3", "*.mp4", "*.m4a", "*.wav", "*.webm", "*.m3u8"
+]
+# Komprimiertes, inhaltsadressiertes Archiv der abgerufenen Songseiten (für die Re-Extraktion ohne Netzwerk)
+HTML_ARCHIVE_DIR = "html_archive"
+HTML_ARCHIVE_INDEX_FILE = f"{HTML_ARCHIVE_DIR}/index.db"
+DEFAULT_ARCHIVE_HTML = False
+# Song-Korpus aus komprimierten JSONL-Shards mit Offset-Index (ersetzt die Einzeldateien in songs/)
+CORPUS_DIR = "corpus"
+CORPUS_INDEX_NAME = "index.db"
+CORPUS_SHARD_SIZE = 64 * 1024 * 1024
+# Ausgabeordner der Shard-Worker beim verteilten Scrapen (je Worker ein Unterordner)
+WORKERS_DIR = "workers"
@@ -0,0 +1,241 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from constants import *
+
+class TokenBucket:
+    """Token-Bucket: erlaubt im Mittel `rate` Anfragen pro Sekunde und Spitzen bis `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class CrawlEngine:
+    """asyncio-Crawler für die Playlist-Suche und den Song-Abruf.
+
+    Die eigentlichen Abrufe sind blockierend (Selenium bzw. requests) und laufen im
+    übergebenen Executor, z.B. einem DriverPool. Die Engine begrenzt die Anzahl gleichzeitiger
+    Anfragen, drosselt pro Host über einen Token-Bucket und hält über eine begrenzte
+    Warteschlange Gegendruck. Alle Callbacks laufen im Thread der Engine, es gibt also genau
+    einen Schreiber.
+
+    Callbacks:
+        on_playlist(playlist_url, song_urls, error)
+        on_song(song_url, song_data, error)
+
+    Mit `pipeline=True` laufen Playlist-Suche und Song-Abruf gleichzeitig: was `on_playlist`
+    zurückgibt, wird sofort als Song eingeplant, während weitere Playlists gesucht werden.
+    """
+
+    def __init__(self, executor, fetch_playlist=None, fetch_song=None, on_playlist=None, on_song=None,
+                 max_in_flight=DEFAULT_SCRAPER_WORKERS, rate_per_host=DEFAULT_RATE_PER_HOST,
+                 burst=DEFAULT_RATE_BURST, queue_size=DEFAULT_CRAWL_QUEUE_SIZE, log_callback=print):
+        self.executor = executor
+        self.fetch_playlist = fetch_playlist
+        self.fetch_song = fetch_song
+        self.on_playlist = on_playlist
+        self.on_song = on_song
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.queue_size = queue_size
+        self.log = log_callback
+
+        self.thread = None
+        self.loop = None
+        self.main_task = None
+        self.resume_event = None
+        self.buckets = {}
+        self.stopped = False
+        self.paused = False
+
+    # Steuerung (aus beliebigen Threads aufrufbar)
+
+    def start(self, playlist_urls=(), song_urls=(), pipeline=False):
+        """Startet die Engine in einem eigenen Thread mit eigener Event-Loop."""
+        if self.is_running():
+            raise RuntimeError("Die Crawl-Engine läuft bereits.")
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, args=(list(playlist_urls), list(song_urls), pipeline), daemon=True)
+        self.thread.start()
+
+    def run(self, playlist_urls=(), song_urls=(), pipeline=False):
+        """Blockierende Variante von start() für Aufrufer, die bereits in einem Worker-Thread laufen."""
+        asyncio.run(self._main(list(playlist_urls), list(song_urls), pipeline))
+
+    def pause(self):
+        self.paused = True
+        self._call_in_loop(lambda: self.resume_event.clear())
+
+    def resume(self):
+        self.paused = False
+        self._call_in_loop(lambda: self.resume_event.set())
+
+    def stop(self):
+        """Bricht laufende und wartende Abrufe ab. Bereits laufende Executor-Aufrufe werden noch beendet."""
+        self.stopped = True
+        self._call_in_loop(lambda: self.main_task.cancel())
+
+    def join(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def _call_in_loop(self, callback):
+        loop = self.loop
+        if loop and not loop.is_closed() and self.main_task:
+            try:
+                loop.call_soon_threadsafe(callback)
+            except RuntimeError:
+                pass  # Loop wurde gerade beendet
+
+    # Interna (laufen in der Event-Loop)
+
+    async def _main(self, playlist_urls, song_urls, pipeline=False):
+        self.loop = asyncio.get_running_loop()
+        self.resume_event = asyncio.Event()
+        if not self.paused:
+            self.resume_event.set()
+        self.main_task = asyncio.current_task()
+        self.buckets = {}
+        try:
+            if pipeline:
+                await self._run_pipeline(playlist_urls, song_urls)
+                return
+            if playlist_urls and self.fetch_playlist:
+                await self._run_phase(playlist_urls, self.fetch_playlist, self.on_playlist)
+            if song_urls and self.fetch_song:
+                await self._run_phase(song_urls, self.fetch_song, self.on_song)
+        except asyncio.CancelledError:
+            self.log("Crawl-Engine wurde angehalten.")
+        finally:
+            self.main_task = None
+
+    async def _run_phase(self, urls, fetch, callback):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._worker(queue, fetch, callback)) for _ in range(self.max_in_flight)]
+        try:
+            # put() wartet, solange die Warteschlange voll ist (Gegendruck)
+            for url in urls:
+                await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    async def _worker(self, queue, fetch, callback):
+        while True:
+            url = await queue.get()
+            if url is None:
+                return
+            if self.stopped:
+                continue  # Warteschlange leeren, damit der Produzent nicht hängen bleibt
+            await self.resume_event.wait()
+            await self._bucket_for(url).acquire()
+            try:
+                result, error = await asyncio.wrap_future(self.executor.submit(fetch, url)), None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result, error = None, e
+            if callback:
+                try:
+                    callback(url, result, error)
+                except Exception as e:
+                    self.log(f"Fehler bei der Verarbeitung von {url}: {e}")
+
+    async def _run_pipeline(self, playlist_urls, song_urls):
+        """Ein Worker-Satz für beide Arten von URLs, gefundene Songs werden sofort eingeplant."""
+        self.pending = {"playlist": deque(), "song": deque()}
+        self.scheduled = set()
+        self.busy = 0
+        self.changed = asyncio.Condition()
+        self._schedule("playlist", playlist_urls)
+        self._schedule("song", song_urls)
+        workers = [asyncio.create_task(self._pipeline_worker(index)) for index in range(self.max_in_flight)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def _schedule(self, kind, urls):
+        for url in urls:
+            if (kind, url) not in self.scheduled:
+                self.scheduled.add((kind, url))
+                self.pending[kind].append(url)
+
+    # Worker 0 sucht bevorzugt Playlists, die übrigen holen bevorzugt Songs. Staut sich der
+    # Song-Rückstand über die Warteschlangengröße, hilft auch Worker 0 bei den Songs (Gegendruck).
+    def _pick(self, index):
+        songs_first = index > 0 or len(self.pending["song"]) >= self.queue_size
+        for kind in (("song", "playlist") if songs_first else ("playlist", "song")):
+            if self.pending[kind]:
+                return kind, self.pending[kind].popleft()
+        return None
+
+    async def _pipeline_worker(self, index):
+        fetchers = {"playlist": (self.fetch_playlist, self.on_playlist), "song": (self.fetch_song, self.on_song)}
+        while not self.stopped:
+            async with self.changed:
+                # Warten, solange andere Worker noch neue URLs liefern könnten
+                item = self._pick(index)
+                while item is None and self.busy > 0:
+                    await self.changed.wait()
+                    item = self._pick(index)
+                if item is None:
+                    self.changed.notify_all()
+                    return
+                self.busy += 1
+
+            kind, url = item
+            fetch, callback = fetchers[kind]
+            try:
+                await self.resume_event.wait()
+                await self._bucket_for(url).acquire()
+                try:
+                    result, error = await asyncio.wrap_future(self.executor.submit(fetch, url)), None
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result, error = None, e
+                if callback:
+                    try:
+                        discovered = callback(url, result, error)
+                        if kind == "playlist" and discovered:
+                            self._schedule("song", discovered)
+                    except Exception as e:
+                        self.log(f"Fehler bei der Verarbeitung von {url}: {e}")
+            finally:
+                async with self.changed:
+                    self.busy -= 1
+                    self.changed.notify_all()
+
+    def _bucket_for(self, url):
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        return self.buckets[host]
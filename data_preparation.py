@@ -1,105 +1,312 @@
 import os
+import sys
 import json
-from langdetect import detect  # Bibliothek zur Spracherkennung
+import argparse
 import time
-from utils import clean_song_data  # Importiere die Bereinigungsfunktion aus der utils.py
+import hashlib
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from language_detection import LanguageDetector, detect_sample
+from utils import clean_song_data, load_json  # Importiere die Bereinigungsfunktion aus der utils.py
+from training_data import TrainingDataWriter, scan_training_data, compact_training_data
+from near_duplicates import deduplicate_training_data
+from song_corpus import SongCorpus
 from constants import *
 
-def prepare_data(song_folder_path, title_key, lyrics_key, styles_key, metatag_key, language_key, detect_language, progress_callback, log_callback):
-    TRAININGDATA_FILE = 'trainingdata.json'
+class PreparationIndex:
+    """Merkt sich pro Dateiname den Fingerprint, mit dem der Song zuletzt vorbereitet wurde.
 
-    # Überprüfe, ob die Datei existiert, wenn nicht, erstelle sie
-    if not os.path.exists(TRAININGDATA_FILE) or os.path.getsize(TRAININGDATA_FILE) == 0:
-        with open(TRAININGDATA_FILE, 'w', encoding='utf-8') as file:
-            json.dump([], file, ensure_ascii=False, indent=4)
+    Der Fingerprint setzt sich aus dem Inhalts-Hash im Korpus und den gewählten Schlüsseln
+    zusammen. Stimmt er beim nächsten Lauf überein, wird der Song ohne Entpacken übersprungen.
+    Status 'ok' heißt, der Song steht in den Trainingsdaten, 'skipped' heißt, ihm fehlten Lyrics
+    oder Metatags.
+    """
 
-    # Lade bestehende Daten (falls vorhanden)
-    try:
-        with open(TRAININGDATA_FILE, 'r', encoding='utf-8') as file:
-            existing_data = json.load(file)
-    except json.JSONDecodeError:
-        log_callback(f"Fehler beim Laden von {TRAININGDATA_FILE}, Initialisiere als leeres Array.")
-        existing_data = []
+    def __init__(self, path=TRAININGDATA_INDEX_FILE):
+        self.lock = Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS prepared ("
+            " filename TEXT PRIMARY KEY,"
+            " song_id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def entries(self):
+        """Dict Dateiname -> (fingerprint, status)."""
+        with self.lock:
+            return {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT filename, fingerprint, status FROM prepared")}
+
+    def update(self, rows, removed=()):
+        """Trägt (filename, song_id, fingerprint, status) ein und löscht entfernte Dateinamen, in einem Commit."""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO prepared (filename, song_id, fingerprint, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(filename, song_id, fingerprint, status, now) for filename, song_id, fingerprint, status in rows]
+                )
+                self.conn.executemany("DELETE FROM prepared WHERE filename = ?", [(filename,) for filename in removed])
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Fingerprint aus Inhalts-Hash und Einstellungen: andere Schlüssel, Spracherkennung oder Textbereinigung erzwingen eine neue Bearbeitung
+def preparation_fingerprint(content_hash, settings):
+    return hashlib.sha256(f"{settings}\n{content_hash}".encode('utf-8')).hexdigest()
+
+# Einen Song bereinigen; läuft bei mehreren Prozessen im Worker und hängt daher nur von den Argumenten ab
+def prepare_song(song_data, json_file, keys, detect_language, language=None):
+    """Gibt (Eintrag, None) zurück oder (None, fehlendes Feld), wenn Lyrics oder Metatags fehlen.
+
+    `language` ist die bereits bekannte Sprache aus dem Cache, sonst wird sie hier erkannt.
+    """
+    title_key, lyrics_key, styles_key, metatag_key, language_key = keys
+    title = song_data.get(title_key, "No Title")
+    lyrics = song_data.get(lyrics_key, "")
+    styles = song_data.get(styles_key, [])
+    metatags = song_data.get(metatag_key, [])
+
+    # Wenn keine Lyrics oder Metatags vorhanden sind, überspringen
+    if not lyrics:
+        return None, "Lyrics"
+    if not metatags:
+        return None, "Metatags"
+
+    # Spracherkennung, falls aktiviert
+    if detect_language:
+        language = language or detect_sample(lyrics)
+    else:
+        language = song_data.get(language_key, "unknown")
 
-    # Liste der JSON-Dateien im Songs-Ordner
-    json_files = [f for f in os.listdir(song_folder_path) if f.endswith('.json')]
-    total_songs = len(json_files)
+    # Bereinigen und den Dateinamen hinzufügen
+    return clean_song_data({
+        "title": title,
+        "lyrics": lyrics,
+        "styles": styles,
+        "metatags": metatags,
+        "language": language,
+        "filename": json_file  # Dateiname
+    }), None
+
+def prepare_chunk(chunk, keys, detect_language):
+    return [prepare_song(song_data, json_file, keys, detect_language, language) for json_file, song_data, language in chunk]
+
+def prepare_data(corpus_dir, title_key, lyrics_key, styles_key, metatag_key, language_key, detect_language, progress_callback, log_callback,
+                 workers=DEFAULT_PREPARE_WORKERS, dedup_threshold=DEDUP_THRESHOLD, should_stop=None):
+    """Bereitet geänderte Songs auf und gibt (bearbeitet, gesamt) zurück.
+
+    Mit `workers` > 1 (None = alle CPU-Kerne) wird die Bereinigung in Blöcken zu PREPARE_CHUNK_SIZE
+    Songs auf einen Prozesspool verteilt. Die Ergebnisse werden in Korpus-Reihenfolge übernommen und
+    nur dieser Prozess schreibt Trainingsdaten und Index, das Ergebnis ist also dasselbe wie seriell.
+    Haben sich die Trainingsdaten geändert, wird danach der Duplikat-Bericht neu erstellt.
+
+    Gibt `should_stop()` True zurück, endet der Lauf nach dem aktuellen Block. Bereits übernommene
+    Songs bleiben gespeichert, der Rest wird beim nächsten Lauf bearbeitet.
+    """
+    # Songs aus dem Korpus lesen (ein bestehender songs-Ordner wird beim ersten Öffnen übernommen)
+    corpus = SongCorpus(corpus_dir)
+    total_songs = len(corpus)
 
     if total_songs == 0:
-        log_callback("Keine Songs im Verzeichnis gefunden.")
+        log_callback("Keine Songs im Korpus gefunden.")
+        corpus.close()
         return 0, 0
 
+    # Trainingsdaten werden nur angehängt; bekannt sind vorab nur die Dateinamen, nicht die Songs
+    writer = TrainingDataWriter()
+    latest, stale_lines = scan_training_data()
+    known = set(latest)
+    index = PreparationIndex()
+    prepared = index.entries()
+    # Sprachen kommen aus dem Cache; neu erkannte trägt nur dieser Prozess ein
+    detector = LanguageDetector() if detect_language else None
+    keys = (title_key, lyrics_key, styles_key, metatag_key, language_key)
+    settings = json.dumps(list(keys) + [bool(detect_language), NORMALIZER_CONFIG])
+    workers = workers or os.cpu_count() or 1
+
     # Initialisierung der Zähler
     processed_songs = 0
     skipped_existing = 0
     skipped_info = 0
+    seen = set()
+    pending = []  # Index-Zeilen, die erst nach dem Speichern der Trainingsdaten festgeschrieben werden
 
-    # Bearbeitung der Dateien
-    for json_file in json_files:
-        file_path = os.path.join(song_folder_path, json_file)
+    def flush():
+        # Erst die Trainingsdaten auf die Platte, dann den Index: nach einem Abbruch wird höchstens zu viel neu bearbeitet
+        writer.flush()
+        index.update(pending)
+        pending.clear()
 
-        log_callback(f"Bearbeite Song: {json_file}")
+    def is_changed(song_id, json_file, content_hash):
+        entry = prepared.get(json_file)
+        if entry is None or entry[0] != preparation_fingerprint(content_hash, settings):
+            return True
+        return entry[1] == 'ok' and json_file not in known  # Eintrag fehlt in den Trainingsdaten
 
-        # Prüfen, ob der Song bereits vorhanden ist (in der trainingdata.json)
-        if any(song.get('filename') == json_file for song in existing_data):
-            log_callback(f"Song bereits bearbeitet, wird übersprungen.")
-            skipped_existing += 1
-            # Fortschrittsbalken aktualisieren
-            progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
-            continue
-
-        with open(file_path, 'r', encoding='utf-8') as file:
-            song_data = json.load(file)
-
-        title = song_data.get(title_key, "No Title")
-        lyrics = song_data.get(lyrics_key, "")
-        styles = song_data.get(styles_key, [])
-        metatags = song_data.get(metatag_key, [])
-
-        # Wenn keine Lyrics vorhanden sind, überspringen
-        if not lyrics:
-            log_callback(f"Song hat keine Lyrics, wird übersprungen.")
-            skipped_info += 1
-            # Fortschrittsbalken aktualisieren
-            progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
-            continue
+    # Ergebnis eines bearbeiteten Songs übernehmen (immer in Korpus-Reihenfolge)
+    def apply(song_id, json_file, fingerprint, record, missing):
+        nonlocal processed_songs, skipped_info, stale_lines
+        log_callback(f"Bearbeite Song: {json_file}")
+        if json_file in prepared:
+            log_callback(f"Song wurde geändert, Eintrag wird ersetzt.")
 
-        # Wenn keine Metatags vorhanden sind, überspringen
-        if not metatags:
-            log_callback(f"Song hat keine Metatags, wird übersprungen.")
+        if record is None:
+            # Ohne Lyrics oder Metatags entfällt auch ein alter Eintrag
+            log_callback(f"Song hat keine {missing}, wird übersprungen.")
+            if json_file in known:
+                writer.remove(json_file)
+                known.discard(json_file)
+                stale_lines += 2
+            pending.append((json_file, song_id, fingerprint, 'skipped'))
             skipped_info += 1
-            # Fortschrittsbalken aktualisieren
-            progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
-            continue
-
-        # Spracherkennung, falls aktiviert
-        if detect_language:
-            try:
-                language = detect(lyrics)
-            except:
-                language = "unknown"
         else:
-            language = song_data.get(language_key, "unknown")
-
-        # Bereinigen und den Dateinamen hinzufügen
-        cleaned_song_data = clean_song_data({
-            "title": title,
-            "lyrics": lyrics,
-            "styles": styles,
-            "metatags": metatags,
-            "language": language,
-            "filename": json_file  # Dateiname
-        })
-
-        # Füge die Daten zu den vorhandenen hinzu
-        existing_data.append(cleaned_song_data)
-
-        # Schreibe die Daten sofort nach jedem Song
-        with open(TRAININGDATA_FILE, 'w', encoding='utf-8') as outfile:
-            json.dump(existing_data, outfile, ensure_ascii=False, indent=4)
-
-        processed_songs += 1
-        # Fortschrittsbalken aktualisieren
+            # Ein geänderter Song ersetzt seinen bisherigen Eintrag
+            if json_file in known:
+                stale_lines += 1
+            known.add(json_file)
+            writer.append(record)
+            pending.append((json_file, song_id, fingerprint, 'ok'))
+            processed_songs += 1
+            # Regelmäßig auf die Platte schreiben
+            if len(pending) >= PREPARE_SAVE_INTERVAL:
+                flush()
         progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
 
+    executor = None
+    in_flight = deque()  # (Songs des Blocks, Lyrics, Sprachen aus dem Cache, Future) in Abgabereihenfolge
+    chunk = []
+
+    def apply_results(entries, lyrics, cached, results):
+        if detector:
+            detector.store([(text, record['language']) for text, language, (record, _) in zip(lyrics, cached, results)
+                            if language is None and record is not None])
+        for (song_id, json_file, fingerprint), (record, missing) in zip(entries, results):
+            apply(song_id, json_file, fingerprint, record, missing)
+
+    def apply_oldest():
+        entries, lyrics, cached, future = in_flight.popleft()
+        apply_results(entries, lyrics, cached, future.result())
+
+    # Einen Block bearbeiten: seriell direkt, sonst im Prozesspool
+    def process(chunk, parallel):
+        nonlocal executor
+        entries = [entry for entry, _ in chunk]
+        lyrics = [song_data.get(lyrics_key, "") for _, song_data in chunk]
+        cached = detector.lookup(lyrics) if detector else [None] * len(chunk)
+        items = [(entry[1], song_data, language) for (entry, song_data), language in zip(chunk, cached)]
+        if not parallel:
+            apply_results(entries, lyrics, cached, prepare_chunk(items, keys, detect_language))
+            return
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        in_flight.append((entries, lyrics, cached, executor.submit(prepare_chunk, items, keys, detect_language)))
+        # Nur wenige Blöcke vorausschicken, damit nicht der ganze Korpus im Speicher landet
+        while len(in_flight) > 2 * workers:
+            apply_oldest()
+
+    cancelled = False
+    try:
+        # Bearbeitung der Songs, Shard für Shard; unveränderte Songs werden gar nicht erst entpackt
+        for song_id, json_file, content_hash, song_data in corpus.iter_entries(is_changed):
+            if should_stop and should_stop():
+                cancelled = True
+                break
+            seen.add(json_file)
+            fingerprint = preparation_fingerprint(content_hash, settings)
+
+            if song_data is None:
+                # Unverändert seit dem letzten Lauf
+                if prepared[json_file][1] == 'ok':
+                    skipped_existing += 1
+                else:
+                    skipped_info += 1
+                if not in_flight:
+                    progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
+                continue
+
+            if json_file in known and json_file not in prepared:
+                # Eintrag aus einer Version ohne Index: übernehmen statt neu bearbeiten
+                log_callback(f"Song bereits bearbeitet, wird übersprungen: {json_file}")
+                pending.append((json_file, song_id, fingerprint, 'ok'))
+                skipped_existing += 1
+                if not in_flight:
+                    progress_callback(processed_songs, total_songs, skipped_existing, skipped_info)
+                continue
+
+            chunk.append(((song_id, json_file, fingerprint), song_data))
+            if len(chunk) >= PREPARE_CHUNK_SIZE:
+                process(chunk, workers > 1)
+                chunk = []
+
+        # Rest: wenige Songs ohne Pool direkt bearbeiten, sonst als letzten Block abgeben
+        if chunk and not cancelled:
+            process(chunk, executor is not None)
+        while in_flight and not cancelled:
+            apply_oldest()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    # Songs, die nicht mehr im Korpus sind, aus Trainingsdaten und Index entfernen (nach einem Abbruch
+    # ist nicht bekannt, welche Songs noch kommen würden)
+    removed = [] if cancelled else [filename for filename in known | set(prepared) if filename not in seen]
+    for filename in removed:
+        if filename in known:
+            writer.remove(filename)
+            stale_lines += 2
+    if removed:
+        log_callback(f"{len(removed)} nicht mehr vorhandene Songs entfernt.")
+    writer.close()
+    index.update(pending, removed)
+
+    # Ersetzte und gelöschte Zeilen einmal pro Lauf aus der Datei entfernen
+    if stale_lines:
+        compact_training_data()
+
+    # Fast gleiche Lyrics nur neu bestimmen, wenn sich Daten oder Schwelle geändert haben
+    if cancelled:
+        log_callback(f"Datenvorbereitung abgebrochen, {processed_songs} Songs übernommen.")
+    elif dedup_threshold is not None:
+        report = load_json(DUPLICATES_REPORT_FILE) if os.path.exists(DUPLICATES_REPORT_FILE) else {}
+        if processed_songs or removed or stale_lines or report.get("threshold") != dedup_threshold:
+            deduplicate_training_data(threshold=dedup_threshold, log_callback=log_callback)
+
+    if detector:
+        detector.close()
+    index.close()
+    corpus.close()
     return processed_songs, total_songs
+
+# Trainingsdaten ohne Oberfläche neu aufbauen, z.B. auf einem Rechner mit vielen Kernen:
+#   python data_preparation.py --workers 32
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trainingsdaten aus dem Song-Korpus vorbereiten")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PREPARE_WORKERS, help="Anzahl der Prozesse (Standard: Anzahl der CPU-Kerne)")
+    parser.add_argument("--title-key", default="title")
+    parser.add_argument("--lyrics-key", default="lyrics")
+    parser.add_argument("--styles-key", default="styles")
+    parser.add_argument("--metatags-key", required=True)
+    parser.add_argument("--language-key", default="language", help="Feld mit der Sprache, wenn --no-detect gesetzt ist")
+    parser.add_argument("--no-detect", action="store_true", help="Sprache nicht erkennen, sondern aus dem Song lesen")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD, help="Ähnlichkeit, ab der Lyrics als Duplikat gelten")
+    parser.add_argument("--no-dedup", action="store_true", help="Keine Duplikat-Prüfung")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    processed, total = prepare_data(
+        CORPUS_DIR, args.title_key, args.lyrics_key, args.styles_key, args.metatags_key, args.language_key, not args.no_detect,
+        lambda *counts: None, lambda message: None, workers=args.workers, dedup_threshold=None if args.no_dedup else args.dedup_threshold
+    )
+    print(f"{processed} von {total} Songs bearbeitet in {time.perf_counter() - started:.1f} s.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
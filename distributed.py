@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+from song_corpus import SongCorpus
+from song_writer import SongWriter
+from constants import *
+
+# Verteiltes Scraping: K unabhängige Worker (Prozesse oder Rechner mit gemeinsamem Dateisystem) laden je
+# einen disjunkten Teil der Songs, aufgeteilt über einen stabilen Hash der Song-ID (utils.shard_of).
+# Jeder Worker schreibt nur in seinen eigenen Ordner, `merge` führt die Ergebnisse im Haupt-Korpus zusammen.
+#
+#   python scraper_engine.py playlists                 # Playlists einmal zentral sammeln
+#   python scraper_engine.py songs --shard 0/4         # auf Rechner/Prozess 0 ... 3
+#   python distributed.py merge                        # danach alle Worker-Ordner zusammenführen
+#   python distributed.py run --shards 4 --workers 2   # oder alles lokal: Worker starten und zusammenführen
+
+def worker_dir(shard_index, shard_count):
+    return os.path.join(WORKERS_DIR, f"shard-{shard_index}-of-{shard_count}")
+
+# "i/k" für argparse
+def parse_shard(value):
+    try:
+        shard_index, shard_count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültiger Shard '{value}', erwartet z.B. 0/4")
+    if shard_count < 1 or not 0 <= shard_index < shard_count:
+        raise argparse.ArgumentTypeError(f"Ungültiger Shard '{value}', Index muss zwischen 0 und {shard_count - 1} liegen")
+    return shard_index, shard_count
+
+def find_worker_dirs(root=WORKERS_DIR):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name, "corpus"))
+    )
+
+def merge(worker_dirs, log_callback=print):
+    """Übernimmt die Songs aller Worker in den Haupt-Korpus und exportiert Style-/Meta-Zuordnungen neu.
+
+    Bereits übernommene, unveränderte Songs werden übersprungen, ein erneuter Aufruf ist also harmlos.
+    Gibt die Anzahl der neu übernommenen Songs zurück.
+    """
+    writer = SongWriter()
+    merged = 0
+    total = 0
+    try:
+        for directory in worker_dirs:
+            worker_corpus = SongCorpus(os.path.join(directory, "corpus"), legacy_dir=None)
+            worker_merged = 0
+            for song_id, _, song_data in worker_corpus.iter_songs():
+                if song_id in writer.corpus and writer.corpus.get(song_id) == song_data:
+                    continue
+                writer.save(song_data.get('song_url') or song_id, song_data)
+                worker_merged += 1
+            worker_corpus.close()
+            merged += worker_merged
+            log_callback(f"{directory}: {worker_merged} Songs übernommen.")
+        total = len(writer.corpus)
+    finally:
+        writer.close()
+    log_callback(f"Zusammenführung abgeschlossen: {merged} Songs, Korpus enthält {total} Songs.")
+    return merged
+
+# Kommandozeilen-Runner neben dieser Datei, damit die Worker auch aus einem anderen Arbeitsverzeichnis starten
+SCRAPER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper_engine.py")
+
+# Alle Shards lokal als eigene Prozesse starten, auf ihr Ende warten und die Ergebnisse zusammenführen;
+# die Worker schreiben relativ zum aktuellen Arbeitsverzeichnis
+def run_local(shard_count, scraper_args=(), log_callback=print):
+    started = time.perf_counter()
+    processes = [
+        subprocess.Popen([sys.executable, SCRAPER_SCRIPT, "songs", "--shard", f"{shard_index}/{shard_count}", *scraper_args])
+        for shard_index in range(shard_count)
+    ]
+    failed = sum(1 for process in processes if process.wait() != 0)
+    log_callback(f"{shard_count} Worker beendet in {time.perf_counter() - started:.1f} s, davon {failed} mit Fehler.")
+    merge([worker_dir(shard_index, shard_count) for shard_index in range(shard_count)], log_callback)
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verteiltes Scrapen über Hash-Shards der Song-IDs")
+    commands = parser.add_subparsers(dest="command", required=True)
+    merge_parser = commands.add_parser("merge", help="Worker-Ergebnisse in den Haupt-Korpus übernehmen")
+    merge_parser.add_argument("worker_dirs", nargs="*", help=f"Worker-Ordner (Standard: alle unter {WORKERS_DIR}/)")
+    run_parser = commands.add_parser("run", help="Shard-Worker lokal starten und danach zusammenführen")
+    run_parser.add_argument("--shards", type=int, required=True, help="Anzahl der Worker-Prozesse")
+    # Unbekannte Argumente gehen unverändert an scraper_engine.py, z.B. --workers 2 --no-http
+    args, scraper_args = parser.parse_known_args(argv)
+
+    if args.command == "merge":
+        if scraper_args:
+            parser.error(f"Unbekannte Argumente: {' '.join(scraper_args)}")
+        merge(args.worker_dirs or find_worker_dirs())
+        return 0
+    return 1 if run_local(args.shards, scraper_args) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import queue
+import threading
+from functools import partial
+from concurrent.futures import Executor, Future
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+from webdriver_manager.chrome import ChromeDriverManager
+from utils import save_json
+from constants import *
+
+# Pfad zum Chromedriver auflösen, ohne bei jedem Start den Webdriver-Manager (Netzwerk) zu fragen
+def resolve_driver_path(cache_file=DRIVER_CACHE_FILE, max_age=DRIVER_CACHE_MAX_AGE, log_callback=print):
+    """Liefert den zwischengespeicherten Treiberpfad, solange die Datei existiert und nicht zu alt ist."""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            cached = json.load(file)
+        if os.path.isfile(cached['path']) and time.time() - cached['resolved_at'] < max_age:
+            return cached['path']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    started = time.perf_counter()
+    driver_path = ChromeDriverManager().install()
+    log_callback(f"Chromedriver aufgelöst in {time.perf_counter() - started:.2f} s: {driver_path}")
+    try:
+        save_json({"path": driver_path, "resolved_at": time.time()}, cache_file)
+    except OSError:
+        pass
+    return driver_path
+
+# Headless-Chrome mit dem angegebenen Treiber starten
+def create_driver(driver_path, block_resources=False):
+    """Mit `block_resources` lädt Chrome keine Bilder, Medien, Schriften und Stylesheets."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    if block_resources:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.media_stream": 2,
+        })
+    service = Service(driver_path)
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    if block_resources:
+        # Übrige Ressourcen direkt im Netzwerk-Stack verwerfen
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
+    return driver
+
+# Übertragene Bytes der aktuellen Seite laut Resource-Timing-API (Dokument plus nachgeladene Ressourcen)
+def page_transfer_size(driver):
+    try:
+        size = driver.execute_script(
+            "const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));"
+            "return entries.reduce((sum, entry) => sum + (entry.transferSize || 0), 0);"
+        )
+        return int(size or 0)
+    except Exception:
+        return None
+
+# Warten, bis ein Element im DOM auftaucht, statt pauschal zu schlafen
+def wait_for_element(driver, css_selector, timeout=PAGE_LOAD_TIMEOUT):
+    """Gibt True zurück, sobald das Element vorhanden ist, sonst nach `timeout` Sekunden False."""
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, css_selector)))
+        return True
+    except TimeoutException:
+        return False
+
+class LazyDriver:
+    """Startet Chrome erst beim ersten Zugriff, z.B. wenn der HTTP-Abruf nicht ausreicht."""
+
+    def __init__(self, get_driver_path, block_resources=False, on_start=None):
+        self._get_driver_path = get_driver_path  # Treiber erst auflösen, wenn Chrome wirklich gebraucht wird
+        self._block_resources = block_resources
+        self._on_start = on_start
+        self._driver = None
+
+    def __getattr__(self, name):
+        if self._driver is None:
+            started = time.perf_counter()
+            self._driver = create_driver(self._get_driver_path(), self._block_resources)
+            if self._on_start:
+                self._on_start(time.perf_counter() - started)
+        return getattr(self._driver, name)
+
+    def quit(self):
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
+class DriverPool(Executor):
+    """Executor aus N Threads, von denen jeder eine eigene Headless-Chrome-Instanz besitzt.
+
+    `submit(fn, *args)` ruft `fn(driver, *args)` im nächsten freien Worker auf und liefert ein Future.
+    So lassen sich die blockierenden Selenium-Abrufe z.B. aus der asyncio-Crawl-Engine heraus parallelisieren.
+    Die Browser bleiben bis `shutdown()` geöffnet und können so über mehrere Phasen hinweg genutzt werden.
+    """
+
+    def __init__(self, size, log_callback=print, lazy_drivers=False, block_resources=False, page_stats=None):
+        self.size = max(1, int(size))
+        self.lazy_drivers = lazy_drivers
+        self.block_resources = block_resources
+        self.page_stats = page_stats
+        self.log = log_callback
+        self.tasks = queue.Queue()
+        self.workers = []
+        self.alive = 0
+        self.lock = threading.Lock()
+        self.shutting_down = False
+        self.driver_path = None
+
+    def get_driver_path(self):
+        # Treiber nur einmal auflösen (und zwischenspeichern), damit nicht N Threads gleichzeitig herunterladen
+        with self.lock:
+            if self.driver_path is None:
+                self.driver_path = resolve_driver_path(log_callback=self.log)
+            return self.driver_path
+
+    def start(self):
+        if not self.lazy_drivers:
+            self.get_driver_path()
+        self.alive = self.size
+        for index in range(self.size):
+            worker = threading.Thread(target=self._worker, args=(index,), daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        self.log(f"Webdriver-Pool mit {self.size} Instanzen gestartet.")
+
+    def submit(self, fn, /, *args, **kwargs):
+        if self.shutting_down:
+            raise RuntimeError("Der Webdriver-Pool wurde bereits beendet.")
+        future = Future()
+        if self.workers and self.alive == 0:
+            future.set_exception(RuntimeError("Kein Webdriver verfügbar."))
+            return future
+        self.tasks.put((future, fn, args, kwargs))
+        return future
+
+    def is_alive(self):
+        return not self.shutting_down and self.alive > 0
+
+    def cancel_pending(self):
+        """Verwirft wartende Aufträge, die Browser bleiben geöffnet."""
+        self._cancel_pending()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutting_down = True
+        if cancel_futures:
+            self._cancel_pending()
+        for _ in self.workers:
+            self.tasks.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+    def _cancel_pending(self, error=None):
+        while True:
+            try:
+                task = self.tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                continue
+            future = task[0]
+            if error and future.set_running_or_notify_cancel():
+                future.set_exception(error)
+            else:
+                future.cancel()
+
+    def _driver_started(self, index, seconds):
+        self.log(f"Webdriver {index + 1} gestartet in {seconds:.2f} s.")
+        if self.page_stats:
+            self.page_stats.record_startup(seconds)
+
+    def _worker(self, index):
+        driver = None
+        try:
+            if self.lazy_drivers:
+                driver = LazyDriver(self.get_driver_path, self.block_resources, partial(self._driver_started, index))
+            else:
+                started = time.perf_counter()
+                driver = create_driver(self.get_driver_path(), self.block_resources)
+                self._driver_started(index, time.perf_counter() - started)
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    break
+                future, fn, args, kwargs = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(driver, *args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+        except Exception as e:
+            self.log(f"Webdriver {index + 1} konnte nicht gestartet werden: {e}")
+        finally:
+            if driver:
+                driver.quit()
+            with self.lock:
+                self.alive -= 1
+                last_worker = self.alive == 0
+            # Ohne laufende Worker würden wartende Futures nie fertig
+            if last_worker:
+                self._cancel_pending(RuntimeError("Kein Webdriver verfügbar."))
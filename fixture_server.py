@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import random
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from utils import save_json
+from constants import *
+
+# Lokaler Testserver mit künstlichen Playlist- und Songseiten, z.B. um mehrere Shard-Worker ohne
+# Netzwerkzugriff gegeneinander laufen zu lassen:
+#   python fixture_server.py --songs 60 --playlists 4 --write-manual
+#   python distributed.py run --shards 3 --workers 2
+# Die Playlist-Suche selbst (mit Chrome) lässt sich mit `scraper_engine.py playlists --start-url http://127.0.0.1:8765` testen.
+# Die Songseiten enthalten die Daten wie suno.com in __NEXT_DATA__, der HTTP-Abruf kommt also ohne Chrome aus.
+# Mit --pages werden stattdessen gespeicherte Songseiten ausgeliefert (/song/<name> -> <name>.html), z.B.
+# fixtures/pages mit je einer Seite pro Extraktionsweg von http_fetcher.
+
+WORDS = ["love", "night", "fire", "heart", "dream", "light", "rain", "road", "stars", "ocean"]
+STYLES = ["pop", "dark rock", "synthwave", "lofi", "metal", "jazz", "trap", "folk"]
+
+def fixture_song(song_id):
+    rng = random.Random(song_id)
+    lyrics = "\n".join(
+        f"[{section}]\n" + "\n".join(" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(4))
+        for section in ("Verse", "Chorus", "Verse", "Chorus")
+    )
+    return {
+        "id": song_id,
+        "title": f"Fixture Song {song_id}",
+        "metadata": {"prompt": lyrics, "tags": ", ".join(rng.sample(STYLES, 2))}
+    }
+
+def song_ids_of_playlist(playlist_index, songs, playlists):
+    # Jeder Song liegt in einer Playlist, jeder fünfte zusätzlich in der nächsten (Duplikate über Playlists)
+    return [f"fixture{i:05d}" for i in range(songs) if i % playlists == playlist_index or (i % 5 == 0 and (i + 1) % playlists == playlist_index)]
+
+# Playlists samt Songs im Format von MANUAL_PLAYLISTS_FILE, z.B. damit Shard-Worker ohne Playlist-Suche starten können
+def manual_playlists(base_url, songs, playlists):
+    return {
+        f"{base_url}/playlist/{index}": {"song_urls": [f"{base_url}/song/{song_id}" for song_id in song_ids_of_playlist(index, songs, playlists)]}
+        for index in range(playlists)
+    }
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    songs = 50
+    playlists = 4
+    pages_dir = None  # Ordner mit gespeicherten Songseiten, None = künstliche Seiten
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "":
+            links = "".join(f'<a href="/playlist/{index}">Playlist {index}</a>' for index in range(self.playlists))
+            self.respond(f"<html><body>{links}</body></html>")
+        elif path.startswith("/playlist/"):
+            playlist_index = int(path.rsplit("/", 1)[1])
+            links = "".join(f'<a href="/song/{song_id}">{song_id}</a>' for song_id in song_ids_of_playlist(playlist_index, self.songs, self.playlists))
+            self.respond(f"<html><body>{links}</body></html>")
+        elif path.startswith("/song/") and self.pages_dir:
+            page_path = os.path.join(self.pages_dir, os.path.basename(path) + ".html")
+            if not os.path.isfile(page_path):
+                self.send_error(404)
+                return
+            with open(page_path, 'r', encoding='utf-8') as file:
+                self.respond(file.read())
+        elif path.startswith("/song/"):
+            clip = fixture_song(path.rsplit("/", 1)[1])
+            next_data = json.dumps({"props": {"pageProps": {"clip": clip}}})
+            self.respond(f'<html><body><div id="app"></div><script id="__NEXT_DATA__" type="application/json">{next_data}</script></body></html>')
+        else:
+            self.send_error(404)
+
+    def respond(self, html):
+        body = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keine Zeile pro Anfrage
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lokaler Testserver mit künstlichen Playlists und Songs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--songs", type=int, default=50)
+    parser.add_argument("--playlists", type=int, default=4)
+    parser.add_argument("--pages", help="Ordner mit gespeicherten Songseiten (*.html) statt künstlicher Songs")
+    parser.add_argument("--write-manual", action="store_true", help=f"Playlists samt Songs nach {MANUAL_PLAYLISTS_FILE} schreiben")
+    args = parser.parse_args(argv)
+
+    FixtureHandler.songs = args.songs
+    FixtureHandler.playlists = args.playlists
+    FixtureHandler.pages_dir = args.pages
+    base_url = f"http://127.0.0.1:{args.port}"
+    if args.write_manual:
+        save_json(manual_playlists(base_url, args.songs, args.playlists), MANUAL_PLAYLISTS_FILE)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FixtureHandler)
+    print(f"Testserver läuft auf {base_url} ({args.songs} Songs, {args.playlists} Playlists)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+from threading import Lock, Thread, Event
+from constants import *
+
+# Zustände einer URL im Frontier
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+class CrawlFrontier:
+    """Persistente Liste aller zu crawlenden URLs mit Zustand und Anzahl der Versuche.
+
+    Mehrere Prozesse können denselben Frontier nutzen: abgeholte URLs ("in_flight") gehören dem
+    abholenden Prozess (`owner`), solange dessen Lease läuft. Ein Hintergrund-Thread erneuert ihn;
+    bricht der Prozess ab, laufen seine Leases aus und die URLs werden wieder "pending". Beim
+    Schließen gibt der Prozess nicht abgearbeitete URLs sofort frei. Fehlgeschlagene URLs werden
+    mit exponentiellem Backoff erneut versucht, bis `max_attempts` erreicht ist. Erledigte URLs
+    werden nie wieder ausgegeben.
+    """
+
+    def __init__(self, db_path=FRONTIER_FILE, max_attempts=FRONTIER_MAX_ATTEMPTS,
+                 retry_base=FRONTIER_RETRY_BASE, retry_max=FRONTIER_RETRY_MAX, lease_seconds=FRONTIER_LEASE_SECONDS):
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lock = Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " url TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " parent TEXT,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " owner TEXT,"
+            " lease_until REAL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_due ON frontier (kind, status, next_attempt_at)")
+        self.conn.commit()
+        self.recover()
+        # Leases regelmäßig verlängern, solange der Frontier offen ist
+        self.closed = Event()
+        self.heartbeat = Thread(target=self.renew_leases, daemon=True)
+        self.heartbeat.start()
+
+    def recover_expired(self):
+        """Setzt in_flight-URLs mit abgelaufenem Lease zurück auf pending (Aufrufer hält Sperre und Transaktion)."""
+        now = time.time()
+        return self.conn.execute(
+            "UPDATE frontier SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?)",
+            (PENDING, now, IN_FLIGHT, now)
+        ).rowcount
+
+    def recover(self):
+        """Gibt URLs frei, deren Abruf durch einen Abbruch nicht beendet wurde (nur mit abgelaufenem Lease)."""
+        with self.lock:
+            with self.conn:
+                return self.recover_expired()
+
+    def renew(self):
+        """Verlängert den Lease aller URLs, die dieser Prozess gerade abarbeitet."""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                return self.conn.execute(
+                    "UPDATE frontier SET lease_until = ? WHERE owner = ? AND status = ?", (now + self.lease_seconds, self.owner, IN_FLIGHT)
+                ).rowcount
+
+    def renew_leases(self):
+        while not self.closed.wait(self.lease_seconds / 3):
+            try:
+                self.renew()
+            except sqlite3.Error:
+                pass  # z.B. kurz gesperrt, der nächste Durchlauf versucht es erneut
+
+    def release(self):
+        """Gibt nicht abgearbeitete URLs dieses Prozesses sofort wieder frei."""
+        with self.lock:
+            with self.conn:
+                return self.conn.execute(
+                    "UPDATE frontier SET status = ?, owner = NULL, lease_until = NULL, updated_at = ? WHERE owner = ? AND status = ?",
+                    (PENDING, time.time(), self.owner, IN_FLIGHT)
+                ).rowcount
+
+    def add(self, urls, kind, parent=None):
+        """Fügt neue URLs als pending hinzu. Bereits bekannte URLs bleiben unverändert."""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (url, kind, parent, status, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [(url, kind, parent, PENDING, now) for url in urls]
+                )
+                return self.conn.total_changes - before
+
+    def add_new(self, urls, kind, parent=None, claim=False):
+        """Wie add(), gibt aber die tatsächlich neu aufgenommenen URLs zurück (global dedupliziert).
+
+        Mit `claim` werden sie direkt für diesen Prozess als in_flight eingetragen, z.B. wenn sie
+        sofort abgerufen werden.
+        """
+        now = time.time()
+        status, owner, lease_until = (IN_FLIGHT, self.owner, now + self.lease_seconds) if claim else (PENDING, None, None)
+        added = []
+        with self.lock:
+            with self.conn:
+                for url in dict.fromkeys(urls):
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO frontier (url, kind, parent, status, owner, lease_until, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (url, kind, parent, status, owner, lease_until, now)
+                    )
+                    if cursor.rowcount:
+                        added.append(url)
+        return added
+
+    def claim_due(self, kind, limit=None):
+        """Gibt fällige pending-URLs zurück und markiert sie als in_flight für diesen Prozess.
+
+        URLs anderer Prozesse mit abgelaufenem Lease werden vorher wieder freigegeben.
+        """
+        now = time.time()
+        query = "SELECT url FROM frontier WHERE kind = ? AND status = ? AND next_attempt_at <= ? ORDER BY rowid"
+        params = [kind, PENDING, now]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            with self.conn:
+                self.recover_expired()
+                urls = [row[0] for row in self.conn.execute(query, params)]
+                self.conn.executemany(
+                    "UPDATE frontier SET status = ?, owner = ?, lease_until = ?, updated_at = ? WHERE url = ?",
+                    [(IN_FLIGHT, self.owner, now + self.lease_seconds, now, url) for url in urls]
+                )
+        return urls
+
+    def mark_done(self, url):
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE frontier SET status = ?, attempts = attempts + 1, last_error = NULL, owner = NULL, lease_until = NULL, "
+                    "updated_at = ? WHERE url = ?",
+                    (DONE, time.time(), url)
+                )
+
+    def mark_failed(self, url, error):
+        """Verbucht einen Fehlversuch. Gibt True zurück, wenn die URL später erneut versucht wird."""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                row = self.conn.execute("SELECT attempts FROM frontier WHERE url = ?", (url,)).fetchone()
+                attempts = (row[0] if row else 0) + 1
+                retry = attempts < self.max_attempts
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+                self.conn.execute(
+                    "UPDATE frontier SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, owner = NULL, lease_until = NULL, "
+                    "updated_at = ? WHERE url = ?",
+                    (PENDING if retry else FAILED, attempts, now + delay if retry else 0, str(error), now, url)
+                )
+        return retry
+
+    def parent_of(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT parent FROM frontier WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def open_by_parent(self, kind):
+        """Anzahl noch offener URLs (pending oder in_flight) je übergeordneter URL."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT parent, COUNT(*) FROM frontier WHERE kind = ? AND status IN (?, ?) GROUP BY parent",
+                (kind, PENDING, IN_FLIGHT)
+            ).fetchall()
+        return dict(rows)
+
+    def next_due_in(self, kind):
+        """Sekunden bis zur nächsten fälligen pending-URL oder None, wenn keine mehr offen ist.
+
+        URLs, die ein anderer Prozess abarbeitet, zählen mit ihrem Lease-Ende: läuft er ab, werden
+        sie wieder fällig.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE lease_until END) FROM frontier "
+                "WHERE kind = ? AND (status = ? OR (status = ? AND owner IS NOT ?))",
+                (PENDING, kind, PENDING, IN_FLIGHT, self.owner)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def counts(self, kind):
+        """Anzahl der URLs je Zustand."""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM frontier WHERE kind = ? GROUP BY status", (kind,)).fetchall()
+        counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def reset(self, kind):
+        """Vergisst alle URLs einer Art, wenn keine mehr offen ist (auch nicht bei einem anderen Prozess).
+
+        Damit sammelt z.B. ein neuer Lauf die Playlists erneut ein. Gibt die endgültig fehlgeschlagenen
+        URLs als Liste von (URL, Versuche, letzter Fehler) zurück, damit der Aufrufer sie melden kann,
+        oder None, wenn noch URLs offen sind und nichts gelöscht wurde.
+        """
+        with self.lock:
+            with self.conn:
+                self.recover_expired()
+                open_count = self.conn.execute(
+                    "SELECT COUNT(*) FROM frontier WHERE kind = ? AND status IN (?, ?)", (kind, PENDING, IN_FLIGHT)
+                ).fetchone()[0]
+                if open_count:
+                    return None
+                failed = self.conn.execute(
+                    "SELECT url, attempts, last_error FROM frontier WHERE kind = ? AND status = ? ORDER BY rowid", (kind, FAILED)
+                ).fetchall()
+                self.conn.execute("DELETE FROM frontier WHERE kind = ?", (kind,))
+        return failed
+
+    def close(self):
+        self.closed.set()
+        self.heartbeat.join()
+        self.release()
+        with self.lock:
+            self.conn.close()
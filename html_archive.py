@@ -0,0 +1,135 @@
+import os
+import sys
+import gzip
+import time
+import hashlib
+import sqlite3
+import argparse
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+from http_fetcher import extract_song_from_html
+from song_writer import SongWriter
+from utils import atomic_open
+from constants import *
+
+class HtmlArchive:
+    """Speichert das rohe HTML jeder abgerufenen Songseite gzip-komprimiert unter seinem SHA-256.
+
+    Gleiche Seiten landen so nur einmal auf der Platte. Ein SQLite-Index ordnet jeder URL den
+    zuletzt gespeicherten Inhalt zu, damit eine geänderte Extraktion später ohne erneutes
+    Scrapen auf alle Seiten angewendet werden kann (siehe `reextract`).
+    """
+
+    def __init__(self, root=HTML_ARCHIVE_DIR, index_path=HTML_ARCHIVE_INDEX_FILE):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.lock = Lock()
+        self.conn = sqlite3.connect(index_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " content_hash TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def object_path(self, content_hash):
+        return os.path.join(self.root, "objects", content_hash[:2], content_hash[2:] + ".html.gz")
+
+    def store(self, url, html):
+        """Legt das HTML ab (falls noch nicht vorhanden) und verknüpft es mit der URL. Gibt den Hash zurück."""
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.object_path(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomar schreiben: kein halbes Objekt nach einem Absturz
+            with atomic_open(path) as file:
+                file.write(gzip.compress(data, compresslevel=6))
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, content_hash, fetched_at) VALUES (?, ?, ?)",
+                    (url, content_hash, time.time())
+                )
+        return content_hash
+
+    def load(self, content_hash):
+        return read_object(self.object_path(content_hash))
+
+    def pages(self):
+        """Liste aller (url, Objektpfad) in Speicherreihenfolge."""
+        with self.lock:
+            rows = self.conn.execute("SELECT url, content_hash FROM pages ORDER BY rowid").fetchall()
+        return [(url, self.object_path(content_hash)) for url, content_hash in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def read_object(path):
+    with gzip.open(path, 'rb') as file:
+        return file.read().decode('utf-8')
+
+# Läuft in den Worker-Prozessen: eine archivierte Seite erneut auswerten
+def extract_archived_page(page):
+    url, path = page
+    try:
+        return url, extract_song_from_html(read_object(path), url), None
+    except Exception as e:
+        return url, {}, str(e)
+
+def reextract(workers=None, log_callback=print):
+    """Wertet alle archivierten Seiten mit der aktuellen Extraktion neu aus.
+
+    Das Parsen läuft in einem Prozess-Pool, geschrieben wird nur im Hauptprozess über den SongWriter:
+    Song-Korpus, MetaStore und die daraus exportierten Mapping-Dateien.
+    Gibt (aktualisiert, ohne Ergebnis) zurück.
+    """
+    archive = HtmlArchive()
+    pages = archive.pages()
+    archive.close()
+    log_callback(f"{len(pages)} archivierte Seiten werden neu ausgewertet...")
+
+    writer = SongWriter()
+    updated = empty = 0
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for url, song_data, error in executor.map(extract_archived_page, pages, chunksize=32):
+                if not song_data:
+                    empty += 1
+                    log_callback(f"Keine Song-Daten in {url}" + (f": {error}" if error else ""))
+                    continue
+                writer.save(url, song_data)
+                updated += 1
+                if updated % 1000 == 0:
+                    log_callback(f"{updated} Songs aktualisiert...")
+    finally:
+        writer.close(recount=True)
+    log_callback(f"Re-Extraktion abgeschlossen: {updated} Songs aktualisiert, {empty} ohne Ergebnis, "
+                 f"{time.perf_counter() - started:.1f} s.")
+    return updated, empty
+
+# Neue Extraktion auf alle archivierten Seiten anwenden: python html_archive.py --reextract [--workers N]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archiv der rohen Songseiten")
+    parser.add_argument("--reextract", action="store_true", help="Song-Korpus und Mapping-Dateien aus dem Archiv neu erzeugen")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl der Prozesse (Standard: Anzahl der CPU-Kerne)")
+    args = parser.parse_args(argv)
+
+    if not args.reextract:
+        archive = HtmlArchive()
+        print(f"Archivierte Seiten: {len(archive)}")
+        archive.close()
+        return 0
+    reextract(args.workers)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
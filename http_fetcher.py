@@ -0,0 +1,150 @@
+import re
+import sys
+import json
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from song_parser import parse_song_html, parse_scripts
+from utils import extract_song_id_from_url
+from constants import *
+
+# Styles so normalisieren wie die Texte der /style/-Links auf der gerenderten Seite
+def normalize_styles(styles):
+    return [style.replace(",", "").replace(" ", "") for style in styles if style.strip()]
+
+# Next.js-Streaming-Daten (self.__next_f.push([1, "..."])) zu einem Text zusammensetzen
+def decode_next_flight_chunks(soup):
+    chunks = []
+    for script in soup.find_all('script'):
+        text = script.string or ""
+        start = text.find('self.__next_f.push(')
+        if start == -1:
+            continue
+        try:
+            payload = json.loads(text[start + len('self.__next_f.push('):text.rfind(')')])
+        except ValueError:
+            continue
+        chunks.extend(part for part in payload if isinstance(part, str))
+    return "".join(chunks)
+
+# Erstes JSON-Objekt im Text finden, das mit {"id":"<song_id>" beginnt
+def find_clip_in_text(text, song_id):
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r'\{\s*"id"\s*:\s*"%s"' % re.escape(song_id), text):
+        try:
+            clip, _ = decoder.raw_decode(text, match.start())
+            if isinstance(clip, dict):
+                return clip
+        except ValueError:
+            pass
+    return None
+
+# Rekursiv ein Objekt mit passender ID in eingebetteten Daten suchen
+def find_clip_in_data(data, song_id):
+    if isinstance(data, dict):
+        if data.get('id') == song_id and ('metadata' in data or 'title' in data):
+            return data
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        clip = find_clip_in_data(value, song_id)
+        if clip:
+            return clip
+    return None
+
+def song_data_from_clip(clip, song_url):
+    metadata = clip.get('metadata') or {}
+    lyrics = metadata.get('prompt') or clip.get('lyrics') or ""
+    tags = metadata.get('tags') or clip.get('display_tags') or ""
+    styles = normalize_styles(tags.split(",")) if isinstance(tags, str) else normalize_styles(tags)
+    if not clip.get('title') or not lyrics:
+        return {}
+    return {
+        "song_url": song_url,
+        "title": clip['title'],
+        "styles": styles or ["Keine Genres gefunden"],
+        "lyrics": lyrics.strip()
+    }
+
+def extract_song_from_html(html, song_url):
+    """Liest Titel, Styles und Lyrics aus dem vom Server gelieferten HTML. Leeres Dict, wenn nichts gefunden wird."""
+    soup = parse_scripts(html)
+    song_id = extract_song_id_from_url(song_url)
+
+    # 1. Eingebettete Seitendaten (klassisches __NEXT_DATA__)
+    next_data = soup.find('script', id='__NEXT_DATA__')
+    if next_data and next_data.string:
+        try:
+            clip = find_clip_in_data(json.loads(next_data.string), song_id)
+        except ValueError:
+            clip = None
+        if clip:
+            song_data = song_data_from_clip(clip, song_url)
+            if song_data:
+                return song_data
+
+    # 2. Gestreamte Daten des App-Routers
+    clip = find_clip_in_text(decode_next_flight_chunks(soup), song_id)
+    if clip:
+        song_data = song_data_from_clip(clip, song_url)
+        if song_data:
+            return song_data
+
+    # 3. Bereits serverseitig gerendertes Markup
+    song_data = parse_song_html(html, song_url)
+    if song_data.get('title') and song_data.get('lyrics') != "Keine Lyrics gefunden":
+        return song_data
+
+    return {}
+
+class HttpSongFetcher:
+    """Ruft Songseiten ohne Browser über eine Session mit Keep-Alive-Verbindungen ab."""
+
+    def __init__(self, pool_size=DEFAULT_SCRAPER_WORKERS, timeout=PAGE_LOAD_TIMEOUT, page_stats=None, archive=None):
+        self.timeout = timeout
+        self.page_stats = page_stats
+        self.archive = archive  # optionales HtmlArchive für erfolgreich ausgewertete Seiten
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": HTTP_USER_AGENT, "Accept-Language": "en-US,en;q=0.9"})
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def fetch_html(self, url):
+        return self.get(url).text
+
+    def fetch(self, song_url):
+        """Gibt die Song-Daten zurück oder ein leeres Dict, wenn die Extraktion fehlschlägt."""
+        started = time.perf_counter()
+        try:
+            response = self.get(song_url)
+        except requests.RequestException:
+            return {}
+        downloaded = time.perf_counter()
+        song_data = extract_song_from_html(response.text, song_url)
+        if self.page_stats:
+            self.page_stats.record(song_url, downloaded - started, 0.0, time.perf_counter() - downloaded, bool(song_data),
+                                   transferred_bytes=len(response.content))
+        if song_data and self.archive:
+            self.archive.store(song_url, response.text)
+        return song_data
+
+    def close(self):
+        self.session.close()
+
+# Manueller Test gegen den lokalen Server mit gespeicherten Seiten (automatisch: tests/test_http_fetcher.py):
+#   python fixture_server.py --pages fixtures/pages --port 8000
+#   python http_fetcher.py http://127.0.0.1:8000/song/flight-0002
+if __name__ == "__main__":
+    fetcher = HttpSongFetcher(pool_size=1)
+    for url in sys.argv[1:]:
+        print(json.dumps(fetcher.fetch(url), ensure_ascii=False, indent=4))
+    fetcher.close()
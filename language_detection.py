@@ -0,0 +1,158 @@
+import re
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+from threading import Lock
+from langdetect import DetectorFactory
+from langdetect.detector_factory import PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+from constants import *
+
+# Meta-Tags wie [Verse] oder [Chorus] sagen nichts über die Sprache aus
+META_TAG_PATTERN = re.compile(r'\[[^\]]*\]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Profile werden einmal pro Prozess geladen (das dauert deutlich länger als eine Erkennung)
+_factory = None
+
+def get_factory():
+    global _factory
+    if _factory is None:
+        factory = DetectorFactory()
+        factory.load_profile(PROFILES_DIRECTORY)
+        _factory = factory
+    return _factory
+
+def sample_text(text, sample_chars=LANGUAGE_SAMPLE_CHARS):
+    """Begrenzte Stichprobe: ohne Meta-Tags, je ein Drittel vom Anfang, aus der Mitte und vom Ende."""
+    text = WHITESPACE_PATTERN.sub(' ', META_TAG_PATTERN.sub(' ', text)).strip()
+    if len(text) <= sample_chars:
+        return text
+    part = sample_chars // 3
+    middle = (len(text) - part) // 2
+    return " ".join((text[:part], text[middle:middle + part], text[-part:]))
+
+def detect_sample(text, sample_chars=LANGUAGE_SAMPLE_CHARS, seed=LANGUAGE_DETECT_SEED):
+    """Sprache einer Stichprobe des Textes, bei gleichem Text und Seed immer dieselbe. "unknown", wenn nichts erkannt wird."""
+    factory = get_factory()
+    factory.seed = seed
+    detector = factory.create()
+    detector.n_trial = LANGUAGE_DETECT_TRIALS
+    detector.set_max_text_length(sample_chars)
+    detector.append(sample_text(text, sample_chars))
+    try:
+        return detector.detect()
+    except LangDetectException:
+        return "unknown"
+
+class LanguageDetector:
+    """Spracherkennung mit dauerhaftem Cache nach dem Hash des Textes.
+
+    Erkannt wird nur eine Stichprobe von `sample_chars` Zeichen mit festem Seed, das Ergebnis ist
+    also reproduzierbar. Stichprobengröße, Durchläufe und Seed gehen in den Cache-Schlüssel ein,
+    ein geänderter Wert führt daher zu einer neuen Erkennung statt zu veralteten Einträgen.
+    """
+
+    def __init__(self, cache_path=LANGUAGE_CACHE_FILE, sample_chars=LANGUAGE_SAMPLE_CHARS, seed=LANGUAGE_DETECT_SEED):
+        self.sample_chars = sample_chars
+        self.seed = seed
+        self.lock = Lock()
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS languages ("
+            " text_hash TEXT PRIMARY KEY,"
+            " language TEXT NOT NULL,"
+            " detected_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.sample_chars}:{LANGUAGE_DETECT_TRIALS}:{self.seed}\n{text}".encode('utf-8')).hexdigest()
+
+    def lookup(self, texts):
+        """Liste der Sprachen aus dem Cache, None für noch nicht erkannte Texte."""
+        keys = [self.key(text) for text in texts]
+        found = {}
+        with self.lock:
+            # In Blöcken abfragen, SQLite begrenzt die Anzahl der Parameter
+            for start in range(0, len(keys), 500):
+                block = keys[start:start + 500]
+                found.update(self.conn.execute(
+                    f"SELECT text_hash, language FROM languages WHERE text_hash IN ({','.join('?' * len(block))})", block
+                ).fetchall())
+        return [found.get(key) for key in keys]
+
+    def store(self, results):
+        """Übernimmt (Text, Sprache)-Paare in den Cache, in einem Commit."""
+        now = time.time()
+        rows = [(self.key(text), language, now) for text, language in results]
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO languages (text_hash, language, detected_at) VALUES (?, ?, ?)", rows)
+
+    def detect_batch(self, texts):
+        """Sprachen für viele Texte; nur Texte, die nicht im Cache stehen, werden (einmal) erkannt."""
+        languages = self.lookup(texts)
+        missing = {}
+        for text, language in zip(texts, languages):
+            if language is None and text not in missing:
+                missing[text] = detect_sample(text, self.sample_chars, self.seed)
+        if missing:
+            self.store(missing.items())
+        return [language if language is not None else missing[text] for text, language in zip(texts, languages)]
+
+    def detect(self, text):
+        return self.detect_batch([text])[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Vergleich mit der bisherigen Erkennung über den ganzen Text: python language_detection.py --benchmark
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spracherkennung mit Cache")
+    parser.add_argument("--benchmark", action="store_true", help="Mit langdetect.detect auf den Trainingsdaten vergleichen")
+    parser.add_argument("--limit", type=int, default=500, help="Anzahl der Songs für den Vergleich")
+    args = parser.parse_args(argv)
+
+    if not args.benchmark:
+        detector = LanguageDetector()
+        with detector.lock:
+            count = detector.conn.execute("SELECT COUNT(*) FROM languages").fetchone()[0]
+        print(f"Spracherkennungen im Cache: {count}")
+        detector.close()
+        return 0
+
+    from langdetect import detect
+    from training_data import iter_training_data
+    texts = [record['lyrics'] for _, record in zip(range(args.limit), iter_training_data())]
+    if not texts:
+        print("Keine Trainingsdaten gefunden.")
+        return 1
+    # Profile beider Varianten laden, bevor gemessen wird
+    get_factory()
+    detect("warm up")
+
+    started = time.perf_counter()
+    full = []
+    for text in texts:
+        try:
+            full.append(detect(text))
+        except LangDetectException:
+            full.append("unknown")
+    full_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sampled = [detect_sample(text) for text in texts]
+    sample_seconds = time.perf_counter() - started
+
+    agreement = sum(a == b for a, b in zip(full, sampled)) / len(texts)
+    print(f"{len(texts)} Songs: ganzer Text {full_seconds:.2f} s, Stichprobe {sample_seconds:.2f} s "
+          f"({full_seconds / sample_seconds:.1f}x), Übereinstimmung {agreement:.1%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
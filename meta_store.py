@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import sqlite3
+from threading import Lock
+from utils import load_json, save_json
+from vocabulary import Vocabulary
+from constants import *
+
+class MetaStore:
+    """SQLite-Speicher für die Style- und Meta-Tag-Zuordnungen aller gescrapten Songs.
+
+    Pro Song wird nur eine Zeile eingefügt (im WAL-Modus absturzsicher), statt bei jedem Song
+    die kompletten Mapping-Dateien neu zu schreiben. Die bisherigen JSON-Dateien werden bei
+    Bedarf mit `export_json()` erzeugt, damit nachgelagerte Leser unverändert funktionieren.
+    `PRAGMA user_version` ist 1, solange Änderungen noch nicht exportiert sind; die gespeicherten
+    Häufigkeiten passen dann nicht mehr zum Speicher (z.B. nach einem Absturz) und werden neu gezählt.
+    """
+
+    def __init__(self, db_path=META_STORE_FILE):
+        self.db_path = db_path
+        self.lock = Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS song_meta ("
+            " song_url TEXT PRIMARY KEY,"
+            " styles TEXT NOT NULL,"
+            " meta_tags TEXT NOT NULL)"
+        )
+        self.conn.commit()
+        self.dirty = self.conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        if self.song_count() == 0:
+            self.import_json()
+
+    def song_count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM song_meta").fetchone()[0]
+
+    def add_song(self, song_url, styles, meta_tags):
+        """Speichert (oder ersetzt) die Zuordnung eines Songs in O(1).
+
+        Gibt die bisherige Zuordnung (styles, meta_tags) zurück, bei einem neuen Song None.
+        """
+        with self.lock:
+            previous = self.conn.execute("SELECT styles, meta_tags FROM song_meta WHERE song_url = ?", (song_url,)).fetchone()
+            self.mark_dirty()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO song_meta (song_url, styles, meta_tags) VALUES (?, ?, ?)",
+                (song_url, json.dumps(styles, ensure_ascii=False), json.dumps(meta_tags, ensure_ascii=False))
+            )
+            self.conn.commit()
+        return (json.loads(previous[0]), json.loads(previous[1])) if previous else None
+
+    # Erste Änderung seit dem letzten Export vermerken (Aufruf unter self.lock)
+    def mark_dirty(self):
+        if not self.dirty:
+            self.conn.execute("PRAGMA user_version = 1")
+            self.dirty = True
+
+    def iter_songs(self):
+        """Liefert (song_url, styles, meta_tags) in Einfügereihenfolge."""
+        with self.lock:
+            rows = self.conn.execute("SELECT song_url, styles, meta_tags FROM song_meta ORDER BY rowid").fetchall()
+        for song_url, styles, meta_tags in rows:
+            yield song_url, json.loads(styles), json.loads(meta_tags)
+
+    # Vorhandene Mapping-Dateien einmalig übernehmen
+    def import_json(self):
+        song_styles_mapping = load_json(SONG_STYLES_MAPPING_FILE) or {}
+        song_meta_mapping = load_json(SONG_META_MAPPING_FILE) or {}
+        rows = [
+            (song_url, json.dumps(styles, ensure_ascii=False), json.dumps(song_meta_mapping.get(song_url, []), ensure_ascii=False))
+            for song_url, styles in song_styles_mapping.items()
+        ]
+        rows += [
+            (song_url, json.dumps([], ensure_ascii=False), json.dumps(meta_tags, ensure_ascii=False))
+            for song_url, meta_tags in song_meta_mapping.items() if song_url not in song_styles_mapping
+        ]
+        if rows:
+            with self.lock:
+                self.mark_dirty()
+                self.conn.executemany("INSERT OR IGNORE INTO song_meta (song_url, styles, meta_tags) VALUES (?, ?, ?)", rows)
+                self.conn.commit()
+
+    def build_vocabularies(self):
+        """Zählt Styles und Meta-Tags über alle Songs neu. Die Reihenfolge der bisherigen Listen bleibt erhalten."""
+        styles = Vocabulary(load_json(STYLES_FILE) or [])
+        meta_tags = Vocabulary(load_json(META_TAGS_FILE) or [])
+        for _, song_styles, song_meta_tags in self.iter_songs():
+            styles.update(song_styles)
+            meta_tags.update(song_meta_tags)
+        return styles, meta_tags
+
+    def load_vocabularies(self):
+        """Lädt die zuletzt exportierten Vokabulare samt Häufigkeiten.
+
+        Nur wenn sie nicht zum Speicher passen (nicht exportierte Änderungen oder keine Häufigkeiten
+        vorhanden), wird einmal neu gezählt.
+        """
+        has_counts = os.path.exists(STYLE_COUNTS_FILE) and os.path.exists(META_TAG_COUNTS_FILE)
+        if self.dirty or (not has_counts and self.song_count() > 0):
+            return self.build_vocabularies()
+        return Vocabulary.load(STYLES_FILE, STYLE_COUNTS_FILE), Vocabulary.load(META_TAGS_FILE, META_TAG_COUNTS_FILE)
+
+    def export_json(self, styles=None, meta_tags=None):
+        """Schreibt Mappings, Gesamtlisten und Häufigkeiten als JSON.
+
+        Ohne übergebene Vokabulare werden die gespeicherten geladen (siehe `load_vocabularies`).
+        """
+        if styles is None or meta_tags is None:
+            styles, meta_tags = self.load_vocabularies()
+
+        song_styles_mapping = {}
+        song_meta_mapping = {}
+        for song_url, song_styles, song_meta_tags in self.iter_songs():
+            song_styles_mapping[song_url] = song_styles
+            song_meta_mapping[song_url] = song_meta_tags
+
+        save_json(song_styles_mapping, SONG_STYLES_MAPPING_FILE)
+        save_json(song_meta_mapping, SONG_META_MAPPING_FILE)
+        styles.save(STYLES_FILE, STYLE_COUNTS_FILE)
+        meta_tags.save(META_TAGS_FILE, META_TAG_COUNTS_FILE)
+        with self.lock:
+            self.conn.execute("PRAGMA user_version = 0")
+            self.dirty = False
+        return [STYLES_FILE, SONG_STYLES_MAPPING_FILE, META_TAGS_FILE, SONG_META_MAPPING_FILE]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# JSON-Dateien manuell erzeugen: python meta_store.py --export [--recount]
+if __name__ == "__main__":
+    if "--export" in sys.argv:
+        store = MetaStore()
+        if "--recount" in sys.argv:
+            store.export_json(*store.build_vocabularies())
+        else:
+            store.export_json()
+        print(f"{store.song_count()} Songs exportiert.")
+        store.close()
+    else:
+        print("Verwendung: python meta_store.py --export [--recount]")
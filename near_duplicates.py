@@ -0,0 +1,153 @@
+import os
+import re
+import sys
+import time
+import zlib
+import argparse
+import numpy as np
+from utils import load_json, save_json
+from training_data import iter_training_data
+from constants import *
+
+# Meta-Tags wie [Chorus] sind in fast jedem Song gleich und zählen nicht zum Text
+META_TAG_PATTERN = re.compile(r'\[[^\]]*\]')
+WORD_PATTERN = re.compile(r'\w+')
+
+# Primzahl knapp unter 2^32: Signaturen passen in uint32, (a * x + b) bleibt mit a < 2^31 unter 2^64
+MERSENNE_PRIME = 4294967291
+
+def lyric_shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """Menge der Wort-n-Gramme eines Textes als 32-Bit-Hashes (klein geschrieben, ohne Meta-Tags)."""
+    words = WORD_PATTERN.findall(META_TAG_PATTERN.sub(' ', text).lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode('utf-8'))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """MinHash-Signaturen mit `num_perm` Hashfunktionen (a * x + b) mod p, reproduzierbar über den Seed."""
+
+    def __init__(self, num_perm=DEDUP_NUM_PERM, seed=DEDUP_SEED):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint64)
+
+    def signature(self, shingles):
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self.a, hashes) + self.b[:, None]) % MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+def lsh_params(threshold, num_perm, false_negative_weight=0.9):
+    """(Bänder, Zeilen pro Band) mit dem kleinsten gewichteten Fehler aus falschen Kandidaten und verpassten Paaren.
+
+    Falsche Kandidaten kosten nur einen Signaturvergleich, verpasste Paare bleiben dagegen im
+    Training; deshalb zählen verpasste Paare stärker.
+    """
+    steps = np.linspace(0, 1, 201)
+
+    def error(params):
+        bands, rows = params
+        candidate = 1 - (1 - steps ** rows) ** bands  # Wahrscheinlichkeit, in einem gemeinsamen Bucket zu landen
+        false_positive = np.where(steps < threshold, candidate, 0).mean()
+        false_negative = np.where(steps >= threshold, 1 - candidate, 0).mean()
+        return (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+
+    return min(((bands, num_perm // bands) for bands in range(1, num_perm + 1)), key=error)
+
+def find_clusters(signatures, threshold, num_perm=DEDUP_NUM_PERM):
+    """Gruppen ähnlicher Signaturen als Listen von Indizes, jeweils aufsteigend sortiert.
+
+    Die Songs werden der Reihe nach einem Vertreter zugeordnet: Ein Song, der einem früheren
+    Vertreter ähnlich genug ist, kommt in dessen Gruppe, sonst wird er selbst Vertreter. Jeder
+    Song einer Gruppe erreicht also die Schwelle gegenüber dem ersten (dem behaltenen); Ketten
+    wie A≈B, B≈C ohne A≈C landen nicht in einer Gruppe.
+
+    Kandidaten liefert ein LSH-Index: jedes Band der Signatur ist ein Bucket-Schlüssel, verglichen
+    wird mit allen Vertretern, die einen Bucket mit dem Song teilen. Nur Vertreter kommen in die
+    Buckets, bei vielen identischen Texten bleibt der Aufwand also klein. Bestätigt wird über den
+    geschätzten Jaccard-Wert (Anteil gleicher Signaturwerte); gibt es mehrere passende Vertreter,
+    gewinnt der ähnlichste.
+    """
+    bands, rows = lsh_params(threshold, num_perm)
+    buckets = [{} for _ in range(bands)]
+    clusters = {}
+    for index, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+        candidates = sorted({representative for band, key in enumerate(keys) for representative in buckets[band].get(key, ())})
+        if candidates:
+            similarity = np.mean(np.stack([signatures[candidate] for candidate in candidates]) == signature, axis=1)
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                clusters[candidates[best]].append(index)
+                continue
+        clusters[index] = [index]
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+def find_near_duplicates(path=TRAININGDATA_FILE, threshold=DEDUP_THRESHOLD, num_perm=DEDUP_NUM_PERM, shingle_size=DEDUP_SHINGLE_SIZE,
+                         log_callback=print):
+    """Liefert Cluster fast gleicher Lyrics in den Trainingsdaten.
+
+    Jeder Cluster ist ein Dict mit dem behaltenen Song (der erste in den Trainingsdaten) und den
+    verworfenen samt geschätzter Ähnlichkeit zum behaltenen.
+    """
+    hasher = MinHasher(num_perm)
+    filenames = []
+    signatures = []
+    for record in iter_training_data(path):
+        shingles = lyric_shingles(record.get('lyrics', ''), shingle_size)
+        filenames.append(record.get('filename'))
+        signatures.append(hasher.signature(shingles) if shingles else None)
+        if len(filenames) % 10000 == 0:
+            log_callback(f"{len(filenames)} Signaturen berechnet...")
+
+    clusters = []
+    for members in find_clusters(signatures, threshold, num_perm):
+        kept = members[0]
+        clusters.append({
+            "kept": filenames[kept],
+            "dropped": [
+                {"filename": filenames[index], "similarity": round(float(np.mean(signatures[index] == signatures[kept])), 3)}
+                for index in members[1:]
+            ]
+        })
+    return clusters
+
+def deduplicate_training_data(path=TRAININGDATA_FILE, report_path=DUPLICATES_REPORT_FILE, threshold=DEDUP_THRESHOLD, log_callback=print):
+    """Schreibt den Bericht der verworfenen Duplikate und gibt deren Anzahl zurück.
+
+    Die Trainingsdaten selbst bleiben vollständig; beim Laden für das Training werden die
+    Dateinamen aus dem Bericht ausgelassen (siehe `load_dropped_duplicates`).
+    """
+    started = time.perf_counter()
+    clusters = find_near_duplicates(path, threshold, log_callback=log_callback)
+    dropped = sum(len(cluster["dropped"]) for cluster in clusters)
+    save_json({
+        "threshold": threshold,
+        "num_perm": DEDUP_NUM_PERM,
+        "shingle_size": DEDUP_SHINGLE_SIZE,
+        "dropped_songs": dropped,
+        "clusters": sorted(clusters, key=lambda cluster: -len(cluster["dropped"]))
+    }, report_path, ensure_ascii=False)
+    log_callback(f"Duplikate: {dropped} Songs in {len(clusters)} Clustern verworfen (Schwelle {threshold}), "
+                 f"{time.perf_counter() - started:.1f} s. Bericht: {report_path}")
+    return dropped
+
+def load_dropped_duplicates(report_path=DUPLICATES_REPORT_FILE):
+    """Dateinamen der verworfenen Duplikate aus dem letzten Bericht (leer, wenn es keinen gibt)."""
+    report = load_json(report_path) if os.path.exists(report_path) else {}
+    return {song["filename"] for cluster in report.get("clusters", []) for song in cluster["dropped"]}
+
+# Duplikate neu bestimmen, z.B. mit anderer Schwelle: python near_duplicates.py --threshold 0.7
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fast gleiche Lyrics in den Trainingsdaten finden")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD, help="Geschätzte Jaccard-Ähnlichkeit, ab der ein Song als Duplikat gilt")
+    parser.add_argument("--report", default=DUPLICATES_REPORT_FILE, help="Ausgabedatei für den Bericht")
+    args = parser.parse_args(argv)
+    deduplicate_training_data(report_path=args.report, threshold=args.threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+from functools import partial
+from selenium.webdriver.common.by import By
+from driver_pool import DriverPool, wait_for_element, page_transfer_size
+from crawl_engine import CrawlEngine
+from telemetry import PageStats
+from http_fetcher import HttpSongFetcher
+from song_parser import parse_song_html
+from song_writer import SongWriter
+from song_corpus import SongCorpus
+from distributed import worker_dir, parse_shard
+from html_archive import HtmlArchive
+from frontier import CrawlFrontier, PENDING, DONE, FAILED
+from utils import *
+from constants import *
+
+# Song-Daten abrufen
+def fetch_song_data(driver, song_url, timeout=PAGE_LOAD_TIMEOUT, page_stats=None, archive=None):
+    """Ruft die Song-Daten von der Songseite ab. Mit `archive` wird das gerenderte HTML aufbewahrt."""
+    started = time.perf_counter()
+    driver.get(song_url)
+    navigated = time.perf_counter()
+
+    # Nur so lange warten, bis der Song-Container gerendert ist
+    ready = wait_for_element(driver, SONG_CONTAINER_SELECTOR, timeout)
+    rendered = time.perf_counter()
+
+    html = driver.page_source
+    song_data = parse_song_html(html, song_url)
+    if archive:
+        archive.store(song_url, html)
+
+    if page_stats:
+        page_stats.record(song_url, navigated - started, rendered - navigated, time.perf_counter() - rendered, ready,
+                          transferred_bytes=page_transfer_size(driver))
+
+    return song_data
+
+# Song-Daten zuerst per HTTP abrufen, Chrome nur verwenden, wenn die Extraktion fehlschlägt
+def fetch_song_data_http_first(driver, song_url, http_fetcher, timeout=PAGE_LOAD_TIMEOUT, page_stats=None, archive=None):
+    song_data = http_fetcher.fetch(song_url)
+    if song_data:
+        return song_data
+    return fetch_song_data(driver, song_url, timeout, page_stats, archive)
+
+# Seite laden und alle Links zum Selektor sammeln (ohne Duplikate)
+def collect_links(driver, page_url, css_selector, timeout=PAGE_LOAD_TIMEOUT, page_stats=None):
+    started = time.perf_counter()
+    driver.get(page_url)
+    navigated = time.perf_counter()
+    ready = wait_for_element(driver, css_selector, timeout)
+    rendered = time.perf_counter()
+
+    links = driver.find_elements(By.CSS_SELECTOR, css_selector)
+    urls = list(set([link.get_attribute("href") for link in links]))  # Duplikate entfernen
+
+    if page_stats:
+        page_stats.record(page_url, navigated - started, rendered - navigated, time.perf_counter() - rendered, ready,
+                          transferred_bytes=page_transfer_size(driver))
+    return urls
+
+# Song-URLs vereinheitlichen und Duplikate entfernen (Reihenfolge bleibt erhalten)
+def canonicalize_urls(urls):
+    return list(dict.fromkeys(canonicalize_url(url) for url in urls))
+
+# Manuelle Playlists laden: {playlist_url: {"song_urls": [...]}}, {playlist_url: [...]} oder eine Liste von Playlist-URLs
+def load_manual_playlists():
+    manual = load_json(MANUAL_PLAYLISTS_FILE) or {}
+    if isinstance(manual, list):
+        manual = {playlist_url: [] for playlist_url in manual}
+    playlists = {}
+    for playlist_url, data in manual.items():
+        song_urls = data.get('song_urls', []) if isinstance(data, dict) else data
+        playlists[canonicalize_url(playlist_url)] = {"song_urls": canonicalize_urls(song_urls or [])}
+    return playlists
+
+# Gescrapte und manuelle Playlists zu einer Liste mit einheitlichen URLs zusammenführen
+def load_playlist_sources():
+    playlists = {}
+    for playlist_url, data in (load_json(SCRAPED_PLAYLISTS_FILE) or {}).items():
+        playlists[canonicalize_url(playlist_url)] = {"song_urls": canonicalize_urls(data.get('song_urls', []))}
+    for playlist_url, data in load_manual_playlists().items():
+        song_urls = playlists.get(playlist_url, {}).get('song_urls', []) + data['song_urls']
+        playlists[playlist_url] = {"song_urls": list(dict.fromkeys(song_urls))}
+    return playlists
+
+class ScraperEngine:
+    """Die komplette Scraping-Logik ohne Oberfläche.
+
+    Statt Widgets direkt anzufassen, legt die Engine Ereignisse in `events` (queue.Queue) ab:
+        ("log", {"message": ...})
+        ("progress", {"name": "overall" | "playlist" | "song", "value": ..., "maximum": ...})
+        ("song", {"song_url": ..., "playlist_url": ..., "title": ..., "styles": [...], "updated_files": [...]})
+        ("finished", {"phase": ...})
+    Die Tk-Oberfläche liest die Warteschlange in festen Abständen aus, der Kommandozeilen-Runner
+    gibt die Log-Ereignisse direkt aus.
+
+    "all" sucht Playlists und lädt Songs gleichzeitig über einen gemeinsamen, deduplizierten Frontier.
+    Mit `shard=(i, k)` lädt die Engine nur die Songs ihres Shards in einen eigenen Worker-Ordner
+    (siehe distributed.py).
+    Der Webdriver-Pool bleibt zwischen den Läufen warm und wird erst mit `close()` beendet.
+    """
+
+    PHASES = ("playlists", "songs", "all")
+
+    def __init__(self, worker_count=DEFAULT_SCRAPER_WORKERS, http_first=True, events=None, block_resources=DEFAULT_BLOCK_RESOURCES,
+                 archive_html=DEFAULT_ARCHIVE_HTML, shard=None, data_dir=None, start_url=START_PAGE_URL):
+        self.worker_count = worker_count
+        self.start_url = start_url
+        self.http_first = http_first
+        self.block_resources = block_resources
+        self.archive_html = archive_html
+        self.archive = None
+        # Verteiltes Scraping: (Index, Anzahl) des eigenen Shards und Ausgabeordner des Workers
+        self.shard = shard
+        self.data_dir = data_dir or (worker_dir(*shard) if shard else None)
+        self.events = events if events is not None else queue.Queue()
+        self.page_stats = PageStats()
+        self.driver_pool = None
+        self.http_fetcher = None
+        self.engine = None
+        self.thread = None
+        self.is_scraping = False
+        self.paused = False
+        self.progress_state = {"overall": [0, 0], "playlist": [0, 0], "song": [0, 0]}
+
+    # Ereignisse
+
+    def emit(self, kind, **data):
+        self.events.put((kind, data))
+
+    def log(self, message):
+        self.emit("log", message=message)
+
+    def set_progress(self, name, value=None, maximum=None):
+        state = self.progress_state[name]
+        if value is not None:
+            state[0] = value
+        if maximum is not None:
+            state[1] = maximum
+        self.emit("progress", name=name, value=state[0], maximum=state[1])
+
+    def advance_progress(self, name, step=1):
+        self.set_progress(name, value=self.progress_state[name][0] + step)
+
+    # Steuerung
+
+    def start(self, phase):
+        """Startet eine Phase ("playlists", "songs" oder "all") in einem eigenen Thread."""
+        if self.is_running():
+            raise RuntimeError("Ein Scraping-Prozess läuft bereits.")
+        self.is_scraping = True
+        self.thread = threading.Thread(target=self.run, args=(phase,), daemon=True)
+        self.thread.start()
+
+    def run(self, phase):
+        """Führt eine Phase blockierend aus."""
+        if phase not in self.PHASES:
+            raise ValueError(f"Unbekannte Phase: {phase}")
+        if self.shard and phase != "songs":
+            raise ValueError("Verteiltes Scraping ist nur für die Phase 'songs' möglich.")
+        self.is_scraping = True
+        try:
+            self.start_driver_pool()
+            if self.archive_html:
+                # Rohes HTML aufbewahren, damit spätere Extraktions-Änderungen offline nachgeholt werden können
+                self.archive = HtmlArchive()
+                if self.http_fetcher:
+                    self.http_fetcher.archive = self.archive
+            if phase == "all":
+                self.log("Starte Playlist-Suche und Song-Abruf parallel...")
+                self.scrape_pipeline()
+                self.log("Playlists und Songs wurden erfolgreich gescrapt und gespeichert.")
+            if phase == "playlists":
+                self.log("Starte das Scrapen der Playlists...")
+                self.scrape_playlists()
+                self.log("Playlists wurden erfolgreich gescrapt und gespeichert.")
+            if phase == "songs":
+                self.log("Starte das Scrapen der Songs...")
+                self.scrape_songs_from_url_list(load_playlist_sources())
+                self.log("Songs wurden erfolgreich gescrapt und gespeichert.")
+        except Exception as e:
+            self.log(f"Fehler beim Scraping: {e}")
+        finally:
+            # Browser für den nächsten Lauf offen lassen, nur liegengebliebene Aufträge verwerfen
+            if self.driver_pool:
+                self.driver_pool.cancel_pending()
+            if self.archive:
+                if self.http_fetcher:
+                    self.http_fetcher.archive = None
+                self.archive.close()
+                self.archive = None
+            self.is_scraping = False
+            self.emit("finished", phase=phase)
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def pause(self):
+        self.paused = True
+        if self.engine:
+            self.engine.pause()
+
+    def resume(self):
+        self.paused = False
+        if self.engine:
+            self.engine.resume()
+
+    def stop(self):
+        self.is_scraping = False
+        if self.engine:
+            self.engine.stop()
+
+    def configure(self, worker_count=None, http_first=None, block_resources=None, archive_html=None):
+        """Ändert die Einstellungen für den nächsten Lauf. Der Pool wird nur bei Bedarf neu gestartet."""
+        if worker_count is not None:
+            self.worker_count = worker_count
+        if http_first is not None:
+            self.http_first = http_first
+        if block_resources is not None:
+            self.block_resources = block_resources
+        if archive_html is not None:
+            self.archive_html = archive_html
+
+    def start_driver_pool(self):
+        pool = self.driver_pool
+        if (pool and pool.is_alive() and pool.size == self.worker_count and pool.lazy_drivers == self.http_first
+                and pool.block_resources == self.block_resources):
+            self.log("Verwende die bereits gestarteten Webdriver weiter.")
+            return
+        self.stop_driver_pool()
+
+        self.log("Initialisiere Webdriver...")
+        if self.http_first:
+            # Chrome wird dann für Songs nur noch als Rückfallebene gestartet
+            self.http_fetcher = HttpSongFetcher(pool_size=self.worker_count, timeout=PAGE_LOAD_TIMEOUT, page_stats=self.page_stats)
+        self.driver_pool = DriverPool(self.worker_count, self.log, lazy_drivers=self.http_fetcher is not None,
+                                      block_resources=self.block_resources, page_stats=self.page_stats)
+        self.driver_pool.start()
+
+    def stop_driver_pool(self):
+        if self.driver_pool:
+            self.driver_pool.shutdown(wait=False, cancel_futures=True)
+            self.driver_pool = None
+        if self.http_fetcher:
+            self.http_fetcher.close()
+            self.http_fetcher = None
+
+    def close(self):
+        """Hält einen laufenden Lauf an und beendet die Browser."""
+        self.stop()
+        if self.is_running():
+            self.thread.join()
+        self.stop_driver_pool()
+
+    # Crawl-Engine über dem Webdriver-Pool anlegen
+    def create_engine(self, **callbacks):
+        self.engine = CrawlEngine(self.driver_pool, max_in_flight=self.driver_pool.size, log_callback=self.log, **callbacks)
+        if self.paused:
+            self.engine.pause()
+        return self.engine
+
+    # Alle fälligen URLs der angegebenen Arten aus dem Frontier abarbeiten, inklusive verzögerter Wiederholungen
+    def run_frontier(self, frontier, kinds, pipeline=False, **engine_kwargs):
+        while self.is_scraping:
+            claimed = {kind: frontier.claim_due(kind) for kind in kinds}
+            if any(claimed.values()):
+                try:
+                    self.create_engine(**engine_kwargs).run(
+                        claimed.get('playlist', []), claimed.get('song', []), pipeline=pipeline
+                    )
+                finally:
+                    self.engine = None
+                continue
+
+            delays = [delay for delay in (frontier.next_due_in(kind) for kind in kinds) if delay is not None]
+            if not delays:
+                break
+            delay = min(delays)
+            self.log(f"Warte {delay:.0f} s auf den nächsten Wiederholungsversuch...")
+            waited = 0.0
+            while self.is_scraping and waited < delay:
+                time.sleep(0.5)
+                waited += 0.5
+
+    # Playlists der Startseite und der manuellen Liste in den Frontier aufnehmen (nur bei einem neuen Lauf)
+    def seed_playlists(self, frontier, manual_playlists):
+        if sum(frontier.counts('playlist').values()) > 0:
+            self.log("Setze die unterbrochene Playlist-Suche fort...")
+            return
+        self.log(f"Öffne die Webseite {self.start_url}...")
+        self.log("Suche nach Playlist-Links auf der Startseite...")
+        playlist_urls = self.driver_pool.submit(collect_links, self.start_url, PLAYLIST_LINK_SELECTOR, PAGE_LOAD_TIMEOUT, self.page_stats).result()
+        self.log(f"Gefundene Playlist-Links: {len(playlist_urls)}")
+        # Manuelle Playlists ohne hinterlegte Songs werden ebenfalls abgerufen
+        playlist_urls += [playlist_url for playlist_url, data in manual_playlists.items() if not data['song_urls']]
+        frontier.add(dict.fromkeys(canonicalize_url(url) for url in playlist_urls), 'playlist')
+
+    # Fehlgeschlagene Playlist verbuchen; True, wenn sie endgültig erledigt ist
+    def playlist_failed(self, frontier, playlist_url, error):
+        if frontier.mark_failed(playlist_url, error):
+            self.log(f"Fehler beim Abrufen der Playlist {playlist_url}, neuer Versuch später: {error}")
+            return False
+        self.log(f"Playlist endgültig fehlgeschlagen: {playlist_url}: {error}")
+        return True
+
+    # Abgeschlossene Art im Frontier vergessen und endgültig fehlgeschlagene URLs melden;
+    # solange noch URLs offen sind (auch bei einem anderen Prozess), bleibt alles erhalten
+    def finish_frontier(self, frontier, kind):
+        failed = frontier.reset(kind)
+        if failed:
+            self.log(f"{len(failed)} URLs ({kind}) endgültig fehlgeschlagen:")
+            for url, attempts, error in failed:
+                self.log(f"  {url} nach {attempts} Versuchen: {error}")
+
+    # Playlist in die Datei eintragen; unter Sperre gelesen und geschrieben, damit parallele Scraper nichts überschreiben
+    def save_playlist(self, playlists, playlist_url, song_urls):
+        def add_playlist(saved):
+            saved[playlist_url] = {"song_urls": song_urls}
+            return saved
+        playlists.clear()
+        playlists.update(update_json(SCRAPED_PLAYLISTS_FILE, add_playlist))
+
+    # Playlists scrapen und Song-Links sammeln
+    def scrape_playlists(self):
+        playlists = load_json(SCRAPED_PLAYLISTS_FILE)  # Vorhandene Daten laden
+        total_songs = 0
+        frontier = CrawlFrontier()
+        self.seed_playlists(frontier, load_manual_playlists())
+
+        counts = frontier.counts('playlist')
+        self.set_progress("playlist", counts[DONE] + counts[FAILED], sum(counts.values()))
+
+        def on_playlist(playlist_url, song_urls, error):
+            nonlocal total_songs
+            if error:
+                if not self.playlist_failed(frontier, playlist_url, error):
+                    return
+            else:
+                song_urls = canonicalize_urls(song_urls)
+                total_songs += len(song_urls)
+                # Sofort sichern, damit ein Neustart die Playlist nicht erneut abrufen muss
+                self.save_playlist(playlists, playlist_url, song_urls)
+                frontier.mark_done(playlist_url)
+                self.log(f"Playlist gescrapt: {playlist_url} mit {len(song_urls)} Songs.")
+
+            # Fortschrittsbalken aktualisieren
+            self.advance_progress("playlist")
+
+        fetch_playlist = partial(collect_links, css_selector=SONG_LINK_SELECTOR, timeout=PAGE_LOAD_TIMEOUT, page_stats=self.page_stats)
+        self.run_frontier(frontier, ('playlist',), fetch_playlist=fetch_playlist, on_playlist=on_playlist)
+
+        # Lauf abgeschlossen: der nächste Lauf sammelt die Playlists wieder neu ein
+        self.finish_frontier(frontier, 'playlist')
+        frontier.close()
+
+        self.log(f"Scraping abgeschlossen: {len(playlists)} Playlists und {total_songs} Songs wurden gefunden.")
+        self.log(self.page_stats.format_summary())
+        self.set_progress("playlist", 0)
+        return playlists
+
+    # Noch nicht gespeichert und (bei verteiltem Scraping) im eigenen Shard
+    def is_own_song(self, song_id, processed_song_ids):
+        if song_id in processed_song_ids:
+            return False
+        return self.shard is None or shard_of(song_id, self.shard[1]) == self.shard[0]
+
+    def song_fetcher(self):
+        if self.http_fetcher:
+            return partial(fetch_song_data_http_first, http_fetcher=self.http_fetcher, timeout=PAGE_LOAD_TIMEOUT,
+                           page_stats=self.page_stats, archive=self.archive)
+        return partial(fetch_song_data, timeout=PAGE_LOAD_TIMEOUT, page_stats=self.page_stats, archive=self.archive)
+
+    # Callback für abgerufene Songs: speichern, im Frontier verbuchen und Fortschritt melden
+    def song_callback(self, frontier, writer, remaining_in_playlist, songs_in_playlist, count_playlists=True):
+        def on_song(song_url, song_data, error):
+            playlist_url = frontier.parent_of(song_url)
+            try:
+                if error:
+                    raise error
+                song_title, updated_files = writer.save(song_url, song_data)
+                frontier.mark_done(song_url)
+
+                # Infos zum zuletzt gespeicherten Song melden
+                self.emit(
+                    "song",
+                    song_url=song_url,
+                    playlist_url=playlist_url,  # Hier die Playlist-URL speichern
+                    title=song_title,
+                    styles=song_data['styles'],
+                    updated_files=updated_files
+                )
+
+                self.log(f"Song gespeichert: {song_title}")
+            except Exception as e:
+                if frontier.mark_failed(song_url, e):
+                    self.log(f"Fehler beim Abrufen der Song-Daten von {song_url}, neuer Versuch später: {e}")
+                    return
+                self.log(f"Fehler beim Abrufen der Song-Daten von {song_url}: {e}")
+
+            # Fortschrittsbalken aktualisieren (nur für endgültig erledigte Songs)
+            remaining_in_playlist[playlist_url] = remaining_in_playlist.get(playlist_url, 1) - 1
+            if count_playlists and remaining_in_playlist[playlist_url] == 0:
+                self.advance_progress("playlist")
+            total = songs_in_playlist.get(playlist_url, 0)
+            self.set_progress("song", total - remaining_in_playlist[playlist_url], total)
+            self.advance_progress("overall")
+        return on_song
+
+    # Songinformationen scrapen und speichern
+    def scrape_songs_from_url_list(self, url_list):
+        if self.shard:
+            # Shard-Worker: eigener Korpus und Frontier im Worker-Ordner, bereits zusammengeführte Songs überspringen
+            shard_index, shard_count = self.shard
+            writer = SongWriter(os.path.join(self.data_dir, "corpus"), with_meta=False)
+            frontier = CrawlFrontier(os.path.join(self.data_dir, "frontier.db"))
+            canonical_corpus = SongCorpus()
+            processed_song_ids = writer.corpus.song_ids() | canonical_corpus.song_ids()
+            canonical_corpus.close()
+            self.log(f"Shard {shard_index + 1}/{shard_count}, Ausgabe nach {self.data_dir}")
+        else:
+            writer = SongWriter()
+            frontier = CrawlFrontier()
+            # Bereits verarbeitete Song-IDs aus dem Korpus abrufen
+            processed_song_ids = writer.corpus.song_ids()
+
+        # Neue Songs in den Frontier übernehmen; offene Songs eines abgebrochenen Laufs sind dort schon enthalten.
+        # Ein Song, der in mehreren Playlists steht, gehört zur ersten und wird nur einmal abgerufen.
+        for playlist_url, playlist_data in url_list.items():
+            new_song_urls = [song_url for song_url in playlist_data['song_urls'] if self.is_own_song(extract_song_id_from_url(song_url), processed_song_ids)]
+            frontier.add(new_song_urls, 'song', parent=playlist_url)
+
+        counts = frontier.counts('song')
+        self.log(f"Songs im Frontier: {counts[PENDING]} offen, {counts[DONE]} erledigt, {counts[FAILED]} fehlgeschlagen.")
+
+        self.set_progress("overall", counts[DONE] + counts[FAILED], sum(counts.values()))
+
+        # Offene Songs je Playlist, damit der Playlist-Fortschritt auch bei paralleler Verarbeitung stimmt
+        remaining_in_playlist = frontier.open_by_parent('song')
+        songs_in_playlist = {playlist_url: len(playlist_data['song_urls']) for playlist_url, playlist_data in url_list.items()}
+        self.set_progress("playlist", 0, len(remaining_in_playlist))
+
+        on_song = self.song_callback(frontier, writer, remaining_in_playlist, songs_in_playlist)
+        try:
+            self.run_frontier(frontier, ('song',), fetch_song=self.song_fetcher(), on_song=on_song)
+        finally:
+            writer.close()
+            # Lauf abgeschlossen, erledigte Songs stehen im Korpus
+            self.finish_frontier(frontier, 'song')
+            frontier.close()
+
+        self.log(self.page_stats.format_summary())
+
+        # Abschließende Updates
+        self.set_progress("overall", 0)
+        self.set_progress("playlist", 0)
+        self.set_progress("song", 0)
+
+    # Playlists suchen und Songs abrufen in einem Durchgang: Songs einer gefundenen Playlist werden
+    # sofort geladen, während die übrigen Playlists noch gesucht werden
+    def scrape_pipeline(self):
+        playlists = load_json(SCRAPED_PLAYLISTS_FILE)
+        manual_playlists = load_manual_playlists()
+        writer = SongWriter()
+        processed_song_ids = writer.corpus.song_ids()
+        frontier = CrawlFrontier()
+
+        # Mit `claim` ruft die Engine die Songs sofort ab, sie gehören dann gleich diesem Prozess
+        def add_songs(song_urls, playlist_url, claim=False):
+            new_song_urls = frontier.add_new(
+                [song_url for song_url in song_urls if extract_song_id_from_url(song_url) not in processed_song_ids],
+                'song', parent=playlist_url, claim=claim
+            )
+            songs_in_playlist[playlist_url] = songs_in_playlist.get(playlist_url, 0) + len(new_song_urls)
+            remaining_in_playlist[playlist_url] = remaining_in_playlist.get(playlist_url, 0) + len(new_song_urls)
+            self.set_progress("overall", maximum=self.progress_state["overall"][1] + len(new_song_urls))
+            return new_song_urls
+
+        # Offene Songs eines abgebrochenen Laufs zählen mit
+        remaining_in_playlist = frontier.open_by_parent('song')
+        songs_in_playlist = dict(remaining_in_playlist)
+        counts = frontier.counts('song')
+        self.set_progress("overall", counts[DONE] + counts[FAILED], sum(counts.values()))
+
+        self.seed_playlists(frontier, manual_playlists)
+        for playlist_url, playlist_data in manual_playlists.items():
+            add_songs(playlist_data['song_urls'], playlist_url)
+
+        counts = frontier.counts('playlist')
+        self.set_progress("playlist", counts[DONE] + counts[FAILED], sum(counts.values()))
+
+        def on_playlist(playlist_url, song_urls, error):
+            if error:
+                if self.playlist_failed(frontier, playlist_url, error):
+                    self.advance_progress("playlist")
+                return []
+            song_urls = canonicalize_urls(song_urls)
+            self.save_playlist(playlists, playlist_url, song_urls)
+            frontier.mark_done(playlist_url)
+            new_song_urls = add_songs(song_urls, playlist_url, claim=True)
+            self.log(f"Playlist gescrapt: {playlist_url} mit {len(song_urls)} Songs, davon {len(new_song_urls)} neu.")
+            self.advance_progress("playlist")
+            return new_song_urls
+
+        on_song = self.song_callback(frontier, writer, remaining_in_playlist, songs_in_playlist, count_playlists=False)
+        fetch_playlist = partial(collect_links, css_selector=SONG_LINK_SELECTOR, timeout=PAGE_LOAD_TIMEOUT, page_stats=self.page_stats)
+        try:
+            self.run_frontier(frontier, ('playlist', 'song'), pipeline=True, fetch_playlist=fetch_playlist,
+                              on_playlist=on_playlist, fetch_song=self.song_fetcher(), on_song=on_song)
+        finally:
+            writer.close()
+            for kind in ('playlist', 'song'):
+                self.finish_frontier(frontier, kind)
+            frontier.close()
+
+        self.log(f"Scraping abgeschlossen: {len(playlists)} Playlists durchsucht.")
+        self.log(self.page_stats.format_summary())
+        self.set_progress("overall", 0)
+        self.set_progress("playlist", 0)
+        self.set_progress("song", 0)
+
+# Kommandozeilen-Runner für Server ohne Display
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suno Scraper ohne Oberfläche")
+    parser.add_argument("phase", choices=ScraperEngine.PHASES, help="Welche Phase gescrapt werden soll")
+    parser.add_argument("--workers", type=int, default=DEFAULT_SCRAPER_WORKERS, help="Anzahl paralleler Webdriver")
+    parser.add_argument("--no-http", action="store_true", help="Songs nur über Chrome abrufen")
+    parser.add_argument("--load-resources", action="store_true", help="Bilder, Medien, Schriften und CSS im Browser nicht blockieren")
+    parser.add_argument("--archive-html", action="store_true", help="Rohes HTML jeder Songseite komprimiert archivieren")
+    parser.add_argument("--shard", type=parse_shard, help="Nur den eigenen Teil der Songs scrapen, z.B. 0/4 (nur Phase songs)")
+    parser.add_argument("--data-dir", help="Ausgabeordner des Shard-Workers (Standard: workers/shard-I-of-K)")
+    parser.add_argument("--start-url", default=START_PAGE_URL, help="Startseite der Playlist-Suche, z.B. der lokale Testserver")
+    args = parser.parse_args(argv)
+    if args.shard and args.phase != "songs":
+        parser.error("--shard ist nur mit der Phase songs möglich")
+
+    scraper = ScraperEngine(worker_count=args.workers, http_first=not args.no_http, block_resources=not args.load_resources,
+                            archive_html=args.archive_html, shard=args.shard, data_dir=args.data_dir,
+                            start_url=args.start_url)
+    scraper.start(args.phase)
+    try:
+        while True:
+            try:
+                kind, data = scraper.events.get(timeout=0.5)
+            except queue.Empty:
+                if not scraper.is_running():
+                    break
+                continue
+            if kind == "log":
+                print(data["message"], flush=True)
+            elif kind == "finished":
+                break
+    except KeyboardInterrupt:
+        print("Abbruch angefordert, beende laufende Abrufe...", flush=True)
+    finally:
+        scraper.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,413 @@
+import os
+import sys
+import gzip
+import json
+import zlib
+import hashlib
+import mmap
+import time
+import random
+import sqlite3
+import argparse
+from threading import Lock
+from utils import extract_song_id_from_url, locked_file, clean_filename
+from constants import *
+
+# Anfang jedes gzip-Mitglieds (Kennung und Deflate-Verfahren)
+GZIP_MAGIC = b"\x1f\x8b\x08"
+
+# SHA-256 über die gespeicherte JSON-Zeile eines Songs
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class SongCorpus:
+    """Alle gescrapten Songs in wenigen, komprimierten JSONL-Shards statt einer Datei pro Song.
+
+    Jeder Song wird als eigenes gzip-Mitglied an den aktuellen Shard angehängt. Ein Shard ist
+    damit weiterhin eine gültige .jsonl.gz-Datei, die sich mit gzip.open am Stück lesen lässt.
+    Ein SQLite-Index hält pro Song-ID Shard, Offset und Länge für den Direktzugriff sowie den
+    bisherigen Dateinamen, unter dem der Song in den Trainingsdaten geführt wird.
+
+    Wird ein Song erneut gespeichert, zeigt der Index auf die neue Fassung. Die alte bleibt als
+    toter Eintrag im Shard, bis `compact()` die Shards neu schreibt. Die Shards sind die Quelle
+    der Wahrheit: `rebuild_index()` stellt einen verlorenen oder veralteten Index aus ihnen wieder her.
+    """
+
+    def __init__(self, root=CORPUS_DIR, legacy_dir=SONGS_DIR, shard_size=CORPUS_SHARD_SIZE):
+        self.root = root
+        self.shard_size = shard_size
+        os.makedirs(root, exist_ok=True)
+        self.lock = Lock()
+        self.conn = sqlite3.connect(os.path.join(root, CORPUS_INDEX_NAME), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS songs ("
+            " song_id TEXT PRIMARY KEY,"
+            " file_name TEXT NOT NULL,"
+            " shard INTEGER NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " content_hash TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS songs_position ON songs (shard, offset)")
+        self.conn.commit()
+        shards = self.shard_numbers()
+        self.current_shard = max([0] + shards)
+        if len(self) == 0 and shards:
+            # Index verloren oder neu angelegt, die Shards sind aber da: aus ihnen wiederherstellen
+            self.rebuild_index()
+        elif len(self) == 0 and legacy_dir and os.path.isdir(legacy_dir) and any(f.endswith('.json') for f in os.listdir(legacy_dir)):
+            # Erster Start mit dem bisherigen songs-Ordner: Songs einmalig übernehmen
+            self.migrate(legacy_dir)
+
+    def shard_path(self, shard):
+        return os.path.join(self.root, f"shard-{shard:05d}.jsonl.gz")
+
+    def shard_numbers(self):
+        return sorted(
+            int(filename[6:11]) for filename in os.listdir(self.root)
+            if filename.startswith("shard-") and filename.endswith(".jsonl.gz")
+        )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM songs").fetchone()[0]
+
+    def __contains__(self, song_id):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM songs WHERE song_id = ?", (song_id,)).fetchone() is not None
+
+    def song_ids(self):
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT song_id FROM songs")}
+
+    # Schreiben
+
+    def shards_lock(self):
+        return locked_file(os.path.join(self.root, "shards"))
+
+    def _append(self, records):
+        """Hängt (song_id, file_name, song_data) an und trägt sie in den Index ein. Erwartet self.lock.
+
+        Der Index wird noch unter der Dateisperre geschrieben: `compact` in einem anderen Prozess
+        sieht so jeden angehängten Song, bevor es alte Shards löscht.
+        """
+        # Andere Prozesse schreiben evtl. in denselben Korpus: Shards nur unter Dateisperre anhängen
+        with self.shards_lock():
+            self.current_shard = max([self.current_shard] + self.shard_numbers())
+            rows = self._append_locked(records)
+            self._index(rows)
+            return rows
+
+    def _index(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO songs (song_id, file_name, shard, offset, length, updated_at, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def _append_locked(self, records):
+        rows = []
+        now = time.time()
+        shard_path = self.shard_path(self.current_shard)
+        file = open(shard_path, 'ab')
+        try:
+            for song_id, file_name, song_data in records:
+                if file.tell() >= self.shard_size:
+                    file.close()
+                    self.current_shard += 1
+                    shard_path = self.shard_path(self.current_shard)
+                    file = open(shard_path, 'ab')
+                line = json.dumps(song_data, ensure_ascii=False)
+                blob = gzip.compress((line + "\n").encode('utf-8'), compresslevel=6)
+                rows.append((song_id, file_name, self.current_shard, file.tell(), len(blob), now, hash_text(line)))
+                file.write(blob)
+            file.flush()
+            os.fsync(file.fileno())
+        finally:
+            file.close()
+        return rows
+
+    def save_song(self, song_id, song_data, file_name):
+        """Hängt den Song an den aktuellen Shard an und trägt ihn in den Index ein. Gibt den Shard-Pfad zurück."""
+        self.save_songs([(song_id, file_name, song_data)])
+        return self.shard_path(self.current_shard)
+
+    def save_songs(self, records):
+        """Wie save_song für viele (song_id, file_name, song_data) mit nur einem Commit."""
+        with self.lock:
+            rows = self._append(records)
+        return len(rows)
+
+    # Lesen
+
+    def _read(self, shard, offset, length):
+        with open(self.shard_path(shard), 'rb') as file:
+            file.seek(offset)
+            return json.loads(gzip.decompress(file.read(length)))
+
+    def get(self, song_id):
+        """Song-Daten zur ID oder None."""
+        with self.lock:
+            row = self.conn.execute("SELECT shard, offset, length FROM songs WHERE song_id = ?", (song_id,)).fetchone()
+        return self._read(*row) if row else None
+
+    def file_name(self, song_id):
+        with self.lock:
+            row = self.conn.execute("SELECT file_name FROM songs WHERE song_id = ?", (song_id,)).fetchone()
+        return row[0] if row else None
+
+    def random_song(self):
+        """(song_id, file_name, song_data) eines zufälligen Songs oder None bei leerem Korpus."""
+        count = len(self)
+        if count == 0:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT song_id, file_name, shard, offset, length FROM songs LIMIT 1 OFFSET ?", (random.randrange(count),)
+            ).fetchone()
+        return row[0], row[1], self._read(*row[2:])
+
+    def iter_songs(self):
+        """Liefert (song_id, file_name, song_data) Shard für Shard in Speicherreihenfolge."""
+        for song_id, file_name, _, song_data in self.iter_entries():
+            yield song_id, file_name, song_data
+
+    def iter_entries(self, needs_data=None):
+        """Liefert (song_id, file_name, content_hash, song_data) Shard für Shard in Speicherreihenfolge.
+
+        Jeder Shard wird einmal per mmap eingeblendet, statt pro Song eine Datei zu öffnen. Gibt
+        `needs_data(song_id, file_name, content_hash)` False zurück, wird der Song nicht entpackt
+        und song_data ist None, z.B. für unveränderte Songs bei der inkrementellen Datenvorbereitung.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT song_id, file_name, content_hash, shard, offset, length FROM songs ORDER BY shard, offset"
+            ).fetchall()
+        for (song_id, file_name, content_hash, _, _, _), song_data in self._iter_rows(rows, needs_data):
+            yield song_id, file_name, content_hash, song_data
+
+    def _iter_rows(self, rows, needs_data=None):
+        """Liefert (Zeile, song_data) für Index-Zeilen (song_id, file_name, content_hash, shard, offset, length), nach Shard sortiert."""
+        index = 0
+        while index < len(rows):
+            shard = rows[index][3]
+            with open(self.shard_path(shard), 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while index < len(rows) and rows[index][3] == shard:
+                    row = rows[index]
+                    song_id, file_name, content_hash, _, offset, length = row
+                    index += 1
+                    song_data = None
+                    if needs_data is None or needs_data(song_id, file_name, content_hash):
+                        song_data = json.loads(gzip.decompress(data[offset:offset + length]))
+                    yield row, song_data
+
+    # Wartung
+
+    def migrate(self, songs_dir=SONGS_DIR, batch_size=1000, log_callback=None):
+        """Übernimmt alle songs/*.json in den Korpus. Die Dateien selbst bleiben unverändert. Gibt die Anzahl zurück."""
+        batch = []
+        migrated = 0
+        for filename in sorted(os.listdir(songs_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(songs_dir, filename), 'r', encoding='utf-8') as file:
+                    song_data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            # Die ID steckt zuverlässig in der gespeicherten URL, der Dateiname ist nur die Rückfallebene
+            song_id = extract_song_id_from_url(song_data.get('song_url', '')) if isinstance(song_data, dict) else "unbekannte_id"
+            if song_id == "unbekannte_id":
+                song_id = filename[:-5].split('_')[-1]
+            batch.append((song_id, filename, song_data))
+            if len(batch) >= batch_size:
+                migrated += self.save_songs(batch)
+                batch = []
+                if log_callback:
+                    log_callback(f"{migrated} Songs übernommen...")
+        if batch:
+            migrated += self.save_songs(batch)
+        return migrated
+
+    def compact(self, batch_size=1000):
+        """Schreibt alle aktuellen Fassungen in neue Shards und entfernt die alten. Gibt die Anzahl der umgezogenen Songs zurück.
+
+        Die Songs werden blockweise gelesen und angehängt, im Speicher bleiben nur ein Block und
+        die Index-Zeilen. Der Index wird erst am Ende umgestellt; bricht die Kompaktierung vorher
+        ab, zeigt er weiter auf die alten Shards.
+        Andere Prozesse dürfen währenddessen speichern: umgestellt wird nur, was noch an seiner alten
+        Stelle steht, eine inzwischen gespeicherte neuere Fassung bleibt gültig. Was ein anderer
+        Prozess noch in einen alten Shard geschrieben hat, wird vor dem Löschen ebenfalls umgezogen.
+        """
+        old_shards = self.shard_numbers()
+        if not old_shards:
+            return 0
+        last_old_shard = old_shards[-1]
+        with self.lock:
+            self.current_shard = last_old_shard + 1
+            rows = self.conn.execute(
+                "SELECT song_id, file_name, content_hash, shard, offset, length FROM songs WHERE shard <= ? ORDER BY shard, offset",
+                (last_old_shard,)
+            ).fetchall()
+        # (neuer Ort, Größe, Zeit, Hash, Song-ID, alter Shard, alter Offset) für das bedingte Umstellen
+        moves = []
+
+        def copy(batch):
+            with self.lock, self.shards_lock():
+                # Inzwischen neu gespeicherte Songs nicht kopieren, die alte Fassung stünde sonst hinter der neuen
+                batch = [(old, song_data) for old, song_data in batch if self.conn.execute(
+                    "SELECT 1 FROM songs WHERE song_id = ? AND shard = ? AND offset = ?", (old[0], old[3], old[4])
+                ).fetchone()]
+                self.current_shard = max([self.current_shard] + self.shard_numbers())
+                new_rows = self._append_locked([(old[0], old[1], song_data) for old, song_data in batch])
+            moves.extend(
+                (shard, offset, length, updated_at, content_hash, song_id, old[3], old[4])
+                for (song_id, _, shard, offset, length, updated_at, content_hash), (old, _) in zip(new_rows, batch)
+            )
+
+        batch = []
+        for row, song_data in self._iter_rows(rows):
+            batch.append((row, song_data))
+            if len(batch) >= batch_size:
+                copy(batch)
+                batch = []
+        if batch:
+            copy(batch)
+        # Unter der Dateisperre kann kein anderer Prozess mehr anhängen oder den Index ändern
+        with self.lock, self.shards_lock():
+            with self.conn:
+                moved = self.conn.executemany(
+                    "UPDATE songs SET shard = ?, offset = ?, length = ?, updated_at = ?, content_hash = ?"
+                    " WHERE song_id = ? AND shard = ? AND offset = ?",
+                    moves
+                ).rowcount
+            late = self.conn.execute(
+                "SELECT song_id, file_name, shard, offset, length FROM songs WHERE shard <= ?", (last_old_shard,)
+            ).fetchall()
+            if late:
+                self.current_shard = max([self.current_shard] + self.shard_numbers())
+                self._index(self._append_locked([
+                    (song_id, file_name, self._read(shard, offset, length)) for song_id, file_name, shard, offset, length in late
+                ]))
+            for shard in old_shards:
+                os.remove(self.shard_path(shard))
+        return moved + len(late)
+
+    def scan_shard(self, shard, chunk_size=1 << 16):
+        """Liefert (Offset, Länge, JSON-Zeile) für jedes gzip-Mitglied eines Shards.
+
+        Unvollständige Mitglieder (Abbruch beim Anhängen) werden übersprungen, gelesen wird ab dem
+        nächsten gzip-Kopf weiter.
+        """
+        with open(self.shard_path(shard), 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            while offset < len(data):
+                decompressor = zlib.decompressobj(wbits=31)  # genau ein gzip-Mitglied
+                parts = []
+                position = offset
+                try:
+                    while not decompressor.eof and position < len(data):
+                        parts.append(decompressor.decompress(data[position:position + chunk_size]))
+                        position = min(position + chunk_size, len(data))
+                except zlib.error:
+                    pass
+                if not decompressor.eof:
+                    offset = data.find(GZIP_MAGIC, offset + 1)
+                    if offset == -1:
+                        return
+                    continue
+                length = position - len(decompressor.unused_data) - offset
+                yield offset, length, b"".join(parts).decode('utf-8').rstrip("\n")
+                offset += length
+
+    def rebuild_index(self, log_callback=None):
+        """Baut den Index aus den Shards neu auf, z.B. wenn index.db verloren oder veraltet ist. Gibt die Anzahl der Songs zurück.
+
+        Die Shards werden in Schreibreihenfolge gelesen, pro Song-ID zählt das letzte Vorkommen.
+        Die Song-ID stammt aus der gespeicherten URL. Der Dateiname steht nicht im Shard: er wird
+        aus dem bisherigen Index übernommen, sonst wie beim Speichern aus Titel und ID gebildet.
+        Einträge ohne URL, deren Position der bisherige Index nicht kennt, werden ausgelassen.
+        """
+        with self.lock:
+            known = {(shard, offset): (song_id, file_name) for song_id, file_name, shard, offset in
+                     self.conn.execute("SELECT song_id, file_name, shard, offset FROM songs")}
+            file_names = {song_id: file_name for song_id, file_name in known.values()}
+            latest = {}
+            skipped = 0
+            now = time.time()
+            for shard in self.shard_numbers():
+                for offset, length, line in self.scan_shard(shard):
+                    try:
+                        song_data = json.loads(line)
+                    except ValueError:
+                        skipped += 1
+                        continue
+                    song_id = extract_song_id_from_url(song_data.get('song_url', '')) if isinstance(song_data, dict) else "unbekannte_id"
+                    if song_id == "unbekannte_id":
+                        if (shard, offset) not in known:
+                            skipped += 1
+                            continue
+                        song_id = known[(shard, offset)][0]
+                    file_name = file_names.get(song_id) or clean_filename(f"{song_data.get('title') or 'Unbekannter_Titel'}_{song_id}") + ".json"
+                    latest.pop(song_id, None)  # neu einsortieren, damit die Reihenfolge dem letzten Vorkommen folgt
+                    latest[song_id] = (song_id, file_name, shard, offset, length, now, hash_text(line))
+                if log_callback:
+                    log_callback(f"Shard {shard}: {len(latest)} Songs bisher...")
+            with self.conn:
+                self.conn.execute("DELETE FROM songs")
+                self.conn.executemany(
+                    "INSERT INTO songs (song_id, file_name, shard, offset, length, updated_at, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    latest.values()
+                )
+            self.current_shard = max([0] + self.shard_numbers())
+        if log_callback and skipped:
+            log_callback(f"{skipped} Einträge ohne Song-ID oder mit ungültigem Inhalt übersprungen.")
+        return len(latest)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Bestehenden songs-Ordner übernehmen: python song_corpus.py --migrate [--from songs]
+# Index aus den Shards neu aufbauen (verloren, beschädigt oder veraltet): python song_corpus.py --rebuild-index
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Song-Korpus aus komprimierten JSONL-Shards")
+    parser.add_argument("--migrate", action="store_true", help="songs/*.json in den Korpus übernehmen")
+    parser.add_argument("--from", dest="songs_dir", default=SONGS_DIR, help="Ordner mit den bisherigen Song-Dateien")
+    parser.add_argument("--compact", action="store_true", help="Überholte Fassungen aus den Shards entfernen")
+    parser.add_argument("--rebuild-index", action="store_true", help="Index aus den Shards neu aufbauen (letzte Fassung je Song-ID)")
+    args = parser.parse_args(argv)
+
+    if args.rebuild_index:
+        # Ein beschädigter Index lässt sich evtl. nicht öffnen: dann ohne ihn neu anfangen
+        index_path = os.path.join(CORPUS_DIR, CORPUS_INDEX_NAME)
+        try:
+            corpus = SongCorpus(legacy_dir=None)
+        except sqlite3.DatabaseError:
+            for path in (index_path, index_path + "-wal", index_path + "-shm"):
+                if os.path.exists(path):
+                    os.remove(path)
+            corpus = SongCorpus(legacy_dir=None)
+        started = time.perf_counter()
+        count = corpus.rebuild_index(log_callback=print)
+        print(f"Index neu aufgebaut: {count} Songs in {time.perf_counter() - started:.1f} s.")
+        corpus.close()
+        return 0
+
+    corpus = SongCorpus(legacy_dir=None)
+    if args.migrate:
+        started = time.perf_counter()
+        migrated = corpus.migrate(args.songs_dir, log_callback=print)
+        print(f"{migrated} Songs in {time.perf_counter() - started:.1f} s übernommen, Korpus: {len(corpus)} Songs.")
+    if args.compact:
+        moved = corpus.compact()
+        print(f"Korpus kompaktiert: {moved} Songs umgezogen, {len(corpus)} Songs in {len(corpus.shard_numbers())} Shards.")
+    if not args.migrate and not args.compact:
+        print(f"Korpus: {len(corpus)} Songs in {len(corpus.shard_numbers())} Shards.")
+    corpus.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
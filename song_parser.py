@@ -0,0 +1,135 @@
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+# lxml ist deutlich schneller als html.parser, aber optional
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Skripte, Styles und Kommentare tragen nichts zu den Feldern bei, sind aber oft der größte Teil der Seite.
+# Sie werden vor dem Parsen entfernt (ein Skript kann kein </script> enthalten, das Muster ist also sicher).
+SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>|<!--.*?-->', re.DOTALL | re.IGNORECASE)
+SCRIPT_STRAINER = SoupStrainer('script')
+
+# Für die Suche nach dem Song-Container ohne Baum: Tags samt Attributen, Textfelder (ihr Inhalt ist
+# reiner Text, darin kann also kein Tag beginnen) und Attribute eines Tags
+TAG_PATTERN = re.compile(r'<(/?)([a-zA-Z][\w:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+TEXTAREA_PATTERN = re.compile(r'<textarea\b(?:[^>"\']|"[^"]*"|\'[^\']*\')*>(.*?)</textarea\s*>', re.DOTALL | re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'([^\s=/"\']+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+VOID_ELEMENTS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'])
+TITLE_INPUT_EXCLUDED_TYPES = ('search', 'hidden', 'checkbox', 'radio')
+
+def is_style_link(href):
+    return bool(href) and '/style/' in href
+
+def is_title_input(tag):
+    return tag.name == 'input' and bool(tag.get('value')) and tag.get('type') not in TITLE_INPUT_EXCLUDED_TYPES
+
+def is_title_input_markup(attributes):
+    """Wie `is_title_input`, für den Attribut-Text eines input-Tags im rohen HTML."""
+    values = {match.group(1).lower(): next(value for value in match.groups()[1:] if value is not None)
+              for match in ATTRIBUTE_PATTERN.finditer(attributes)}
+    return bool(values.get('value')) and values.get('type') not in TITLE_INPUT_EXCLUDED_TYPES
+
+def find_container_span(html):
+    """(Start, Ende) des Song-Containers im HTML, ohne einen Baum aufzubauen; None, wenn das nicht geht.
+
+    Die Tags werden nur mitgezählt (Stapel der offenen Elemente). Die Vorfahren des längsten
+    Textfelds sind die Elemente, die dort offen sind; der Container ist der innerste davon, der
+    auch ein Titelfeld enthält (wie in `find_song_container`).
+    """
+    textareas = {match.start(): (len(match.group(1)), match.end()) for match in TEXTAREA_PATTERN.finditer(html)}
+    if not textareas:
+        return None
+    lyrics_start = max(textareas, key=lambda start: textareas[start][0])
+    stack = []  # [Tag-Name, Start, Ende] der offenen Elemente
+    ancestors = None
+    title_inputs = []
+    position = 0
+    while True:
+        match = TAG_PATTERN.search(html, position)
+        if not match:
+            break
+        closing, name, attributes = match.group(1), match.group(2).lower(), match.group(3)
+        position = match.end()
+        if closing:
+            # Bis zum passenden offenen Element schließen, wie ein nachsichtiger Parser
+            for depth in range(len(stack) - 1, -1, -1):
+                if stack[depth][0] == name:
+                    for element in stack[depth:]:
+                        element[2] = match.end()
+                    del stack[depth:]
+                    break
+        elif match.start() in textareas:
+            if match.start() == lyrics_start:
+                ancestors = list(stack)
+            position = textareas[match.start()][1]
+        elif name == 'input' and is_title_input_markup(attributes):
+            title_inputs.append(match.start())
+        elif name not in VOID_ELEMENTS and not attributes.endswith('/'):
+            stack.append([name, match.start(), None])
+    for element in stack:
+        element[2] = len(html)
+    for _, start, end in reversed(ancestors or []):
+        if any(start < title_input < end for title_input in title_inputs):
+            return start, end
+    return None
+
+def find_song_container(soup):
+    """Kleinster Teilbaum, der das Songtext-Feld und das Titelfeld enthält.
+
+    Ausgangspunkt ist das längste Textfeld der Seite (der Songtext); von dort geht es nach oben,
+    bis ein Vorfahre auch ein Titelfeld enthält. Links und Felder aus Kopfzeile, Seitenleiste oder
+    Empfehlungen liegen außerhalb und werden so nicht mitgelesen. Ohne Textfeld dient das erste
+    Titelfeld als Anker. None, wenn die Seite keins von beiden enthält.
+    """
+    lyrics_textarea = max(soup.find_all('textarea'), key=lambda textarea: len(textarea.get_text()), default=None)
+    if lyrics_textarea is None:
+        title_input = soup.find(is_title_input)
+        return title_input.parent if title_input else None
+    for ancestor in lyrics_textarea.parents:
+        if ancestor.find(is_title_input):
+            return ancestor
+    return lyrics_textarea.parent
+
+def parse_song_html(html, song_url):
+    """Liest Titel, Styles und Lyrics aus dem gerenderten HTML einer Songseite.
+
+    Statt den Container über seinen kompletten Klassen-String zu suchen, wird er über das
+    Songtext- und das Titelfeld bestimmt (siehe `find_song_container`); alle Felder werden nur
+    innerhalb dieses Teilbaums gelesen. Geparst wird nur der Ausschnitt des Containers, den
+    `find_container_span` im rohen HTML findet; nur wenn das nicht gelingt, die ganze Seite.
+    Gibt ein leeres Dict zurück, wenn die Seite weder Titel noch Lyrics enthält.
+    """
+    html = SCRIPT_STYLE_PATTERN.sub('', html)
+    span = find_container_span(html)
+    soup = BeautifulSoup(html[span[0]:span[1]] if span else html, HTML_PARSER)
+    song_container = find_song_container(soup)
+    if song_container is None:
+        return {}
+
+    # Titel: erstes Eingabefeld mit Wert, Such- und versteckte Felder ausgenommen
+    title_input = song_container.find(is_title_input)
+    title = title_input['value'] if title_input else None
+
+    # Suche nach Genres
+    genres = [a.get_text(strip=True).replace(",", "").replace(" ", "") for a in song_container.find_all('a', href=is_style_link)]
+    genres = [genre for genre in genres if genre] or ["Keine Genres gefunden"]
+
+    # Suche nach Songtext
+    textareas = song_container.find_all('textarea')
+    lyrics_textarea = max(textareas, key=lambda textarea: len(textarea.get_text()), default=None)
+    lyrics = lyrics_textarea.get_text(strip=True) if lyrics_textarea else "Keine Lyrics gefunden"
+
+    return {
+        "song_url": song_url,
+        "title": title,
+        "styles": genres,
+        "lyrics": lyrics
+    }
+
+def parse_scripts(html):
+    """Baut nur die script-Elemente auf, z.B. für eingebettete Seitendaten."""
+    return BeautifulSoup(html, HTML_PARSER, parse_only=SCRIPT_STRAINER)
@@ -0,0 +1,61 @@
+import time
+from meta_store import MetaStore
+from song_corpus import SongCorpus
+from utils import clean_filename, extract_meta_tags, extract_song_id_from_url
+from constants import *
+
+class SongWriter:
+    """Speichert abgerufene Songs: Eintrag im Song-Korpus, Vokabulare und MetaStore.
+
+    Es darf genau einen Schreiber geben, z.B. die Callbacks der Crawl-Engine oder die Re-Extraktion
+    aus dem HTML-Archiv. Die JSON-Zuordnungen werden erst beim Schließen exportiert (oder auf Wunsch
+    mit `python meta_store.py --export`), damit der Export nicht mit jedem Song teurer wird.
+    """
+
+    def __init__(self, corpus_dir=CORPUS_DIR, with_meta=True):
+        # Zuordnungen landen im MetaStore, die JSON-Dateien werden erst beim Schließen exportiert.
+        # Ohne `with_meta` (z.B. Shard-Worker) wird nur der Korpus geschrieben, die Zuordnungen entstehen beim Zusammenführen.
+        self.meta_store = MetaStore() if with_meta else None
+        if self.meta_store:
+            self.styles_vocabulary, self.meta_tags_vocabulary = self.meta_store.load_vocabularies()
+        self.corpus = SongCorpus(corpus_dir, legacy_dir=SONGS_DIR if corpus_dir == CORPUS_DIR else None)
+
+    def save(self, song_url, song_data):
+        """Gibt den Titel und die Liste der tatsächlich geschriebenen Dateien zurück (der Korpus-Shard)."""
+        song_id = extract_song_id_from_url(song_url)
+        song_title = song_data["title"] or f"Unbekannter_Titel_{int(time.time())}"
+
+        # Liste der aktualisierten Dateien initialisieren
+        updated_files = []
+
+        # Bereinigen und Speichern der Song-Daten (der Dateiname bleibt der Schlüssel in den Trainingsdaten)
+        song_file_name = clean_filename(f"{song_title}_{song_id}") + ".json"
+        updated_files.append(self.corpus.save_song(song_id, song_data, song_file_name))
+        if not self.meta_store:
+            return song_title, updated_files
+
+        # Song-Styles- und Song-Meta-Mapping mit song_url als Schlüssel speichern
+        meta_tags = extract_meta_tags(song_data['lyrics'])
+        previous = self.meta_store.add_song(song_url, song_data['styles'], meta_tags)
+
+        # Vokabulare aktualisieren; bei einem erneut gespeicherten Song zählt nur die neue Fassung
+        if previous != (song_data['styles'], meta_tags):
+            if previous:
+                self.styles_vocabulary.remove(previous[0])
+                self.meta_tags_vocabulary.remove(previous[1])
+            self.styles_vocabulary.update(song_data['styles'])
+            self.meta_tags_vocabulary.update(meta_tags)
+        return song_title, updated_files
+
+    def close(self, recount=False):
+        """Exportiert die JSON-Dateien.
+
+        Mit `recount` werden die Häufigkeiten aus dem MetaStore neu gezählt, z.B. nach der Re-Extraktion.
+        """
+        if self.meta_store:
+            if recount:
+                self.meta_store.export_json(*self.meta_store.build_vocabularies())
+            else:
+                self.meta_store.export_json(self.styles_vocabulary, self.meta_tags_vocabulary)
+            self.meta_store.close()
+        self.corpus.close()
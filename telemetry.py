@@ -0,0 +1,104 @@
+import json
+import time
+from threading import Lock
+from constants import *
+
+# Perzentil aus einer sortierten Liste (nächster Rang)
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class PageStats:
+    """Sammelt die Zeiten pro Seitenaufruf: Navigation, Warten auf das Rendern und Parsen.
+
+    Jeder Aufruf wird zusätzlich als Zeile in `log_file` (JSON Lines) angehängt,
+    damit die Latenzverteilung auch nach dem Lauf ausgewertet werden kann.
+    Außerdem werden die übertragenen Bytes pro Seite und die Startzeiten der Browser erfasst.
+    """
+
+    PHASES = ("navigation", "render_wait", "parse", "total")
+
+    def __init__(self, log_file=PAGE_TIMINGS_FILE):
+        self.log_file = log_file
+        self.lock = Lock()
+        self.samples = {phase: [] for phase in self.PHASES}
+        self.timeouts = 0
+        self.page_bytes = []
+        self.startups = []
+
+    def record(self, url, navigation, render_wait, parse, ready=True, transferred_bytes=None):
+        timing = {
+            "url": url,
+            "timestamp": time.time(),
+            "navigation": navigation,
+            "render_wait": render_wait,
+            "parse": parse,
+            "total": navigation + render_wait + parse,
+            "ready": ready,
+            "bytes": transferred_bytes
+        }
+        with self.lock:
+            for phase in self.PHASES:
+                self.samples[phase].append(timing[phase])
+            if transferred_bytes is not None:
+                self.page_bytes.append(transferred_bytes)
+            if not ready:
+                self.timeouts += 1
+            if self.log_file:
+                with open(self.log_file, 'a', encoding='utf-8') as file:
+                    file.write(json.dumps(timing) + "\n")
+        return timing
+
+    def record_startup(self, seconds):
+        """Startzeit eines Browsers (Sekunden vom Start bis zur Einsatzbereitschaft)."""
+        with self.lock:
+            self.startups.append(seconds)
+
+    def summary(self):
+        """Liefert je Phase Anzahl, Mittelwert, p50, p90, p99 und Maximum in Sekunden."""
+        with self.lock:
+            result = {}
+            for phase, values in self.samples.items():
+                values = sorted(values)
+                result[phase] = {
+                    "count": len(values),
+                    "mean": sum(values) / len(values) if values else 0.0,
+                    "p50": percentile(values, 0.50),
+                    "p90": percentile(values, 0.90),
+                    "p99": percentile(values, 0.99),
+                    "max": values[-1] if values else 0.0
+                }
+            return result
+
+    def bytes_summary(self):
+        """Anzahl, Mittelwert, p50, p90 und Summe der übertragenen Bytes pro Seite."""
+        with self.lock:
+            values = sorted(self.page_bytes)
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": percentile(values, 0.50),
+            "p90": percentile(values, 0.90),
+            "total": sum(values)
+        }
+
+    def format_summary(self):
+        lines = [f"Seitenzeiten ({self.timeouts} Timeouts):"]
+        for phase, stats in self.summary().items():
+            lines.append(
+                f"  {phase}: n={stats['count']} mean={stats['mean']:.3f}s p50={stats['p50']:.3f}s "
+                f"p90={stats['p90']:.3f}s p99={stats['p99']:.3f}s max={stats['max']:.3f}s"
+            )
+        page_bytes = self.bytes_summary()
+        if page_bytes["count"]:
+            lines.append(
+                f"  bytes: n={page_bytes['count']} mean={page_bytes['mean'] / 1024:.1f}KiB p50={page_bytes['p50'] / 1024:.1f}KiB "
+                f"p90={page_bytes['p90'] / 1024:.1f}KiB total={page_bytes['total'] / 1048576:.1f}MiB"
+            )
+        with self.lock:
+            startups = list(self.startups)
+        if startups:
+            lines.append(f"  browser_start: n={len(startups)} mean={sum(startups) / len(startups):.2f}s max={max(startups):.2f}s")
+        return "\n".join(lines)
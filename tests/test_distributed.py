@@ -0,0 +1,124 @@
+"""Verteiltes Scraping lokal: K Shard-Worker als eigene Prozesse gegen den Testserver, danach `merge`.
+
+Die Songseiten des Testservers enthalten __NEXT_DATA__, die Worker kommen also ohne Chrome aus.
+Die Playlist-Suche über --start-url braucht Chrome und läuft nur, wenn ein Chrome gefunden wird.
+Aufruf aus dem Projektverzeichnis: python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+import unittest
+from http.server import ThreadingHTTPServer
+import distributed
+from fixture_server import FixtureHandler, fixture_song, manual_playlists
+from http_fetcher import song_data_from_clip
+from song_corpus import SongCorpus
+from utils import load_json, save_json, shard_of
+from constants import *
+
+try:
+    import scraper_engine
+except ImportError:
+    scraper_engine = None
+
+SONGS = 40
+PLAYLISTS = 4
+SHARDS = 3
+
+class ShardFixtureHandler(FixtureHandler):
+    songs = SONGS
+    playlists = PLAYLISTS
+
+def find_chrome():
+    return next((shutil.which(name) for name in ("google-chrome", "chromium", "chromium-browser", "chrome") if shutil.which(name)), None)
+
+@unittest.skipIf(scraper_engine is None, "selenium ist nicht installiert")
+class DistributedScrapeTest(unittest.TestCase):
+    """Startet die Worker über distributed.run_local in einem leeren Arbeitsverzeichnis."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ShardFixtureHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.playlists = manual_playlists(cls.base_url, SONGS, PLAYLISTS)
+        cls.song_urls = {song_url for data in cls.playlists.values() for song_url in data["song_urls"]}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+        os.makedirs(SONG_META_DIR)
+        self.messages = []
+
+    def expected_song(self, song_url):
+        return song_data_from_clip(fixture_song(song_url.rsplit("/", 1)[1]), song_url)
+
+    def run_shards(self):
+        failed = distributed.run_local(SHARDS, ["--workers", "2"], log_callback=self.messages.append)
+        self.assertEqual(failed, 0, "\n".join(self.messages))
+
+    def worker_song_ids(self):
+        song_ids = []
+        for shard_index in range(SHARDS):
+            corpus = SongCorpus(os.path.join(distributed.worker_dir(shard_index, SHARDS), "corpus"), legacy_dir=None)
+            song_ids.append(corpus.song_ids())
+            corpus.close()
+        return song_ids
+
+    def assert_shards_disjoint_and_complete(self):
+        all_song_ids = {song_url.rsplit("/", 1)[1] for song_url in self.song_urls}
+        worker_song_ids = self.worker_song_ids()
+        for shard_index, song_ids in enumerate(worker_song_ids):
+            with self.subTest(shard=shard_index):
+                self.assertTrue(song_ids)
+                self.assertTrue(all(shard_of(song_id, SHARDS) == shard_index for song_id in song_ids))
+        self.assertEqual(sum(len(song_ids) for song_ids in worker_song_ids), len(all_song_ids))
+        self.assertEqual(set().union(*worker_song_ids), all_song_ids)
+
+    def assert_merged(self):
+        corpus = SongCorpus(CORPUS_DIR, legacy_dir=None)
+        try:
+            self.assertEqual(len(corpus), len(self.song_urls))
+            for song_url in self.song_urls:
+                self.assertEqual(corpus.get(song_url.rsplit("/", 1)[1]), self.expected_song(song_url))
+        finally:
+            corpus.close()
+
+        expected_styles = {song_url: self.expected_song(song_url)["styles"] for song_url in self.song_urls}
+        self.assertEqual(load_json(SONG_STYLES_MAPPING_FILE), expected_styles)
+        self.assertEqual(set(load_json(SONG_META_MAPPING_FILE)), self.song_urls)
+        self.assertEqual(set(load_json(STYLES_FILE)), {style for styles in expected_styles.values() for style in styles})
+
+        # Ein zweites Zusammenführen übernimmt nichts mehr
+        self.assertEqual(distributed.merge(distributed.find_worker_dirs(), log_callback=self.messages.append), 0)
+
+    def test_shards_split_songs_and_merge_rebuilds_corpus(self):
+        save_json(self.playlists, MANUAL_PLAYLISTS_FILE)
+        self.run_shards()
+        self.assert_shards_disjoint_and_complete()
+        self.assert_merged()
+
+    @unittest.skipIf(find_chrome() is None, "Chrome ist nicht installiert")
+    def test_playlist_phase_against_fixture_server(self):
+        subprocess.run([sys.executable, scraper_engine.__file__, "playlists", "--workers", "1", "--start-url", self.base_url],
+                       check=True, capture_output=True)
+        scraped = load_json(SCRAPED_PLAYLISTS_FILE)
+        self.assertEqual({playlist_url: set(data["song_urls"]) for playlist_url, data in scraped.items()},
+                         {playlist_url: set(data["song_urls"]) for playlist_url, data in self.playlists.items()})
+        self.run_shards()
+        self.assert_shards_disjoint_and_complete()
+        self.assert_merged()
+
+if __name__ == "__main__":
+    unittest.main()
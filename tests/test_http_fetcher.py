@@ -0,0 +1,110 @@
+"""HttpSongFetcher gegen den lokalen Testserver mit gespeicherten Seiten aus fixtures/pages.
+
+Je Extraktionsweg gibt es eine Seite; expected.json hält den Weg und die erwarteten Felder fest.
+Aufruf aus dem Projektverzeichnis: python -m unittest discover tests
+"""
+import os
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from bs4 import BeautifulSoup
+from fixture_server import FixtureHandler
+from http_fetcher import HttpSongFetcher, find_clip_in_data, find_clip_in_text, decode_next_flight_chunks
+from song_parser import parse_song_html
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'pages')
+
+def load_expected():
+    with open(os.path.join(PAGES_DIR, 'expected.json'), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def read_page(name):
+    with open(os.path.join(PAGES_DIR, name + '.html'), 'r', encoding='utf-8') as file:
+        return file.read()
+
+class SavedPageHandler(FixtureHandler):
+    pages_dir = PAGES_DIR
+
+class FixtureServerTestCase(unittest.TestCase):
+    """Startet den Testserver mit den gespeicherten Seiten einmal pro Testklasse."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.expected = load_expected()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SavedPageHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.fetcher = HttpSongFetcher(pool_size=1, timeout=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fetcher.close()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def song_url(self, name):
+        return f"{self.base_url}/song/{name}"
+
+class HttpFetcherFixtureTest(FixtureServerTestCase):
+
+    def test_every_extraction_path_has_a_page(self):
+        self.assertEqual({page["path"] for page in self.expected.values()}, {"next_data", "flight", "markup", "browser"})
+
+    def test_fetch_matches_expected_fields(self):
+        for name, page in self.expected.items():
+            with self.subTest(page=name):
+                song_data = self.fetcher.fetch(self.song_url(name))
+                if page["path"] == "browser":
+                    self.assertEqual(song_data, {})  # leeres Ergebnis -> Abruf über Chrome
+                else:
+                    self.assertEqual(song_data, dict(page["song"], song_url=self.song_url(name)))
+
+    def test_pages_use_the_recorded_path(self):
+        for name, page in self.expected.items():
+            html = read_page(name)
+            soup = BeautifulSoup(html, 'html.parser')
+            next_data = soup.find('script', id='__NEXT_DATA__')
+            embedded = find_clip_in_data(json.loads(next_data.string), name) if next_data else None
+            streamed = find_clip_in_text(decode_next_flight_chunks(soup), name)
+            markup = parse_song_html(html, self.song_url(name))
+            with self.subTest(page=name):
+                self.assertEqual(embedded is not None, page["path"] == "next_data")
+                self.assertEqual(streamed is not None, page["path"] == "flight")
+                if page["path"] in ("next_data", "flight", "browser"):
+                    self.assertFalse(markup.get("title") and markup.get("lyrics") != "Keine Lyrics gefunden")
+
+    def test_missing_page_returns_empty_result(self):
+        self.assertEqual(self.fetcher.fetch(self.song_url("does-not-exist")), {})
+
+try:
+    import scraper_engine
+except ImportError:
+    scraper_engine = None
+
+@unittest.skipIf(scraper_engine is None, "selenium ist nicht installiert")
+class BrowserFallbackTest(FixtureServerTestCase):
+    """fetch_song_data_http_first nutzt Chrome nur für Seiten, die per HTTP nichts liefern."""
+
+    def setUp(self):
+        self.browser_calls = []
+        original = scraper_engine.fetch_song_data
+
+        def fetch_with_browser(driver, song_url, *args, **kwargs):
+            self.browser_calls.append(song_url)
+            return {"song_url": song_url, "title": "gerendert"}
+
+        scraper_engine.fetch_song_data = fetch_with_browser
+        self.addCleanup(setattr, scraper_engine, 'fetch_song_data', original)
+
+    def test_browser_only_for_client_rendered_pages(self):
+        for name, page in self.expected.items():
+            song_data = scraper_engine.fetch_song_data_http_first(None, self.song_url(name), self.fetcher)
+            with self.subTest(page=name):
+                self.assertTrue(song_data)
+        browser_pages = [name for name, page in self.expected.items() if page["path"] == "browser"]
+        self.assertEqual(self.browser_calls, [self.song_url(name) for name in browser_pages])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import re
+import regex
+from collections import namedtuple
+from constants import *
+
+# Eine Regel: Muster und Ersatz (Text, Funktion des Treffers oder None = Treffer unverändert lassen).
+# `ascii_pattern` ist ein gleichwertiges Muster für das Standardmodul re, das nur für reine ASCII-Texte
+# gelten muss; re ist dort um ein Mehrfaches schneller als regex. None = kein solches Muster.
+# `ascii_first` enthält alle Zeichen, mit denen ein Treffer beginnen kann; kennen alle Regeln ihre
+# Anfangszeichen, springt re per Vorausschau direkt zur nächsten möglichen Stelle.
+Rule = namedtuple('Rule', ['pattern', 'replacement', 'ascii_pattern', 'ascii_first'], defaults=[None, None])
+
+# Leerraum ohne Zeilenumbruch wie \s in regex, für ASCII ausgeschrieben (re zählt auch \x1c-\x1f zu \s)
+ASCII_SPACE = r'\t\x0b\x0c\r '
+
+def allowed_characters(character_class=NORMALIZER_ALLOWED_CHARACTERS):
+    """Entfernt alle Zeichen außerhalb der Zeichenklasse (Inhalt von [...] in regex-Syntax)."""
+    pattern = f'[^{character_class}]+'
+    # Für ASCII die entfernten Zeichen einmal ausprobieren und als einfache Klasse ausschreiben
+    compiled = regex.compile(pattern, regex.UNICODE)
+    removed = "".join(chr(code) for code in range(128) if compiled.match(chr(code)))
+    return Rule(pattern, '', f'[{re.escape(removed)}]+' if removed else r'(?!)', removed)
+
+def keep_markers():
+    """Lässt Abschnittsmarken wie [Chorus] oder (Outro) samt Inhalt unverändert, auch wenn die Zeichenklasse enger ist."""
+    pattern = r'\[[^\[\]\n]*\]|\([^()\n]*\)'
+    return Rule(pattern, None, pattern, "[(")
+
+def collapse_whitespace():
+    """Fasst Leerzeichen und Tabs innerhalb einer Zeile zu einem Leerzeichen zusammen, Zeilenumbrüche bleiben."""
+    return Rule(r'[^\S\r\n]{2,}|[^\S\r\n ]', ' ', r'[\t\x0b\x0c ]{2,}|[\t\x0b\x0c]', "\t\x0b\x0c ")
+
+def collapse_blank_lines():
+    """Mehrere Leerzeilen hintereinander werden zu einer."""
+    return Rule(r'\n[^\S\n]*(?:\n[^\S\n]*)+\n', '\n\n', f'\\n[{ASCII_SPACE}]*(?:\\n[{ASCII_SPACE}]*)+\\n', "\n")
+
+def replace(pattern, replacement, ascii_pattern=None, ascii_first=None):
+    """Eigene Regel; Rückverweise wie \\1 im Ersatz beziehen sich auf die Gruppen von `pattern`."""
+    return Rule(pattern, replacement, ascii_pattern, ascii_first)
+
+class TextNormalizer:
+    """Wendet eine Kette von Regeln in einem einzigen Durchlauf pro Text an.
+
+    Alle Regeln werden einmal zu einem Muster mit einer Alternative pro Regel kompiliert. An jeder
+    Stelle gewinnt die erste Regel der Kette, die passt; ersetzter Text wird nicht erneut geprüft.
+    Eigene Regeln sollten also vor `allowed_characters` stehen, Marken vor der Zeichenklasse.
+    """
+
+    def __init__(self, rules, strip=True):
+        self.rules = list(rules)
+        self.strip = strip
+        # Gruppennummer jeder Alternative im Gesamtmuster (eigene Regeln können selbst Gruppen enthalten)
+        self.groups = []
+        self.compiled_rules = []
+        number = 1
+        for rule in self.rules:
+            compiled = regex.compile(rule.pattern, regex.UNICODE)
+            self.groups.append(number)
+            self.compiled_rules.append(compiled)
+            number += compiled.groups + 1
+        self.pattern = regex.compile("|".join(f"({rule.pattern})" for rule in self.rules), regex.UNICODE)
+        # Schneller Weg für ASCII-Texte, wenn jede Regel ein re-Muster mit denselben Gruppen hat
+        self.ascii_pattern = None
+        if all(rule.ascii_pattern for rule in self.rules):
+            ascii_pattern = "|".join(f"({rule.ascii_pattern})" for rule in self.rules)
+            if len(self.rules) > 1 and all(rule.ascii_first is not None for rule in self.rules):
+                first = "".join(sorted(set("".join(rule.ascii_first for rule in self.rules))))
+                ascii_pattern = f"(?=[{re.escape(first)}])(?:{ascii_pattern})" if first else r"(?!)"
+            ascii_pattern = re.compile(ascii_pattern)
+            if ascii_pattern.groups == self.pattern.groups:
+                self.ascii_pattern = ascii_pattern
+        # Nur eine Regel mit festem Ersatz: ohne Python-Rückruf pro Treffer ersetzen
+        single = len(self.rules) == 1 and isinstance(self.rules[0].replacement, str)
+        self.replacement = self.rules[0].replacement if single else self.replace_match
+
+    @classmethod
+    def from_config(cls, config):
+        """Kette aus einem Dict wie NORMALIZER_CONFIG in constants.py."""
+        rules = [replace(pattern, replacement) for pattern, replacement in config.get('replacements', [])]
+        if config.get('keep_markers'):
+            rules.append(keep_markers())
+        if config.get('collapse_whitespace'):
+            rules.append(collapse_whitespace())
+            rules.append(collapse_blank_lines())
+        rules.append(allowed_characters(config.get('allowed_characters', NORMALIZER_ALLOWED_CHARACTERS)))
+        return cls(rules, strip=config.get('strip', True))
+
+    def replace_match(self, match):
+        for index, group in enumerate(self.groups):
+            if match.start(group) != -1:
+                replacement = self.rules[index].replacement
+                if replacement is None:
+                    return match.group()
+                if callable(replacement):
+                    return replacement(match)
+                if '\\' in replacement:
+                    return self.compiled_rules[index].sub(replacement, match.group(), count=1)
+                return replacement
+        return match.group()
+
+    def normalize(self, text):
+        pattern = self.ascii_pattern if self.ascii_pattern and text.isascii() else self.pattern
+        text = pattern.sub(self.replacement, text)
+        return text.strip() if self.strip else text
+
+    __call__ = normalize
+
+# Standardkette aus constants.py, einmal beim Import kompiliert
+default_normalizer = TextNormalizer.from_config(NORMALIZER_CONFIG)
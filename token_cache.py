@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from utils import atomic_open, atomic_write
+from training_data import TrainingData
+from constants import *
+
+# Ein Cache-Ordner enthält:
+#   tokens.bin   alle Token-IDs hintereinander (uint16, bei Vokabularen über 65535 Einträgen uint32)
+#   offsets.npy  Startposition jedes Songs in tokens.bin, plus das Ende als letzter Eintrag (int64)
+#   meta.json    Schlüsseldaten; wird zuletzt geschrieben, ein Ordner ohne meta.json ist unvollständig
+TOKENS_FILE = 'tokens.bin'
+OFFSETS_FILE = 'offsets.npy'
+META_FILE = 'meta.json'
+
+def data_fingerprint(data):
+    """Hash über die Zeilen der Songs, die ins Training gehen, in ihrer Reihenfolge.
+
+    Ersetzte, gelöschte oder als Duplikat ausgelassene Songs ändern den Fingerprint, eine
+    Kompaktierung der Datei dagegen nicht.
+    """
+    digest = hashlib.sha256()
+    if data.offsets:
+        with open(data.path, 'rb') as file:
+            for offset in data.offsets:
+                file.seek(offset)
+                digest.update(file.readline())
+    return digest.hexdigest()
+
+def tokenizer_name(tokenizer):
+    return getattr(tokenizer, 'name_or_path', None) or type(tokenizer).__name__
+
+def cache_key(tokenizer, max_length, fingerprint):
+    """Ordnername aus Tokenizer (Name und Vokabulargröße), max_length und Datenstand."""
+    key = f"{tokenizer_name(tokenizer)}\n{len(tokenizer)}\n{max_length}\n{fingerprint}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+def token_dtype(vocab_size):
+    return np.uint16 if vocab_size <= 65536 else np.uint32
+
+class TokenCache:
+    """Tokenisierte Songs als Memory-Map: Zugriff per Index ohne Tokenizer und ohne die Daten im RAM zu halten.
+
+    `cache[i]` liefert die Token-IDs des i-ten Songs (bereits auf max_length gekürzt) als
+    Sicht in die Datei; das Betriebssystem lädt nur die gelesenen Seiten.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.open()
+
+    def open(self):
+        with open(os.path.join(self.directory, META_FILE), 'r', encoding='utf-8') as file:
+            self.meta = json.load(file)
+        self.offsets = np.load(os.path.join(self.directory, OFFSETS_FILE), mmap_mode='r')
+        dtype = np.dtype(self.meta['dtype'])
+        # Eine leere Datei lässt sich nicht mappen
+        if self.offsets[-1] > 0:
+            self.tokens = np.memmap(os.path.join(self.directory, TOKENS_FILE), dtype=dtype, mode='r')
+        else:
+            self.tokens = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def lengths(self):
+        """Anzahl der Tokens je Song."""
+        return np.diff(self.offsets)
+
+    # DataLoader-Worker bekommen eine Kopie: nur den Ordner mitnehmen und neu mappen, statt die Daten zu kopieren
+    def __getstate__(self):
+        return {'directory': self.directory}
+
+    def __setstate__(self, state):
+        self.directory = state['directory']
+        self.open()
+
+def build_token_cache(data, tokenizer, max_length, directory, fingerprint, batch_size=TOKEN_CACHE_BATCH_SIZE, log_callback=print):
+    """Tokenisiert alle Songs einmal und schreibt tokens.bin, offsets.npy und zuletzt meta.json.
+
+    Die Token-IDs werden blockweise auf die Platte geschrieben; im Speicher bleiben nur ein
+    Block Lyrics und die Offsets.
+    """
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    dtype = token_dtype(len(tokenizer))
+    offsets = [0]
+    with atomic_open(os.path.join(directory, TOKENS_FILE)) as tokens:
+        for start in range(0, len(data), batch_size):
+            lyrics = [data[index].get('lyrics', '') for index in range(start, min(start + batch_size, len(data)))]
+            for ids in tokenizer(lyrics, max_length=max_length, truncation=True)['input_ids']:
+                tokens.write(np.asarray(ids, dtype=dtype).tobytes())
+                offsets.append(offsets[-1] + len(ids))
+            log_callback(f"Tokenisiert: {len(offsets) - 1}/{len(data)} Songs...")
+    with atomic_open(os.path.join(directory, OFFSETS_FILE)) as file:
+        np.save(file, np.asarray(offsets, dtype=np.int64))
+    meta = {
+        "tokenizer": tokenizer_name(tokenizer),
+        "vocab_size": len(tokenizer),
+        "max_length": max_length,
+        "fingerprint": fingerprint,
+        "dtype": np.dtype(dtype).name,
+        "songs": len(offsets) - 1,
+        "tokens": offsets[-1],
+        "created_at": time.time()
+    }
+    atomic_write(os.path.join(directory, META_FILE), json.dumps(meta, indent=4, ensure_ascii=False).encode('utf-8'))
+    log_callback(f"Token-Cache erstellt: {meta['songs']} Songs, {meta['tokens']} Tokens, "
+                 f"{time.perf_counter() - started:.1f} s. Ordner: {directory}")
+
+def remove_stale_caches(meta, cache_dir, keep):
+    """Löscht ältere Caches desselben Tokenizers und derselben max_length (sie gehören zu einem alten Datenstand)."""
+    for name in os.listdir(cache_dir):
+        directory = os.path.join(cache_dir, name)
+        if name == keep or not os.path.isdir(directory):
+            continue
+        try:
+            with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as file:
+                other = json.load(file)
+        except (OSError, ValueError):
+            continue  # noch im Aufbau (oder abgebrochen, dann wird er beim nächsten Mal fertig gestellt)
+        if (other.get('tokenizer'), other.get('max_length')) == (meta['tokenizer'], meta['max_length']):
+            shutil.rmtree(directory, ignore_errors=True)
+
+def load_token_cache(tokenizer, max_length, path=TRAININGDATA_FILE, exclude=(), cache_dir=TOKEN_CACHE_DIR, log_callback=print):
+    """Token-Cache für die aktuellen Trainingsdaten; wird nur bei neuem Tokenizer, max_length oder Datenstand aufgebaut."""
+    data = TrainingData(path, exclude=exclude)
+    try:
+        fingerprint = data_fingerprint(data)
+        key = cache_key(tokenizer, max_length, fingerprint)
+        directory = os.path.join(cache_dir, key)
+        if os.path.exists(os.path.join(directory, META_FILE)):
+            log_callback(f"Token-Cache wird wiederverwendet: {directory}")
+        else:
+            build_token_cache(data, tokenizer, max_length, directory, fingerprint, log_callback=log_callback)
+    finally:
+        data.close()
+    cache = TokenCache(directory)
+    remove_stale_caches(cache.meta, cache_dir, keep=key)
+    return cache
+
+# Cache vorab aufbauen, z.B. vor dem ersten Training: python token_cache.py --model gpt2 --max-length 128
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trainingsdaten vorab tokenisieren")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="Name oder Pfad des Tokenizers")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH, help="Maximale Anzahl Tokens pro Song")
+    args = parser.parse_args(argv)
+
+    from transformers import GPT2Tokenizer
+    from near_duplicates import load_dropped_duplicates
+    tokenizer = GPT2Tokenizer.from_pretrained(args.model)
+    cache = load_token_cache(tokenizer, args.max_length, exclude=load_dropped_duplicates())
+    lengths = cache.lengths()
+    if len(lengths):
+        print(f"{len(cache)} Songs, {int(lengths.sum())} Tokens, im Mittel {lengths.mean():.1f} Tokens pro Song.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 import torch
 from torch.utils.data import Dataset, DataLoader
 from transformers import GPT2LMHeadModel, GPT2Tokenizer, AdamW, get_linear_schedule_with_warmup
-from utils import load_json
+import numpy as np
+from token_cache import load_token_cache
+from batching import LengthBucketSampler, PaddingCollator
+from near_duplicates import load_dropped_duplicates
 from constants import *
 import datetime
 from tqdm import tqdm
@@ -23,22 +26,16 @@ import re
 matplotlib.use('Agg')
 
 class LyricsDataset(Dataset):
-    def __init__(self, tokenizer, data, max_length):
-        self.tokenizer = tokenizer
-        self.data = data
-        self.max_length = max_length
+    """Songs aus dem Token-Cache, ungepolstert; aufgefüllt wird erst pro Batch (siehe PaddingCollator)."""
+
+    def __init__(self, cache):
+        self.cache = cache
 
     def __len__(self):
-        return len(self.data)
+        return len(self.cache)
 
     def __getitem__(self, idx):
-        lyrics = self.data[idx]['lyrics']
-        encoding = self.tokenizer(lyrics, return_tensors='pt', max_length=self.max_length, 
-                                  truncation=True, padding='max_length')
-        return {
-            'input_ids': encoding['input_ids'].flatten(),
-            'attention_mask': encoding['attention_mask'].flatten()
-        }
+        return {'input_ids': torch.from_numpy(self.cache[idx].astype(np.int64))}
 
 def initialize_trainer(model, epochs, learning_rate, batch_size, max_length, warmup_steps, 
                        weight_decay, gradient_accumulation_steps):
@@ -48,9 +45,11 @@ def initialize_trainer(model, epochs, learning_rate, batch_size, max_length, war
     tokenizer = GPT2Tokenizer.from_pretrained(model.config._name_or_path)
     tokenizer.pad_token = tokenizer.eos_token
 
-    dataset = load_json(TRAININGDATA_FILE)
-    train_dataset = LyricsDataset(tokenizer, dataset, max_length)
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
+    # Einmal tokenisiert und als Memory-Map wiederverwendet; fast gleiche Lyrics aus duplicates.json fallen weg
+    cache = load_token_cache(tokenizer, max_length, TRAININGDATA_FILE, exclude=load_dropped_duplicates())
+    # Songs ähnlicher Länge in einem Batch, aufgefüllt nur bis zum längsten
+    train_loader = DataLoader(LyricsDataset(cache), batch_sampler=LengthBucketSampler(cache.lengths(), batch_size),
+                              collate_fn=PaddingCollator(tokenizer.pad_token_id))
 
     optimizer = AdamW(model.parameters(), lr=learning_rate, weight_decay=weight_decay)
     scheduler = get_linear_schedule_with_warmup(optimizer, num_warmup_steps=warmup_steps, 
@@ -68,8 +67,9 @@ def train(model, train_loader, optimizer, scheduler, device, epochs,
         for batch_idx, batch in enumerate(progress_bar):
             input_ids = batch['input_ids'].to(device)
             attention_mask = batch['attention_mask'].to(device)
+            labels = batch['labels'].to(device)
             
-            outputs = model(input_ids, attention_mask=attention_mask, labels=input_ids)
+            outputs = model(input_ids, attention_mask=attention_mask, labels=labels)
             loss = outputs.loss
             loss = loss / gradient_accumulation_steps
             loss.backward()
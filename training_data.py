@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import argparse
+from utils import atomic_open
+from constants import *
+
+# Trainingsdaten als JSON Lines: ein Song pro Zeile, es wird nur angehängt.
+# Eine neuere Zeile mit demselben Dateinamen ersetzt die ältere, {"filename": ..., "deleted": true}
+# entfernt den Song. Eine unvollständige letzte Zeile (Abbruch beim Schreiben) wird ignoriert.
+
+def scan_training_data(path=TRAININGDATA_FILE):
+    """Liefert (Offsets der gültigen Zeilen, Anzahl überholter Zeilen).
+
+    Pro Dateiname zählt die letzte Zeile, gelöschte Songs fallen heraus. Im Speicher bleiben
+    nur Dateinamen und Offsets, nicht die Songs selbst.
+    """
+    latest = {}
+    lines = 0
+    if os.path.exists(path):
+        with open(path, 'rb') as file:
+            offset = 0
+            for line in file:
+                start, offset = offset, offset + len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # unvollständige letzte Zeile
+                lines += 1
+                filename = record.get('filename')
+                latest.pop(filename, None)  # neu einsortieren, damit die Reihenfolge der letzten Fassung folgt
+                if not record.get('deleted'):
+                    latest[filename] = start
+    return latest, lines - len(latest)
+
+class TrainingData:
+    """Trainingsdaten mit Direktzugriff per Index, ohne die ganze Datei in den Speicher zu laden.
+
+    Songs mit einem Dateinamen aus `exclude` (z.B. verworfene Duplikate) werden ausgelassen.
+    """
+
+    def __init__(self, path=TRAININGDATA_FILE, exclude=()):
+        self.path = path
+        latest, _ = scan_training_data(path)
+        self.filenames = [filename for filename in latest if filename not in exclude]
+        self.offsets = [latest[filename] for filename in self.filenames]
+        self.file = open(path, 'rb') if self.offsets else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        self.file.seek(self.offsets[index])
+        return json.loads(self.file.readline())
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+    # DataLoader-Worker bekommen eine Kopie: die offene Datei nicht mitnehmen, sondern neu öffnen
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['file'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.file = open(self.path, 'rb') if self.offsets else None
+
+class TrainingDataWriter:
+    """Hängt Songs gepuffert an die Trainingsdaten an und schreibt alle `flush_interval` Einträge auf die Platte."""
+
+    def __init__(self, path=TRAININGDATA_FILE, flush_interval=PREPARE_SAVE_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.written = 0
+        import_legacy_training_data(path)
+        # Eine abgebrochene letzte Zeile abschneiden, sonst hängt die nächste Zeile daran an
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb+') as file:
+                end = file.seek(0, os.SEEK_END)
+                while end > 0:
+                    start = max(0, end - 65536)
+                    file.seek(start)
+                    newline = file.read(end - start).rfind(b"\n")
+                    if newline != -1:
+                        end = start + newline + 1
+                        break
+                    end = start
+                file.truncate(end)
+        self.file = open(path, 'ab')
+
+    def append(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if len(self.buffer) >= self.flush_interval:
+            self.flush()
+
+    def remove(self, filename):
+        self.append({"filename": filename, "deleted": True})
+
+    def flush(self):
+        """Schreibt den Puffer und wartet, bis er auf der Platte ist."""
+        if self.buffer:
+            self.file.write("".join(self.buffer).encode('utf-8'))
+            self.written += len(self.buffer)
+            self.buffer = []
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+def iter_training_data(path=TRAININGDATA_FILE):
+    """Liefert die aktuellen Songs der Reihe nach."""
+    data = TrainingData(path)
+    try:
+        yield from data
+    finally:
+        data.close()
+
+def compact_training_data(path=TRAININGDATA_FILE):
+    """Schreibt nur die aktuellen Zeilen neu (ohne ersetzte und gelöschte). Gibt die Anzahl der Songs zurück."""
+    latest, _ = scan_training_data(path)
+    with open(path, 'rb') as source, atomic_open(path) as target:
+        for offset in latest.values():
+            source.seek(offset)
+            target.write(source.readline())
+    return len(latest)
+
+def export_json_array(path=TRAININGDATA_FILE, target_path=TRAININGDATA_LEGACY_FILE):
+    """Schreibt die Trainingsdaten im bisherigen Format als ein JSON-Array. Gibt die Anzahl der Songs zurück."""
+    count = 0
+    with atomic_open(target_path) as target:
+        target.write(b"[")
+        for record in iter_training_data(path):
+            target.write((",\n" if count else "\n").encode('utf-8'))
+            target.write(json.dumps(record, indent=4, ensure_ascii=False).encode('utf-8'))
+            count += 1
+        target.write(b"\n]" if count else b"]")
+    return count
+
+def import_legacy_training_data(path=TRAININGDATA_FILE, legacy_path=TRAININGDATA_LEGACY_FILE):
+    """Übernimmt einmalig eine bisherige trainingdata.json, solange es noch keine JSONL-Datei gibt."""
+    if os.path.exists(path) or not os.path.exists(legacy_path) or os.path.getsize(legacy_path) == 0:
+        return 0
+    try:
+        with open(legacy_path, 'r', encoding='utf-8') as file:
+            records = json.load(file)
+    except ValueError:
+        return 0
+    with atomic_open(path) as target:
+        for record in records:
+            target.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+    return len(records)
+
+# Altes Array-Format erzeugen: python training_data.py --export [trainingdata.json]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trainingsdaten im JSONL-Format")
+    parser.add_argument("--export", nargs="?", const=TRAININGDATA_LEGACY_FILE, help="Als JSON-Array exportieren")
+    parser.add_argument("--compact", action="store_true", help="Ersetzte und gelöschte Zeilen entfernen")
+    args = parser.parse_args(argv)
+
+    import_legacy_training_data()
+    if args.compact:
+        print(f"Trainingsdaten kompaktiert: {compact_training_data()} Songs.")
+    if args.export:
+        print(f"{export_json_array(target_path=args.export)} Songs nach {args.export} exportiert.")
+    if not args.compact and not args.export:
+        latest, stale = scan_training_data()
+        print(f"Trainingsdaten: {len(latest)} Songs, {stale} überholte Zeilen.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,21 @@ import re
 import regex
 import os
 import json
+import hashlib
+import tempfile
 from threading import Lock
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+from text_normalizer import default_normalizer
 from constants import *
 
+# Prozessübergreifende Dateisperren: fcntl unter Linux/macOS, msvcrt unter Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
 
 # Erstelle die Ordner, falls sie nicht vorhanden sind
 if not os.path.exists(SONGS_DIR):
@@ -16,11 +28,65 @@ if not os.path.exists(SONG_META_DIR):  # Füge dies für den neuen song_meta-Ord
 # Sperrmechanismus für Dateioperationen (Vermeidung von Konflikten bei parallelen Schreibvorgängen)
 file_lock = Lock()
 
+@contextmanager
+def locked_file(file_path):
+    """Exklusive, prozessübergreifende Sperre auf `file_path` über eine Lock-Datei daneben (advisory)."""
+    with open(file_path + ".lock", 'a+b') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gibt nach zehn Versuchen auf, weiter warten
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+# Datei atomar ersetzen: in eine temporäre Datei im selben Ordner schreiben, fsync, dann umbenennen
+@contextmanager
+def atomic_open(file_path):
+    """Liefert eine binäre Datei, die erst nach fehlerfreiem Verlassen des Blocks `file_path` ersetzt."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        # mkstemp legt die Datei nur für den Besitzer lesbar an, die bisherigen Rechte übernehmen
+        os.chmod(temp_path, os.stat(file_path).st_mode & 0o777 if os.path.exists(file_path) else 0o644)
+        with os.fdopen(fd, 'wb') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    # Auch die Umbenennung selbst dauerhaft machen (unter Windows lassen sich Ordner nicht öffnen)
+    if fcntl:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def atomic_write(file_path, data):
+    with atomic_open(file_path) as file:
+        file.write(data)
+
 #textfilter
+# Regex, der Buchstaben, Zahlen und eine breite Palette von Satzzeichen und Symbolen zulässt (einmal kompiliert)
+NON_TEXT_PATTERN = regex.compile(f'[^{NORMALIZER_ALLOWED_CHARACTERS}]', regex.UNICODE)
+
 def remove_non_text_characters(text):
-    # Regex, der Buchstaben, Zahlen und eine breite Palette von Satzzeichen und Symbolen zulässt
-    pattern = regex.compile(r'[^\p{L}\p{N}\s\.,\'#,\.\-_:;!"§$%&/()=?{[\]}\´`+*~#\'|<>]', regex.UNICODE)
-    return pattern.sub('', text)
+    return NON_TEXT_PATTERN.sub('', text)
 
 # Lade JSON Datei, falls vorhanden
 def load_json(file_path):
@@ -30,10 +96,22 @@ def load_json(file_path):
     return {}
 
 # Speichern der JSON Datei mit einem Sperrmechanismus, um Dateikonflikte zu vermeiden
-def save_json(data, file_path):
-    with file_lock:
-        with open(file_path, 'w', encoding="utf-8") as file:
-            json.dump(data, file, indent=4)
+def save_json(data, file_path, ensure_ascii=True):
+    """Schreibt atomar: Leser sehen immer entweder die alte oder die neue Datei, nie eine halbe.
+
+    Die Sperre gilt auch für andere Prozesse, die über save_json oder update_json schreiben.
+    """
+    content = json.dumps(data, indent=4, ensure_ascii=ensure_ascii).encode('utf-8')
+    with file_lock, locked_file(file_path):
+        atomic_write(file_path, content)
+
+# JSON-Datei unter Sperre lesen, ändern und zurückschreiben, damit parallele Prozesse keine Änderungen verlieren
+def update_json(file_path, update, ensure_ascii=True):
+    """`update(data)` bekommt den aktuellen Inhalt ({} falls nicht vorhanden) und gibt den neuen zurück."""
+    with file_lock, locked_file(file_path):
+        data = update(load_json(file_path))
+        atomic_write(file_path, json.dumps(data, indent=4, ensure_ascii=ensure_ascii).encode('utf-8'))
+    return data
 
 # Bereinige ungültige Zeichen im Dateinamen
 def clean_filename(filename):
@@ -52,25 +130,30 @@ def extract_song_id_from_url(song_url):
         return match.group(1)
     return "unbekannte_id"
 
-# Verarbeitete Song-IDs aus den Dateinamen im 'songs'-Ordner abrufen
-def get_processed_song_ids():
-    song_ids = set()
-    for filename in os.listdir(SONGS_DIR):
-        if filename.endswith('.json'):
-            name = filename[:-5]  # Dateinamen ohne Erweiterung
-            song_id = name.split('_')[-1]  # Song-ID extrahieren (letzter Unterstrich)
-            song_ids.add(song_id)
-    return song_ids
+# Stabile Zuordnung eines Schlüssels (z.B. Song-ID) zu einem von `shard_count` Teilen, unabhängig von Prozess und Rechner
+def shard_of(key, shard_count):
+    return int(hashlib.sha1(key.encode('utf-8')).hexdigest()[:8], 16) % shard_count
+
+# URL vereinheitlichen, damit derselbe Song aus verschiedenen Playlists nur einmal abgerufen wird
+def canonicalize_url(url):
+    """Kleinschreibung für Schema und Host, ohne www., Query, Fragment und abschließenden Schrägstrich."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = re.sub(r'/{2,}', '/', parts.path).rstrip('/') or '/'
+    return urlunsplit(((parts.scheme or 'https').lower(), host, path, '', ''))
 
 ################Trainingdata#########################
 
 def clean_song_data(song_data):
-    """Bereinigt die Felder eines Songs und entfernt unnötige Leerzeichen"""
-    title = remove_non_text_characters(song_data.get('title', '')).strip()
-    lyrics = remove_non_text_characters(song_data.get('lyrics', '')).strip()
-    styles = [remove_non_text_characters(style).strip() for style in song_data.get('styles', [])]
-    metatags = [remove_non_text_characters(tag).strip() for tag in song_data.get('metatags', [])]
-    language = remove_non_text_characters(song_data.get('language', '')).strip()
+    """Bereinigt die Felder eines Songs mit der Regelkette aus NORMALIZER_CONFIG (ein Durchlauf pro Feld)"""
+    normalize = default_normalizer.normalize
+    title = normalize(song_data.get('title', ''))
+    lyrics = normalize(song_data.get('lyrics', ''))
+    styles = [normalize(style) for style in song_data.get('styles', [])]
+    metatags = [normalize(tag) for tag in song_data.get('metatags', [])]
+    language = normalize(song_data.get('language', ''))
 
     # Hier wird der Dateiname hinzugefügt
     filename = song_data.get('filename', '')
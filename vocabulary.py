@@ -0,0 +1,57 @@
+from utils import load_json, save_json
+
+class Vocabulary:
+    """Menge von Styles bzw. Meta-Tags mit stabiler Einfügereihenfolge und Häufigkeiten.
+
+    Intern ein dict (Eintrag -> Anzahl), damit `in` in O(1) läuft und die Reihenfolge
+    der bisherigen Listen-Dateien erhalten bleibt.
+    """
+
+    def __init__(self, entries=None):
+        self.counts = {}
+        for entry in entries or []:
+            self.counts.setdefault(entry, 0)
+
+    def __contains__(self, entry):
+        return entry in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def add(self, entry):
+        """Zählt einen Eintrag hoch. Gibt True zurück, wenn er neu war."""
+        is_new = entry not in self.counts
+        self.counts[entry] = self.counts.get(entry, 0) + 1
+        return is_new
+
+    def update(self, entries):
+        """Zählt alle Einträge hoch und gibt die neuen Einträge zurück."""
+        return [entry for entry in entries if self.add(entry)]
+
+    def remove(self, entries):
+        """Zählt die Einträge wieder herunter, z.B. für die alte Fassung eines erneut gespeicherten Songs.
+
+        Die Einträge selbst bleiben in der Liste.
+        """
+        for entry in entries:
+            if self.counts.get(entry):
+                self.counts[entry] -= 1
+
+    def to_list(self):
+        return list(self.counts)
+
+    @classmethod
+    def load(cls, path, counts_path):
+        """Lädt die Liste aus `path` und die Häufigkeiten aus `counts_path` (falls vorhanden)."""
+        vocabulary = cls(load_json(path) or [])
+        for entry, count in (load_json(counts_path) or {}).items():
+            vocabulary.counts[entry] = count
+        return vocabulary
+
+    def save(self, path, counts_path):
+        # Die Listen-Datei behält ihr bisheriges Format, die Häufigkeiten liegen daneben
+        save_json(self.to_list(), path)
+        save_json(self.counts, counts_path)